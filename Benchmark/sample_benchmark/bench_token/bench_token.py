@@ -0,0 +1,40 @@
+from iconservice import *
+
+
+class TokenFallbackInterface(InterfaceScore):
+    @interface
+    def tokenFallback(self, _from: Address, _value: int, _data: bytes):
+        pass
+
+
+class BenchToken(IconScoreBase):
+    """
+    Minimal IRC2 token for the benchmarks. A transfer to a contract calls
+    its tokenFallback, as SampleIRC16 dividend deposits expect.
+    """
+    _BALANCES = 'balances'
+
+    def __init__(self, db: IconScoreDatabase) -> None:
+        super().__init__(db)
+        self._balances = DictDB(self._BALANCES, db, value_type=int)
+
+    def on_install(self, _initialSupply: int) -> None:
+        super().on_install()
+        self._balances[self.msg.sender] = _initialSupply
+
+    def on_update(self) -> None:
+        super().on_update()
+
+    @external(readonly=True)
+    def balanceOf(self, _owner: Address) -> int:
+        return self._balances[_owner]
+
+    @external
+    def transfer(self, _to: Address, _value: int, _data: bytes = None):
+        if _value < 0 or self._balances[self.msg.sender] < _value:
+            revert("Insufficient balance")
+        self._balances[self.msg.sender] -= _value
+        self._balances[_to] += _value
+        if _to.is_contract:
+            score = self.create_interface_score(_to, TokenFallbackInterface)
+            score.tokenFallback(self.msg.sender, _value, b'' if _data is None else _data)
@@ -0,0 +1,225 @@
+import abc
+import os
+import random
+import time
+import unittest
+
+from iconsdk.builder.call_builder import CallBuilder
+from iconsdk.builder.transaction_builder import DeployTransactionBuilder, CallTransactionBuilder
+from iconsdk.libs.in_memory_zip import gen_deploy_data_content
+from iconsdk.signed_transaction import SignedTransaction
+from tbears.libs.icon_integrate_test import IconIntegrateTestBase, SCORE_INSTALL_ADDRESS
+
+from .load import DEFAULT_CURVES, LoadCurve, parse_mix, parse_sizes, save_curves
+from .recorder import BenchmarkRecorder
+
+DIR_PATH = os.path.abspath(os.path.dirname(__file__))
+REPO_PATH = os.path.abspath(os.path.join(DIR_PATH, '..', '..'))
+
+IRC3_PROJECT = os.path.join(REPO_PATH, 'IRC3', 'sample_irc3')
+IRC16_PROJECT = os.path.join(REPO_PATH, 'IRC16', 'sample_irc16')
+BENCH_TOKEN_PROJECT = os.path.join(DIR_PATH, 'bench_token')  # IRC2 token calling tokenFallback
+
+BATCH_SIZE = int(os.environ.get('BENCH_BATCH_SIZE', '50'))
+CALL_REPEAT = int(os.environ.get('BENCH_CALL_REPEAT', '5'))
+STEP_COST_TOLERANCE = float(os.environ.get('BENCH_STEP_COST_TOLERANCE', '0.25'))
+
+LOAD_ENABLED = os.environ.get('BENCH_LOAD') == '1'
+LOAD_SIZES = parse_sizes(os.environ.get('BENCH_LOAD_SIZES', '1000,10000'))
+LOAD_OPERATIONS = int(os.environ.get('BENCH_LOAD_OPERATIONS', '200'))
+LOAD_OUTPUT = os.environ.get('BENCH_LOAD_OUTPUT', DEFAULT_CURVES)
+LOAD_LABEL = os.environ.get('BENCH_LOAD_LABEL', 'current')
+LOAD_SEED = int(os.environ.get('BENCH_LOAD_SEED', '0'))
+LOAD_BULK_SIZE = 100  # Transactions per block while pre-populating state
+
+
+class ScoreBenchmarkCase(IconIntegrateTestBase):
+    """
+    Deploys a SCORE into the local (offline) test service and measures
+    its external methods. Subclasses set SCORE_PROJECT, SCORE_NAME and
+    DEPLOY_PARAMS and call measure_transaction / measure_call per method.
+    """
+    SCORE_PROJECT = None
+    SCORE_NAME = None
+    DEPLOY_PARAMS = None
+    STEP_LIMIT = 10_000_000_000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.recorder = BenchmarkRecorder.from_env()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.recorder.save()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+
+        # Benchmarks always run against the local in-memory service
+        self.icon_service = None
+        self._score_address = self._deploy_score()['scoreAddress']
+
+    def _deploy_score(self, to: str = SCORE_INSTALL_ADDRESS, project: str = None, params: dict = None) -> dict:
+        # Installs SCORE_PROJECT by default, deploying to an existing SCORE address updates it
+        transaction = DeployTransactionBuilder() \
+            .from_(self._test1.get_address()) \
+            .to(to) \
+            .step_limit(100_000_000_000) \
+            .nid(3) \
+            .nonce(100) \
+            .content_type("application/zip") \
+            .content(gen_deploy_data_content(project or self.SCORE_PROJECT)) \
+            .params(self.DEPLOY_PARAMS if params is None else params) \
+            .build()
+
+        signed_transaction = SignedTransaction(transaction, self._test1)
+        tx_result = self.process_transaction(signed_transaction, self.icon_service)
+
+        self.assertEqual(True, tx_result['status'])
+        return tx_result
+
+    def send(self, method: str, params: dict = None, wallet=None, value: int = 0, to: str = None) -> dict:
+        # Sends a transaction without recording it, used to prepare state. to defaults to the benchmarked SCORE
+        wallet = wallet or self._test1
+        transaction = CallTransactionBuilder() \
+            .from_(wallet.get_address()) \
+            .to(to or self._score_address) \
+            .value(value) \
+            .step_limit(self.STEP_LIMIT) \
+            .method(method) \
+            .params(params) \
+            .build()
+
+        signed_transaction = SignedTransaction(transaction, wallet)
+        tx_result = self.process_transaction(signed_transaction, self.icon_service)
+        self.assertEqual(1, tx_result['status'], tx_result.get('failure'))
+        return tx_result
+
+    def call(self, method: str, params: dict = None):
+        call = CallBuilder().from_(self._test1.get_address()) \
+            .to(self._score_address) \
+            .method(method) \
+            .params(params) \
+            .build()
+        return self.process_call(call, self.icon_service)
+
+    def measure_transaction(self, method: str, params: dict = None, wallet=None, label: str = None,
+                            value: int = 0, to: str = None) -> dict:
+        start = time.perf_counter()
+        tx_result = self.send(method, params, wallet, value, to)
+        elapsed = time.perf_counter() - start
+
+        self._check(self._name(method, label), _to_int(tx_result['stepUsed']), [elapsed])
+        return tx_result
+
+    def measure_call(self, method: str, params: dict = None, label: str = None):
+        # Readonly calls consume no steps, only their wall time is recorded
+        times = []
+        response = None
+        for _ in range(CALL_REPEAT):
+            start = time.perf_counter()
+            response = self.call(method, params)
+            times.append(time.perf_counter() - start)
+
+        self._check(self._name(method, label), None, times)
+        return response
+
+    def check_batch_step_cost(self, method: str, size: int, params: dict, double_params: dict, wallet=None):
+        # batchStepCost()[method] must match the marginal steps per item measured between a batch
+        # of size items (params) and one of 2 * size items (double_params)
+        steps = _to_int(self.send(method, params, wallet)['stepUsed'])
+        double_steps = _to_int(self.send(method, double_params, wallet)['stepUsed'])
+        measured = (double_steps - steps) / size
+        advertised = _to_int(self.call('batchStepCost')[method])
+        self.assertLessEqual(abs(measured - advertised), advertised * STEP_COST_TOLERANCE,
+                             f'{self.SCORE_NAME}.batchStepCost {method}: advertised {advertised}, '
+                             f'measured {measured:.0f} per item')
+
+    def _name(self, method: str, label: str = None) -> str:
+        name = f'{self.SCORE_NAME}.{method}'
+        return f'{name}[{label}]' if label else name
+
+    def _check(self, name: str, steps: int, times: list):
+        regressions = self.recorder.record(name, steps, times)
+        if regressions:
+            self.fail('\n'.join(regressions))
+
+
+@unittest.skipUnless(LOAD_ENABLED, 'load runs only with BENCH_LOAD=1')
+class ScoreLoadCase(ScoreBenchmarkCase, metaclass=abc.ABCMeta):
+    """
+    Grows the state of a deployed SCORE through LOAD_SIZES and replays an
+    operation mix at each size, recording latency and steps into a LoadCurve.
+
+    Subclasses set MIX ("name:weight,..."), implement populate(start, end)
+    to add synthetic state through the batch endpoints, prepare(count) to
+    fund the operations of one point, and one operation_<name>(rng) per mix
+    entry returning (method, params, readonly). Their test method calls run_load.
+    """
+    MIX = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.curve = LoadCurve(cls.SCORE_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        save_curves(LOAD_OUTPUT, LOAD_LABEL, [cls.curve])
+        super().tearDownClass()
+
+    @abc.abstractmethod
+    def populate(self, start: int, end: int) -> list:
+        # Returns the (method, params) transactions adding state items [start, end)
+        pass
+
+    def prepare(self, count: int) -> None:
+        pass
+
+    def run_load(self):
+        rng = random.Random(LOAD_SEED)
+        mix = parse_mix(self.MIX)
+        names = list(mix)
+        weights = [mix[name] for name in names]
+
+        self.state_size = 0
+        for target in LOAD_SIZES:
+            self.send_bulk(self.populate(self.state_size, target))
+            self.state_size = target
+            self.prepare(LOAD_OPERATIONS)
+            for name in rng.choices(names, weights, k=LOAD_OPERATIONS):
+                method, params, readonly = getattr(self, f'operation_{name}')(rng)
+                start = time.perf_counter()
+                if readonly:
+                    self.call(method, params)
+                    steps = None
+                else:
+                    steps = _to_int(self.send(method, params)['stepUsed'])
+                self.curve.add(self.state_size, name, time.perf_counter() - start, steps)
+
+    def send_bulk(self, calls: list) -> None:
+        # Pre-population goes LOAD_BULK_SIZE transactions per block to keep setup time down
+        for offset in range(0, len(calls), LOAD_BULK_SIZE):
+            transactions = []
+            for method, params in calls[offset:offset + LOAD_BULK_SIZE]:
+                transaction = CallTransactionBuilder() \
+                    .from_(self._test1.get_address()) \
+                    .to(self._score_address) \
+                    .step_limit(self.STEP_LIMIT) \
+                    .method(method) \
+                    .params(params) \
+                    .build()
+                transactions.append(SignedTransaction(transaction, self._test1))
+            for tx_result in self.process_transaction_bulk(transactions, self.icon_service):
+                self.assertEqual(1, tx_result['status'], tx_result.get('failure'))
+
+
+def synthetic_address(index: int) -> str:
+    # Deterministic EOA addresses for synthetic holders, no wallet needed to receive
+    return f'hx{index + 1:040x}'
+
+
+def _to_int(value) -> int:
+    return int(value, 16) if isinstance(value, str) else value
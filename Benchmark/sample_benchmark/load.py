@@ -0,0 +1,111 @@
+import json
+import os
+
+from .recorder import BENCHMARK_PATH, load_results
+
+DEFAULT_CURVES = os.path.join(BENCHMARK_PATH, 'load_curves.json')
+
+
+def parse_sizes(text: str) -> list:
+    # "1000,10000" -> [1000, 10000], always ascending so state only grows between points
+    return sorted(int(size) for size in text.split(',') if size.strip())
+
+
+def parse_mix(text: str) -> dict:
+    # "transfer:8,approve:1" -> {'transfer': 8, 'approve': 1}
+    mix = {}
+    for entry in text.split(','):
+        if not entry.strip():
+            continue
+        name, _, weight = entry.partition(':')
+        mix[name.strip()] = int(weight) if weight else 1
+    return mix
+
+
+def percentile(values: list, fraction: float):
+    # Nearest-rank percentile, None for an empty sample
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+
+class LoadCurve:
+    """
+    Latency and step samples of an operation mix, grouped by state size.
+
+    Each point summarizes one state size as
+    {"throughput_ops": ..., "operations": {"<name>": {"count": ..., "p50_ms": ...,
+    "p99_ms": ..., "p50_steps": ..., "p99_steps": ...}}}.
+    Readonly operations consume no steps and report None for them.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._samples = {}
+
+    def add(self, state_size: int, operation: str, elapsed: float, steps: int = None) -> None:
+        samples = self._samples.setdefault(state_size, {}).setdefault(operation, ([], []))
+        samples[0].append(elapsed)
+        if steps is not None:
+            samples[1].append(steps)
+
+    def point(self, state_size: int) -> dict:
+        operations = {}
+        total_time = 0.0
+        total_count = 0
+        for operation, (times, steps) in sorted(self._samples.get(state_size, {}).items()):
+            total_time += sum(times)
+            total_count += len(times)
+            operations[operation] = {
+                'count': len(times),
+                'p50_ms': _ms(percentile(times, 0.5)),
+                'p99_ms': _ms(percentile(times, 0.99)),
+                'p50_steps': percentile(steps, 0.5),
+                'p99_steps': percentile(steps, 0.99),
+            }
+        return {
+            'throughput_ops': round(total_count / total_time, 2) if total_time else None,
+            'operations': operations,
+        }
+
+    def to_dict(self) -> dict:
+        # JSON object keys are strings, state sizes included
+        return {str(size): self.point(size) for size in sorted(self._samples)}
+
+
+def save_curves(path: str, label: str, curves: list) -> None:
+    """
+    Stores curves under label (e.g. a release tag), keeping the curves of
+    other labels and other SCOREs already in the file.
+    """
+    stored = load_results(path)
+    entry = stored.setdefault(label, {})
+    for curve in curves:
+        entry[curve.name] = curve.to_dict()
+    with open(path, 'w') as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare_curves(before: dict, after: dict, metric: str = 'p50_steps', threshold: float = 0.0) -> list:
+    """
+    Compares two labels of a curves file, returning one line per
+    (curve, state size, operation) whose metric grew by more than threshold.
+    """
+    changes = []
+    for name, points in sorted(after.items()):
+        for size, point in sorted(points.items(), key=lambda item: int(item[0])):
+            previous = before.get(name, {}).get(size, {}).get('operations', {})
+            for operation, stats in sorted(point['operations'].items()):
+                old = previous.get(operation, {}).get(metric)
+                new = stats.get(metric)
+                if old and new is not None and new > old * (1 + threshold):
+                    changes.append(f'{name}[{size}].{operation}: {metric} {old} -> {new} '
+                                   f'(+{(new - old) / old:.1%})')
+    return changes
+
+
+def _ms(seconds: float):
+    return None if seconds is None else round(seconds * 1000, 3)
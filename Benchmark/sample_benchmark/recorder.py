@@ -0,0 +1,102 @@
+import json
+import os
+import statistics
+
+DIR_PATH = os.path.abspath(os.path.dirname(__file__))
+BENCHMARK_PATH = os.path.abspath(os.path.join(DIR_PATH, '..'))
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_PATH, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_PATH, 'bench_results.json')
+
+
+class BenchmarkRecorder:
+    """
+    Collects step usage and wall time per SCORE method call and compares
+    them against a stored baseline.
+
+    Results are keyed by "<ScoreName>.<method>" (plus an optional label for
+    variants such as batch sizes) and saved as JSON, e.g.
+    {"SampleIrc3.transfer": {"steps": 123456, "time_ms": 1.52}}
+    """
+
+    def __init__(self,
+                 baseline_path: str = DEFAULT_BASELINE,
+                 output_path: str = DEFAULT_OUTPUT,
+                 step_threshold: float = 0.05,
+                 time_threshold: float = None,
+                 update_baseline: bool = False):
+        self.baseline_path = baseline_path
+        self.output_path = output_path
+        self.step_threshold = step_threshold
+        self.time_threshold = time_threshold
+        self.update_baseline = update_baseline
+        # None when there is no baseline file, every measurement then fails the gate
+        self.baseline = load_results(baseline_path) if os.path.exists(baseline_path) else None
+        self.results = {}
+
+    @classmethod
+    def from_env(cls) -> 'BenchmarkRecorder':
+        # BENCH_TIME_THRESHOLD is off by default, wall time is too noisy to gate on everywhere
+        time_threshold = os.environ.get('BENCH_TIME_THRESHOLD')
+        return cls(baseline_path=os.environ.get('BENCH_BASELINE', DEFAULT_BASELINE),
+                   output_path=os.environ.get('BENCH_OUTPUT', DEFAULT_OUTPUT),
+                   step_threshold=float(os.environ.get('BENCH_STEP_THRESHOLD', '0.05')),
+                   time_threshold=float(time_threshold) if time_threshold else None,
+                   update_baseline=os.environ.get('BENCH_UPDATE_BASELINE') == '1')
+
+    def record(self, name: str, steps: int = None, times: list = None) -> list:
+        """
+        Records one measurement and returns the list of regressions against
+        the baseline, empty if the measurement is within thresholds.
+        """
+        entry = {'steps': steps}
+        if times:
+            entry['time_ms'] = round(statistics.median(times) * 1000, 3)
+        self.results[name] = entry
+        return self.regressions(name)
+
+    def regressions(self, name: str) -> list:
+        if self.update_baseline:
+            return []
+        if self.baseline is None:
+            return [f'{name}: no baseline at {self.baseline_path}, record one with BENCH_UPDATE_BASELINE=1']
+        if name not in self.baseline:
+            return []
+
+        expected = self.baseline[name]
+        actual = self.results[name]
+        found = []
+        if self.step_threshold is not None:
+            found += _exceeds(name, 'steps', expected, actual, self.step_threshold)
+        if self.time_threshold is not None:
+            found += _exceeds(name, 'time_ms', expected, actual, self.time_threshold)
+        return found
+
+    def save(self) -> None:
+        # Merge into existing files so each benchmark class only rewrites its own entries
+        merge_results(self.output_path, self.results)
+        if self.update_baseline:
+            merge_results(self.baseline_path, self.results)
+
+
+def _exceeds(name: str, metric: str, expected: dict, actual: dict, threshold: float) -> list:
+    before = expected.get(metric)
+    after = actual.get(metric)
+    if before is None or after is None or after <= before * (1 + threshold):
+        return []
+    return [f'{name} {metric} regressed: {before} -> {after} (threshold {threshold:.0%})']
+
+
+def load_results(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def merge_results(path: str, results: dict) -> None:
+    merged = load_results(path)
+    merged.update(results)
+    with open(path, 'w') as f:
+        json.dump(merged, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -0,0 +1,194 @@
+from ..harness import ScoreBenchmarkCase, BENCH_TOKEN_PROJECT, IRC16_PROJECT, BATCH_SIZE, synthetic_address
+
+DECIMALS = 18
+AMOUNT = 100 * 10 ** DECIMALS
+
+
+class TestBenchSampleIRC16(ScoreBenchmarkCase):
+    SCORE_PROJECT = IRC16_PROJECT
+    SCORE_NAME = 'SampleIRC16'
+    DEPLOY_PARAMS = {
+        'name': 'sampleIRC16',
+        'symbol': 'STO',
+        'decimals': DECIMALS,
+        'total_supply': 10000,
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.owner = self._test1.get_address()
+        self.other = self._wallet_array[0].get_address()
+
+    def _issue(self, to: str = None, partition: str = 'default', amount: int = AMOUNT) -> dict:
+        return self.send('issueByPartition', {'_partition': partition, '_to': to or self.owner, '_amount': amount,
+                                       '_data': '0x00'})
+
+    def test_bench_readonly(self):
+        block = self._issue()['blockHeight']
+        self.send('setDocument', {'_name': 'prospectus', '_uri': 'https://example.com/p.pdf', '_document_hash': '00'})
+        self.measure_call('name')
+        self.measure_call('symbol')
+        self.measure_call('decimals')
+        self.measure_call('totalSupply')
+        self.measure_call('balanceOf', {'_owner': self.owner})
+        self.measure_call('balanceOfByPartition', {'_partition': 'default', '_owner': self.owner})
+        self.measure_call('partitionsOf', {'_owner': self.owner})
+        self.measure_call('partitionsOfOwner', {'_owner': self.owner, '_offset': 0, '_limit': 100})
+        self.measure_call('partitionCount', {'_owner': self.owner})
+        self.measure_call('holdersOfPartition', {'_partition': 'default', '_offset': 0, '_limit': 100})
+        self.measure_call('holders', {'_offset': 0, '_limit': 100})
+        self.measure_call('holderCount', {'_partition': 'default'})
+        self.measure_call('totalSupplyByPartition', {'_partition': 'default'})
+        self.measure_call('balanceOfByPartitionAt', {'_partition': 'default', '_owner': self.owner, '_block': block})
+        self.measure_call('issuedSupplyAt', {'_block': block})
+        self.measure_call('getDocument', {'_name': 'prospectus'})
+        self.measure_call('getAllDocuments', {'_offset': 0, '_limit': 100})
+        self.measure_call('isOperator', {'_operator': self.other, '_owner': self.owner})
+        self.measure_call('isOperatorForPartition', {'_partition': 'default', '_operator': self.other,
+                                                     '_owner': self.owner})
+        self.measure_call('canTransferByPartition', {'_partition': 'default', '_from': self.owner,
+                                                     '_to': self.other, '_amount': AMOUNT})
+        self.measure_call('tokenInfo')
+        self.measure_call('issuedSupply')
+        self.measure_call('batchStepCost')
+
+    def test_bench_canTransferByPartitionBatch(self):
+        self._issue()
+        self.measure_call('canTransferByPartitionBatch', {'_partitions': ['default'] * BATCH_SIZE,
+                                                          '_froms': [self.owner] * BATCH_SIZE,
+                                                          '_tos': [self.other] * BATCH_SIZE,
+                                                          '_amounts': [AMOUNT // BATCH_SIZE] * BATCH_SIZE},
+                          label=BATCH_SIZE)
+
+    def test_bench_aggregate_reads(self):
+        self._issue()
+        self.measure_call('balancesOf', {'_owners': [self.owner, self.other] * (BATCH_SIZE // 2)}, label=BATCH_SIZE)
+        self.measure_call('balancesOfByPartition', {'_owner': self.owner,
+                                                    '_partitions': [f'partition{i}' for i in range(BATCH_SIZE)]},
+                          label=BATCH_SIZE)
+
+    def test_bench_setDocument(self):
+        self.measure_transaction('setDocument', {'_name': 'prospectus', '_uri': 'https://example.com/p.pdf',
+                                                 '_document_hash': '00'})
+        self.measure_transaction('removeDocument', {'_name': 'prospectus'})
+
+    def test_bench_issueByPartition(self):
+        self.measure_transaction('issueByPartition', {'_partition': 'default', '_to': self.owner, '_amount': AMOUNT,
+                                                      '_data': '0x00'})
+
+    def test_bench_issueByPartitionBatch(self):
+        holders = [self._wallet_array[i % len(self._wallet_array)].get_address() for i in range(BATCH_SIZE)]
+        self.measure_transaction('issueByPartitionBatch', {'_partitions': ['default'] * BATCH_SIZE, '_holders': holders,
+                                                           '_amounts': [AMOUNT] * BATCH_SIZE, '_data': '0x00'},
+                                 label=BATCH_SIZE)
+
+    def test_bench_issueByPartitionBatch_step_cost(self):
+        # Fresh holders, so every entry credits a new holder
+        n = BATCH_SIZE
+        self.check_batch_step_cost('issueByPartitionBatch', n,
+                                   {'_partitions': ['default'] * n, '_holders': [synthetic_address(i) for i in range(n)],
+                                    '_amounts': [1] * n, '_data': '0x00'},
+                                   {'_partitions': ['default'] * (2 * n),
+                                    '_holders': [synthetic_address(i) for i in range(n, 3 * n)],
+                                    '_amounts': [1] * (2 * n), '_data': '0x00'})
+
+    def test_bench_transferByPartition(self):
+        self._issue()
+        self.measure_transaction('transferByPartition', {'_partition': 'default', '_to': self.other,
+                                                         '_amount': AMOUNT // 2, '_data': '0x00'})
+
+    def test_bench_transferByPartitionBatch(self):
+        self._issue()
+        recipients = [self._wallet_array[i % len(self._wallet_array)].get_address() for i in range(BATCH_SIZE)]
+        self.measure_transaction('transferByPartitionBatch', {'_partition': 'default', '_recipients': recipients,
+                                                              '_amounts': [AMOUNT // BATCH_SIZE] * BATCH_SIZE,
+                                                              '_data': '0x00'}, label=BATCH_SIZE)
+
+    def test_bench_transferByPartitionBatch_step_cost(self):
+        # Fresh recipients, so every entry credits a new holder
+        self._issue()
+        n = BATCH_SIZE
+        self.check_batch_step_cost('transferByPartitionBatch', n,
+                                   {'_partition': 'default', '_recipients': [synthetic_address(i) for i in range(n)],
+                                    '_amounts': [1] * n, '_data': '0x00'},
+                                   {'_partition': 'default',
+                                    '_recipients': [synthetic_address(i) for i in range(n, 3 * n)],
+                                    '_amounts': [1] * (2 * n), '_data': '0x00'})
+
+    def test_bench_operators(self):
+        self.measure_transaction('authorizeOperator', {'_operator': self.other})
+        self.measure_transaction('revokeOperator', {'_operator': self.other})
+        self.measure_transaction('authorizeOperatorForPartition', {'_partition': 'default', '_operator': self.other})
+        self.measure_transaction('revokeOperatorForPartition', {'_partition': 'default', '_operator': self.other})
+        partitions = [f'partition{i}' for i in range(BATCH_SIZE)]
+        self.measure_transaction('authorizeOperatorForPartitions', {'_partitions': partitions, '_operator': self.other},
+                                 label=BATCH_SIZE)
+        self.measure_transaction('revokeOperatorForPartitions', {'_partitions': partitions, '_operator': self.other},
+                                 label=BATCH_SIZE)
+
+    def test_bench_operatorTransferByPartition(self):
+        self._issue()
+        self.send('authorizeOperatorForPartition', {'_partition': 'default', '_operator': self.other})
+        self.measure_transaction('operatorTransferByPartition', {'_partition': 'default', '_from': self.owner,
+                                                                 '_to': self.other, '_amount': AMOUNT // 2,
+                                                                 '_data': '0x00'},
+                                 wallet=self._wallet_array[0])
+
+    def test_bench_redeemByPartition(self):
+        self._issue()
+        self.measure_transaction('redeemByPartition', {'_partition': 'default', '_amount': AMOUNT // 2,
+                                                       '_data': '0x00'})
+
+    def test_bench_operatorRedeemByPartition(self):
+        self._issue()
+        self.send('authorizeOperator', {'_operator': self.other})
+        self.measure_transaction('operatorRedeemByPartition', {'_partition': 'default', '_owner': self.owner,
+                                                               '_amount': AMOUNT // 2, '_data': '0x00'},
+                                 wallet=self._wallet_array[0])
+
+    def test_bench_dividends(self):
+        self._issue()
+        self._issue(self.other)
+        self.measure_transaction('depositDividend', {'_partition': 'default'}, value=10 ** 18)
+        self.measure_call('dividendOf', {'_owner': self.owner, '_partition': 'default'})
+        # A transfer settles both parties before moving the balance
+        self.measure_transaction('transferByPartition', {'_partition': 'default', '_to': self.other,
+                                                         '_amount': AMOUNT // 2, '_data': '0x00'},
+                                 label='settled')
+        self.measure_transaction('claimDividend', {'_partition': 'default'})
+
+    def test_bench_eventDataMode(self):
+        self._issue()
+        self.measure_call('eventDataMode')
+        self.measure_transaction('transferByPartition', {'_partition': 'default', '_to': self.other,
+                                                         '_amount': AMOUNT // 4, '_data': '0x' + '00' * 1024},
+                                 label='data1k')
+        self.measure_transaction('setEventDataMode', {'_mode': 1})
+        # The event carries the 32-byte hash of _data instead
+        self.measure_transaction('transferByPartition', {'_partition': 'default', '_to': self.other,
+                                                         '_amount': AMOUNT // 4, '_data': '0x' + '00' * 1024},
+                                 label='data1k_hashed')
+
+    def test_bench_tokenFallback(self):
+        self._issue()
+        self._issue(self.other)
+        token = self._deploy_score(project=BENCH_TOKEN_PROJECT, params={'_initialSupply': AMOUNT})['scoreAddress']
+        self.measure_transaction('addDividendToken', {'_token': token})
+        self.measure_call('isDividendToken', {'_token': token})
+        # IRC2 deposit, the steps include the token's own transfer before it calls tokenFallback
+        self.measure_transaction('transfer', {'_to': self._score_address, '_value': AMOUNT,
+                                              '_data': '0x' + b'default'.hex()},
+                                 to=token, label='tokenFallback')
+        self.measure_call('dividendTokens', {'_partition': 'default'})
+        self.measure_transaction('claimDividend', {'_partition': 'default', '_token': token}, label='token')
+        self.measure_transaction('removeDividendToken', {'_token': token})
+
+    def test_bench_migration(self):
+        holders = [synthetic_address(i) for i in range(BATCH_SIZE)]
+        self.send('issueByPartitionBatch', {'_partitions': ['default'] * BATCH_SIZE, '_holders': holders,
+                                            '_amounts': [AMOUNT] * BATCH_SIZE, '_data': '0x00'})
+        self._deploy_score(self._score_address, params={'_legacyHoldings': True})
+        self.measure_call('migrationStatus')
+        self.measure_transaction('queueLegacyHoldings', {'_owners': holders, '_partitions': ['default'] * BATCH_SIZE,
+                                                         '_complete': True}, label=BATCH_SIZE)
+        self.measure_transaction('runMigration', {'_maxItems': BATCH_SIZE}, label=BATCH_SIZE)
@@ -0,0 +1,121 @@
+from ..harness import ScoreBenchmarkCase, IRC3_PROJECT, BATCH_SIZE, synthetic_address
+
+RANGE_SIZE = 10_000
+
+
+class TestBenchSampleIrc3(ScoreBenchmarkCase):
+    SCORE_PROJECT = IRC3_PROJECT
+    SCORE_NAME = 'SampleIrc3'
+
+    def setUp(self):
+        super().setUp()
+        self.owner = self._test1.get_address()
+        self.other = self._wallet_array[0].get_address()
+
+    def _mint(self, token_ids: list, to: str = None):
+        self.send('mintBatch', {'_to': to or self.owner, '_tokenIds': token_ids})
+
+    def test_bench_readonly(self):
+        self._mint([1, 2])
+        self.measure_call('name')
+        self.measure_call('symbol')
+        self.measure_call('balanceOf', {'_owner': self.owner})
+        self.measure_call('ownerOf', {'_tokenId': 1})
+        self.measure_call('getApproved', {'_tokenId': 1})
+        self.measure_call('isApprovedForAll', {'_owner': self.owner, '_operator': self.other})
+        self.measure_call('totalSupply')
+        self.measure_call('tokenByIndex', {'_index': 0})
+        self.measure_call('tokenOfOwnerByIndex', {'_owner': self.owner, '_index': 1})
+        self.measure_call('tokensOfOwner', {'_owner': self.owner, '_offset': 0, '_limit': 2})
+        self.measure_call('batchStepCost')
+        self.measure_call('lazyRunsOf', {'_owner': self.owner})
+
+    def test_bench_aggregate_reads(self):
+        token_ids = list(range(1, BATCH_SIZE + 1))
+        self._mint(token_ids)
+        self.measure_call('ownersOf', {'_tokenIds': token_ids}, label=BATCH_SIZE)
+        self.measure_call('approvalsOf', {'_tokenIds': token_ids}, label=BATCH_SIZE)
+        self.measure_call('balancesOf', {'_owners': [self.owner, self.other] * (BATCH_SIZE // 2)}, label=BATCH_SIZE)
+
+    def test_bench_mint(self):
+        self.measure_transaction('mint', {'_to': self.owner, '_tokenId': 1})
+
+    def test_bench_mintBatch(self):
+        token_ids = list(range(1, BATCH_SIZE + 1))
+        self.measure_transaction('mintBatch', {'_to': self.owner, '_tokenIds': token_ids}, label=BATCH_SIZE)
+
+    def test_bench_mintBatchTo(self):
+        token_ids = list(range(1, BATCH_SIZE + 1))
+        recipients = [self._wallet_array[i % len(self._wallet_array)].get_address() for i in token_ids]
+        self.measure_transaction('mintBatchTo', {'_recipients': recipients, '_tokenIds': token_ids}, label=BATCH_SIZE)
+
+    def test_bench_mintRange(self):
+        self.measure_transaction('mintRange', {'_to': self.owner, '_startId': 1, '_count': RANGE_SIZE},
+                                 label=RANGE_SIZE)
+
+    def test_bench_transfer_from_range(self):
+        # First transfer out of a run writes the token entry and splits the run
+        self.send('mintRange', {'_to': self.owner, '_startId': 1, '_count': RANGE_SIZE})
+        self.measure_call('ownerOf', {'_tokenId': 31}, label='range')
+        self.measure_transaction('transfer', {'_to': self.other, '_tokenId': 31}, label='range')
+
+    def test_bench_approve(self):
+        self._mint([1])
+        self.measure_transaction('approve', {'_to': self.other, '_tokenId': 1})
+
+    def test_bench_setApprovalForAll(self):
+        self.measure_transaction('setApprovalForAll', {'_operator': self.other, '_approved': True})
+
+    def test_bench_transfer(self):
+        self._mint([1])
+        self.measure_transaction('transfer', {'_to': self.other, '_tokenId': 1})
+
+    def test_bench_transferFrom(self):
+        self._mint([1])
+        self.send('approve', {'_to': self.other, '_tokenId': 1})
+        self.measure_transaction('transferFrom', {'_from': self.owner, '_to': self.other, '_tokenId': 1},
+                                 wallet=self._wallet_array[0])
+
+    def test_bench_transferBatch(self):
+        token_ids = list(range(1, BATCH_SIZE + 1))
+        self._mint(token_ids)
+        self.measure_transaction('transferBatch', {'_to': self.other, '_tokenIds': token_ids}, label=BATCH_SIZE)
+
+    def test_bench_transferFromBatch(self):
+        token_ids = list(range(1, BATCH_SIZE + 1))
+        self._mint(token_ids)
+        self.send('setApprovalForAll', {'_operator': self.other, '_approved': True})
+        self.measure_transaction('transferFromBatch', {'_from': self.owner, '_to': self.other, '_tokenIds': token_ids},
+                                 wallet=self._wallet_array[0], label=BATCH_SIZE)
+
+    def test_bench_batchStepCost(self):
+        n = BATCH_SIZE
+        self.check_batch_step_cost('mintBatch', n, {'_to': self.owner, '_tokenIds': list(range(1, n + 1))},
+                                   {'_to': self.owner, '_tokenIds': list(range(n + 1, 3 * n + 1))})
+        self.check_batch_step_cost('mintBatchTo', n,
+                                   {'_recipients': [synthetic_address(i) for i in range(n)],
+                                    '_tokenIds': list(range(3 * n + 1, 4 * n + 1))},
+                                   {'_recipients': [synthetic_address(i) for i in range(n, 3 * n)],
+                                    '_tokenIds': list(range(4 * n + 1, 6 * n + 1))})
+        self.check_batch_step_cost('transferBatch', n, {'_to': self.other, '_tokenIds': list(range(1, n + 1))},
+                                   {'_to': self.other, '_tokenIds': list(range(n + 1, 3 * n + 1))})
+        self.send('setApprovalForAll', {'_operator': self.owner, '_approved': True}, wallet=self._wallet_array[0])
+        self.check_batch_step_cost('transferFromBatch', n,
+                                   {'_from': self.other, '_to': self.owner, '_tokenIds': list(range(1, n + 1))},
+                                   {'_from': self.other, '_to': self.owner, '_tokenIds': list(range(n + 1, 3 * n + 1))})
+        start = 6 * n + 1
+        self.check_batch_step_cost('mintRange', RANGE_SIZE, {'_to': self.owner, '_startId': start, '_count': RANGE_SIZE},
+                                   {'_to': self.owner, '_startId': start + RANGE_SIZE, '_count': 2 * RANGE_SIZE})
+
+    def test_bench_burn(self):
+        self._mint([1])
+        self.measure_transaction('burn', {'_tokenId': 1})
+
+    def test_bench_migration(self):
+        token_ids = list(range(1, BATCH_SIZE + 1))
+        self._mint(token_ids)
+        self._deploy_score(self._score_address, params={'_packedLayout': True, '_legacyTokens': True})
+        self.measure_call('migrationStatus')
+        self.measure_transaction('queueLegacyTokens', {'_tokenIds': token_ids, '_complete': True}, label=BATCH_SIZE)
+        # legacyTokens finds every token enumerated already, packedLayout converts each of them
+        self.measure_transaction('runMigration', {'_maxItems': 2 * BATCH_SIZE}, label=2 * BATCH_SIZE)
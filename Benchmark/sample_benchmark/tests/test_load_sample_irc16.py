@@ -0,0 +1,69 @@
+import os
+
+from ..harness import ScoreLoadCase, IRC16_PROJECT, synthetic_address
+
+PARTITIONS = int(os.environ.get('BENCH_LOAD_PARTITIONS', '100'))
+CHUNK = 500  # Holders per issuance call, the SCORE's batch limit
+HOLDING = 1000  # Amount issued to each synthetic holder
+
+
+class TestLoadSampleIRC16(ScoreLoadCase):
+    # State size is the number of synthetic holders, spread over PARTITIONS partitions
+    SCORE_PROJECT = IRC16_PROJECT
+    SCORE_NAME = 'SampleIRC16'
+    DEPLOY_PARAMS = {
+        'name': 'sampleIRC16',
+        'symbol': 'STO',
+        'decimals': 0,
+        'total_supply': 10 ** 15,
+    }
+    MIX = os.environ.get('BENCH_LOAD_IRC16_MIX',
+                         'transferByPartition:6,issueByPartition:1,redeemByPartition:1,balanceOfByPartition:1,'
+                         'canTransferByPartition:1')
+
+    def setUp(self):
+        super().setUp()
+        self.owner = self._test1.get_address()
+
+    def populate(self, start: int, end: int) -> list:
+        calls = []
+        for first in range(start, end, CHUNK):
+            holders = range(first, min(end, first + CHUNK))
+            calls.append(('issueByPartitionBatch', {'_partitions': [self._partition(i) for i in holders],
+                                                    '_holders': [synthetic_address(i) for i in holders],
+                                                    '_amounts': [HOLDING] * len(holders)}))
+        return calls
+
+    def prepare(self, count: int):
+        # Balance of the signing wallet, spent by transfer and redeem
+        self.send('issueByPartition', {'_partition': self._partition(0), '_to': self.owner, '_amount': count,
+                                       '_data': '0x00'})
+
+    def operation_transferByPartition(self, rng) -> tuple:
+        return 'transferByPartition', {'_partition': self._partition(0), '_amount': 1, '_data': '0x00',
+                                       '_to': synthetic_address(rng.randrange(self.state_size))}, False
+
+    def operation_issueByPartition(self, rng) -> tuple:
+        holder = rng.randrange(self.state_size)
+        return 'issueByPartition', {'_partition': self._partition(holder), '_to': synthetic_address(holder),
+                                    '_amount': 1, '_data': '0x00'}, False
+
+    def operation_redeemByPartition(self, rng) -> tuple:
+        return 'redeemByPartition', {'_partition': self._partition(0), '_amount': 1, '_data': '0x00'}, False
+
+    def operation_balanceOfByPartition(self, rng) -> tuple:
+        holder = rng.randrange(self.state_size)
+        return 'balanceOfByPartition', {'_partition': self._partition(holder),
+                                        '_owner': synthetic_address(holder)}, True
+
+    def operation_canTransferByPartition(self, rng) -> tuple:
+        holder = rng.randrange(self.state_size)
+        return 'canTransferByPartition', {'_partition': self._partition(holder), '_from': synthetic_address(holder),
+                                          '_to': self.owner, '_amount': 1}, True
+
+    def test_load_curve(self):
+        self.run_load()
+
+    @staticmethod
+    def _partition(index: int) -> str:
+        return f'partition{index % PARTITIONS}'
@@ -0,0 +1,54 @@
+import os
+
+from ..harness import ScoreLoadCase, IRC3_PROJECT, synthetic_address
+
+HOLDERS = int(os.environ.get('BENCH_LOAD_HOLDERS', '10000'))
+CHUNK = 500  # Tokens per mint call, the SCORE's batch limit
+POOL_START = 10 ** 12  # Ids of the tokens minted to the signing wallet, above any synthetic id
+
+
+class TestLoadSampleIrc3(ScoreLoadCase):
+    # State size is the number of minted tokens, spread over HOLDERS synthetic owners
+    SCORE_PROJECT = IRC3_PROJECT
+    SCORE_NAME = 'SampleIrc3'
+    MIX = os.environ.get('BENCH_LOAD_IRC3_MIX', 'transfer:6,approve:2,ownerOf:1,balanceOf:1')
+
+    def setUp(self):
+        super().setUp()
+        self.owner = self._test1.get_address()
+        self.pool = []
+        self.next_pool_id = POOL_START
+
+    def populate(self, start: int, end: int) -> list:
+        calls = []
+        for first in range(start, end, CHUNK):
+            token_ids = list(range(first + 1, min(end, first + CHUNK) + 1))
+            recipients = [synthetic_address(token_id % HOLDERS) for token_id in token_ids]
+            calls.append(('mintBatchTo', {'_recipients': recipients, '_tokenIds': token_ids}))
+        return calls
+
+    def prepare(self, count: int):
+        # Tokens of the signing wallet, spent by transfer and approve
+        calls = []
+        for first in range(self.next_pool_id, self.next_pool_id + count, CHUNK):
+            token_ids = list(range(first, min(self.next_pool_id + count, first + CHUNK)))
+            calls.append(('mintBatch', {'_to': self.owner, '_tokenIds': token_ids}))
+            self.pool += token_ids
+        self.next_pool_id += count
+        self.send_bulk(calls)
+
+    def operation_transfer(self, rng) -> tuple:
+        token_id = self.pool.pop(rng.randrange(len(self.pool)))
+        return 'transfer', {'_to': synthetic_address(rng.randrange(HOLDERS)), '_tokenId': token_id}, False
+
+    def operation_approve(self, rng) -> tuple:
+        return 'approve', {'_to': synthetic_address(rng.randrange(HOLDERS)), '_tokenId': rng.choice(self.pool)}, False
+
+    def operation_ownerOf(self, rng) -> tuple:
+        return 'ownerOf', {'_tokenId': rng.randrange(self.state_size) + 1}, True
+
+    def operation_balanceOf(self, rng) -> tuple:
+        return 'balanceOf', {'_owner': synthetic_address(rng.randrange(HOLDERS))}, True
+
+    def test_load_curve(self):
+        self.run_load()
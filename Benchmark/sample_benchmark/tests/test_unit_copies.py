@@ -0,0 +1,21 @@
+import filecmp
+import os
+import unittest
+
+REPO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+IRC3_PROJECT = os.path.join(REPO_PATH, 'IRC3', 'sample_irc3')
+IRC16_PROJECT = os.path.join(REPO_PATH, 'IRC16', 'sample_irc16')
+
+# Modules each SCORE package carries its own copy of, as a SCORE is deployed from its own directory
+SHARED_MODULES = ('storage_cache.py', 'instrumentation.py', 'migration.py')
+
+
+class TestSharedModuleCopies(unittest.TestCase):
+
+    def test_copies_identical(self):
+        for module in SHARED_MODULES:
+            with self.subTest(module=module):
+                self.assertTrue(filecmp.cmp(os.path.join(IRC3_PROJECT, module), os.path.join(IRC16_PROJECT, module),
+                                            shallow=False),
+                                f'IRC3/sample_irc3/{module} and IRC16/sample_irc16/{module} differ, '
+                                f'apply the change to both copies')
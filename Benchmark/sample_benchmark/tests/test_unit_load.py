@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+
+from ..load import LoadCurve, compare_curves, parse_mix, parse_sizes, percentile, save_curves
+
+
+class TestLoadCurve(unittest.TestCase):
+
+    def test_parsing(self):
+        self.assertEqual([1000, 10000, 100000], parse_sizes('10000, 1000,100000,'))
+        self.assertEqual({'transfer': 8, 'approve': 1, 'ownerOf': 1}, parse_mix('transfer:8, approve:1,ownerOf'))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, percentile(values, 0.5))
+        self.assertEqual(99, percentile(values, 0.99))
+        self.assertEqual(7, percentile([7], 0.99))
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_point(self):
+        curve = LoadCurve('SampleIrc3')
+        for i in range(1, 101):
+            curve.add(1000, 'transfer', 0.001 * i, 1000 + i)
+        curve.add(1000, 'ownerOf', 0.5)
+        point = curve.point(1000)
+        self.assertEqual({'count': 100, 'p50_ms': 50.0, 'p99_ms': 99.0, 'p50_steps': 1050, 'p99_steps': 1099},
+                         point['operations']['transfer'])
+        self.assertIsNone(point['operations']['ownerOf']['p50_steps'])
+        self.assertEqual(round(101 / 5.55, 2), point['throughput_ops'])
+
+    def test_save_and_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'curves.json')
+            before = LoadCurve('SampleIrc3')
+            before.add(1000, 'transfer', 0.001, 1000)
+            save_curves(path, 'v1', [before])
+            after = LoadCurve('SampleIrc3')
+            after.add(1000, 'transfer', 0.001, 1200)
+            save_curves(path, 'v2', [after])
+
+            with open(path) as f:
+                stored = json.load(f)
+            self.assertEqual(['v1', 'v2'], sorted(stored))
+            self.assertEqual(1000, stored['v1']['SampleIrc3']['1000']['operations']['transfer']['p50_steps'])
+
+            changes = compare_curves(stored['v1'], stored['v2'], threshold=0.1)
+            self.assertEqual(['SampleIrc3[1000].transfer: p50_steps 1000 -> 1200 (+20.0%)'], changes)
+            self.assertEqual([], compare_curves(stored['v1'], stored['v2'], threshold=0.5))
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import unittest
+
+from ..recorder import BenchmarkRecorder
+
+
+class TestBenchmarkRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.baseline_path = os.path.join(self.dir.name, 'baseline.json')
+        self.output_path = os.path.join(self.dir.name, 'results.json')
+        with open(self.baseline_path, 'w') as f:
+            json.dump({'SampleIrc3.transfer': {'steps': 1000, 'time_ms': 1.0}}, f)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _recorder(self, **kwargs) -> BenchmarkRecorder:
+        return BenchmarkRecorder(self.baseline_path, self.output_path, **kwargs)
+
+    def test_within_threshold(self):
+        recorder = self._recorder(step_threshold=0.05)
+        self.assertEqual([], recorder.record('SampleIrc3.transfer', 1050, [0.004]))
+
+    def test_step_regression(self):
+        recorder = self._recorder(step_threshold=0.05)
+        regressions = recorder.record('SampleIrc3.transfer', 1051, [0.001])
+        self.assertEqual(1, len(regressions))
+        self.assertIn('steps regressed: 1000 -> 1051', regressions[0])
+
+    def test_time_regression_only_when_enabled(self):
+        self.assertEqual([], self._recorder().record('SampleIrc3.transfer', 1000, [0.01]))
+        regressions = self._recorder(time_threshold=0.5).record('SampleIrc3.transfer', 1000, [0.01])
+        self.assertIn('time_ms regressed', regressions[0])
+
+    def test_unknown_method_is_recorded(self):
+        recorder = self._recorder()
+        self.assertEqual([], recorder.record('SampleIrc3.mint', 500))
+        recorder.save()
+        with open(self.output_path) as f:
+            self.assertEqual({'SampleIrc3.mint': {'steps': 500}}, json.load(f))
+
+    def test_missing_baseline_fails(self):
+        os.remove(self.baseline_path)
+        regressions = self._recorder().record('SampleIrc3.transfer', 1000, [0.001])
+        self.assertEqual(1, len(regressions))
+        self.assertIn('no baseline at', regressions[0])
+        self.assertEqual([], self._recorder(update_baseline=True).record('SampleIrc3.transfer', 1000))
+
+    def test_update_baseline(self):
+        recorder = self._recorder(update_baseline=True)
+        self.assertEqual([], recorder.record('SampleIrc3.transfer', 5000, [0.002]))
+        recorder.save()
+        with open(self.baseline_path) as f:
+            self.assertEqual({'steps': 5000, 'time_ms': 2.0}, json.load(f)['SampleIrc3.transfer'])
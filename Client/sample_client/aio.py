@@ -0,0 +1,171 @@
+import asyncio
+import itertools
+import random
+
+import aiohttp
+
+from .rpc import RpcError, call_params, encode_param, to_int
+
+# HTTP answers of an overloaded or restarting node, worth retrying
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class AsyncJsonRpcTransport:
+    """
+    asyncio ICON JSON-RPC v3 client over one pooled aiohttp session.
+
+    At most max_concurrency HTTP requests are in flight. batch() packs up to
+    batch_size requests into each JSON-RPC batch request, and falls back to
+    single requests for the rest of the session once the node rejects one.
+    Connection errors, timeouts and 429 / 5xx answers are retried up to
+    retries times, with exponential backoff and jitter from backoff seconds.
+
+        async with AsyncJsonRpcTransport('http://127.0.0.1:9000/api/v3') as transport:
+            ...
+    """
+
+    def __init__(self, url: str, max_concurrency: int = 16, batch_size: int = 100, retries: int = 3,
+                 backoff: float = 0.1, timeout: float = 10.0):
+        self._url = url
+        self._max_concurrency = max_concurrency
+        self._batch_size = batch_size
+        self._retries = retries
+        self._backoff = backoff
+        self._timeout = timeout
+        self._ids = itertools.count(1)
+        self._batch_supported = True
+        self._semaphore = None
+        self._session = None
+
+    async def __aenter__(self) -> 'AsyncJsonRpcTransport':
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self._max_concurrency),
+                                              timeout=aiohttp.ClientTimeout(total=self._timeout))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def batch_supported(self) -> bool:
+        # False once the node rejected a batch request
+        return self._batch_supported
+
+    async def request(self, method: str, params: dict = None):
+        return _result(await self._post(self._payload(method, params)))
+
+    async def batch(self, requests: list, return_exceptions: bool = False) -> list:
+        """
+        Sends [(method, params), ...] and returns the results in request order.
+        With return_exceptions, a request the node answers with an error gets
+        its RpcError in place instead of failing the whole batch.
+        """
+        chunks = [requests[i:i + self._batch_size] for i in range(0, len(requests), self._batch_size)]
+        results = [result for chunk in await asyncio.gather(*map(self._send_chunk, chunks)) for result in chunk]
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, RpcError):
+                    raise result
+        return results
+
+    async def call(self, score: str, method: str, params: dict = None):
+        return await self.request('icx_call', call_params(score, method, params))
+
+    async def call_many(self, score: str, calls: list, return_exceptions: bool = False) -> list:
+        # [(method, params), ...] of readonly calls, params already encoded
+        return await self.batch([('icx_call', call_params(score, method, params)) for method, params in calls],
+                                return_exceptions)
+
+    async def _send_chunk(self, chunk: list) -> list:
+        if self._batch_supported and len(chunk) > 1:
+            payloads = [self._payload(method, params) for method, params in chunk]
+            response = await self._post(payloads)
+            if isinstance(response, list):
+                responses = {item['id']: item for item in response}
+                return [_outcome(responses[payload['id']]) for payload in payloads]
+            # A node without batch support answers with a single error object
+            self._batch_supported = False
+        return await asyncio.gather(*(self._send_one(method, params) for method, params in chunk))
+
+    async def _send_one(self, method: str, params: dict):
+        return _outcome(await self._post(self._payload(method, params)))
+
+    def _payload(self, method: str, params: dict) -> dict:
+        payload = {'jsonrpc': '2.0', 'id': next(self._ids), 'method': method}
+        if params is not None:
+            payload['params'] = params
+        return payload
+
+    async def _post(self, payload):
+        for attempt in itertools.count():
+            try:
+                async with self._semaphore:
+                    async with self._session.post(self._url, json=payload) as response:
+                        if response.status in RETRY_STATUSES:
+                            response.raise_for_status()
+                        # JSON-RPC errors may come with a 4xx status, their body is the answer
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= self._retries:
+                    raise
+            await asyncio.sleep(self._backoff * 2 ** attempt * random.uniform(0.5, 1.0))
+
+
+class AsyncReader:
+    """
+    Concurrent readonly calls of one SampleIrc3 or SampleIRC16 SCORE.
+    The sweep methods send one call per item and return {item: result}.
+    """
+
+    def __init__(self, transport: AsyncJsonRpcTransport, score: str):
+        self._transport = transport
+        self._score = score
+
+    async def call(self, method: str, params: dict = None):
+        return await self._transport.call(self._score, method, _encode(params))
+
+    async def call_many(self, calls: list, return_exceptions: bool = False) -> list:
+        return await self._transport.call_many(self._score, [(method, _encode(params)) for method, params in calls],
+                                               return_exceptions)
+
+    async def balance_of(self, owner: str) -> int:
+        return to_int(await self.call('balanceOf', {'_owner': owner}))
+
+    async def balances_of(self, owners: list) -> dict:
+        results = await self.call_many([('balanceOf', {'_owner': owner}) for owner in owners])
+        return {owner: to_int(result) for owner, result in zip(owners, results)}
+
+    async def balances_of_by_partition(self, partition: str, owners: list) -> dict:
+        results = await self.call_many([('balanceOfByPartition', {'_partition': partition, '_owner': owner})
+                                        for owner in owners])
+        return {owner: to_int(result) for owner, result in zip(owners, results)}
+
+    async def owners_of(self, token_ids: list) -> dict:
+        results = await self.call_many([('ownerOf', {'_tokenId': token_id}) for token_id in token_ids])
+        return dict(zip(token_ids, results))
+
+
+def _encode(params: dict) -> dict:
+    return {name: encode_param(value) for name, value in (params or {}).items()}
+
+
+def _outcome(response: dict):
+    # Result of a response, or its error as an RpcError to raise or return in place
+    if 'error' in response:
+        return RpcError(response['error'].get('code'), response['error'].get('message'))
+    return response['result']
+
+
+def _result(response: dict):
+    outcome = _outcome(response)
+    if isinstance(outcome, RpcError):
+        raise outcome
+    return outcome
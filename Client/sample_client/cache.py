@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(method: str, params: dict) -> tuple:
+    return method, tuple(sorted(params.items()))
+
+
+class CallCache:
+    """
+    Bounded LRU cache of readonly call results, keyed by method and params.
+
+    Entries expire ttl seconds after they were stored (never when ttl is
+    None) and the least recently used entry is evicted beyond maxsize.
+    Permanent entries hold values that never change once the SCORE is
+    deployed; they neither expire nor count against maxsize.
+
+    Every invalidation bumps a generation counter. A caller reads it before
+    fetching a value and passes it to put(), so a value fetched before a
+    concurrent invalidation is not stored.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0, clock=time.monotonic):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._permanent = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._permanent)
+
+    def get(self, key: tuple, default=None):
+        with self._lock:
+            if key in self._permanent:
+                self.hits += 1
+                return self._permanent[key]
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: tuple, value, generation: int = None, permanent: bool = False) -> bool:
+        # Returns False when an invalidation happened since generation was read
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            if permanent:
+                self._permanent[key] = value
+                return True
+            expires = None if self._ttl is None else self._clock() + self._ttl
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, key: tuple) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, method: str, predicate) -> None:
+        # Drops the entries of method whose params dict satisfies predicate
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if key[0] == method and predicate(dict(key[1]))]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        # Drops everything but the permanent entries
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
@@ -0,0 +1,201 @@
+from .cache import CallCache, make_key
+from .rpc import encode_param, to_int
+
+# SampleIrc3 events
+TRANSFER = 'Transfer(Address,Address,int)'
+APPROVAL = 'Approval(Address,Address,int)'
+APPROVAL_FOR_ALL = 'ApprovalForAll(Address,Address,bool)'
+MINT_RANGE = 'MintRange(Address,int,int)'
+# SampleIRC16 events
+TRANSFER_BY_PARTITION = 'TransferByPartition(str,Address,Address,Address,int,bytes)'
+ISSUE_BY_PARTITION = 'IssueByPartition(str,Address,int,bytes)'
+REDEEM_BY_PARTITION = 'RedeemByPartition(str,Address,Address,int,bytes)'
+
+IRC3 = 'irc3'
+IRC16 = 'irc16'
+
+# Results fixed at deploy time, cached for the life of the client
+PERMANENT_METHODS = {
+    IRC3: {'name', 'symbol'},
+    IRC16: {'name', 'symbol', 'decimals', 'totalSupply', 'tokenInfo'},
+}
+# Results cached until an event changes them, or the TTL runs out.
+# Any other method is passed through uncached.
+CACHED_METHODS = {
+    IRC3: {'balanceOf', 'ownerOf', 'getApproved', 'isApprovedForAll', 'totalSupply'},
+    IRC16: {'balanceOf', 'balanceOfByPartition', 'partitionsOf', 'totalSupplyByPartition', 'issuedSupply'},
+}
+
+
+class CachingReader:
+    """
+    Readonly client of one SampleIrc3 or SampleIRC16 SCORE, caching call results.
+
+    Cached results are invalidated precisely by the events of new blocks,
+    fetched by sync() or fed with apply_transaction_result(). Each result is
+    fetched after the blocks already synced, so an invalidation from any later
+    block reaches it; the TTL only bounds the staleness when sync() isn't
+    called. A SCORE update may change the permanent results, recreate the
+    client then.
+    """
+
+    def __init__(self, transport, score: str, kind: str, maxsize: int = 10_000, ttl: float = 60.0, clock=None,
+                 cache: CallCache = None):
+        if kind not in PERMANENT_METHODS:
+            raise ValueError(f'Unknown SCORE kind {kind!r}, expected {IRC3!r} or {IRC16!r}')
+        self._transport = transport
+        self._score = score
+        self._permanent = PERMANENT_METHODS[kind]
+        self._cached = CACHED_METHODS[kind]
+        if cache is None:
+            cache = CallCache(maxsize, ttl) if clock is None else CallCache(maxsize, ttl, clock)
+        self._cache = cache
+        self._height = None
+
+    @property
+    def cache(self) -> CallCache:
+        return self._cache
+
+    @property
+    def height(self) -> int:
+        # Last block whose events were applied, None before the first sync()
+        return self._height
+
+    def call(self, method: str, params: dict = None):
+        params = {name: encode_param(value) for name, value in (params or {}).items()}
+        permanent = method in self._permanent
+        if not permanent and method not in self._cached:
+            return self._transport.call(self._score, method, params)
+
+        key = make_key(method, params)
+        missing = object()
+        value = self._cache.get(key, missing)
+        if value is missing:
+            generation = self._cache.generation
+            value = self._transport.call(self._score, method, params)
+            self._cache.put(key, value, generation=generation, permanent=permanent)
+        return value
+
+    # ======================================================================
+    # SCORE methods
+    # ======================================================================
+    def name(self) -> str:
+        return self.call('name')
+
+    def symbol(self) -> str:
+        return self.call('symbol')
+
+    def decimals(self) -> int:
+        return to_int(self.call('decimals'))
+
+    def token_info(self) -> dict:
+        return self.call('tokenInfo')
+
+    def balance_of(self, owner: str) -> int:
+        return to_int(self.call('balanceOf', {'_owner': owner}))
+
+    def owner_of(self, token_id: int) -> str:
+        return self.call('ownerOf', {'_tokenId': token_id})
+
+    def balance_of_by_partition(self, partition: str, owner: str) -> int:
+        return to_int(self.call('balanceOfByPartition', {'_partition': partition, '_owner': owner}))
+
+    # ======================================================================
+    # Invalidation
+    # ======================================================================
+    def sync(self) -> int:
+        """
+        Applies the events of the blocks produced since the last sync, returns
+        the number of applied blocks. The first sync only records the current
+        height, results cached before it are kept until their TTL.
+        """
+        last = to_int(self._transport.request('icx_getLastBlock')['height'])
+        if self._height is None:
+            self._height = last
+            return 0
+
+        count = 0
+        while self._height < last:
+            height = self._height + 1
+            block = self._transport.request('icx_getBlockByHeight', {'height': hex(height)})
+            hashes = [_tx_hash(tx) for tx in block.get('confirmed_transaction_list', [])]
+            results = self._transport.batch([('icx_getTransactionResult', {'txHash': tx_hash})
+                                             for tx_hash in hashes])
+            for result in results:
+                self.apply_transaction_result(result)
+            self._height = height
+            count += 1
+        return count
+
+    def apply_transaction_result(self, result: dict) -> None:
+        if 'status' in result and to_int(result['status']) != 1:
+            return
+        for log in result.get('eventLogs', []):
+            self.apply_event_log(log)
+
+    def apply_event_log(self, log: dict) -> None:
+        if log.get('scoreAddress', self._score) != self._score:
+            return
+        handler = self._HANDLERS.get(log['indexed'][0])
+        if handler is not None:
+            handler(self, log['indexed'][1:] + log.get('data', []))
+
+    def _invalidate(self, method: str, **params) -> None:
+        self._cache.invalidate(make_key(method, params))
+
+    def _on_transfer(self, args: list):
+        from_address, to_address, token_id = args[0], args[1], args[2]
+        self._invalidate('balanceOf', _owner=from_address)
+        self._invalidate('balanceOf', _owner=to_address)
+        self._invalidate('ownerOf', _tokenId=token_id)
+        self._invalidate('getApproved', _tokenId=token_id)
+        self._invalidate('totalSupply')
+
+    def _on_approval(self, args: list):
+        self._invalidate('getApproved', _tokenId=args[2])
+
+    def _on_approval_for_all(self, args: list):
+        self._invalidate('isApprovedForAll', _owner=args[0], _operator=args[1])
+
+    def _on_mint_range(self, args: list):
+        to_address, start_id, count = args[0], to_int(args[1]), to_int(args[2])
+        self._invalidate('balanceOf', _owner=to_address)
+        self._invalidate('totalSupply')
+        self._cache.invalidate_where('ownerOf', lambda params: start_id <= to_int(params['_tokenId']) < start_id + count)
+
+    def _on_transfer_by_partition(self, args: list):
+        partition, from_address, to_address = args[0], args[2], args[3]
+        for owner in (from_address, to_address):
+            self._invalidate_holder(partition, owner)
+
+    def _on_issue_by_partition(self, args: list):
+        partition, to_address = args[0], args[1]
+        self._invalidate_holder(partition, to_address)
+        self._invalidate('totalSupplyByPartition', _partition=partition)
+        self._invalidate('issuedSupply')
+
+    def _on_redeem_by_partition(self, args: list):
+        partition, owner = args[0], args[2]
+        self._invalidate_holder(partition, owner)
+        self._invalidate('totalSupplyByPartition', _partition=partition)
+        self._invalidate('issuedSupply')
+
+    def _invalidate_holder(self, partition: str, owner: str):
+        self._invalidate('balanceOf', _owner=owner)
+        self._invalidate('balanceOfByPartition', _partition=partition, _owner=owner)
+        self._invalidate('partitionsOf', _owner=owner)
+
+    _HANDLERS = {
+        TRANSFER: _on_transfer,
+        APPROVAL: _on_approval,
+        APPROVAL_FOR_ALL: _on_approval_for_all,
+        MINT_RANGE: _on_mint_range,
+        TRANSFER_BY_PARTITION: _on_transfer_by_partition,
+        ISSUE_BY_PARTITION: _on_issue_by_partition,
+        REDEEM_BY_PARTITION: _on_redeem_by_partition,
+    }
+
+
+def _tx_hash(tx: dict) -> str:
+    tx_hash = tx.get('txHash') or tx['tx_hash']
+    return tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
@@ -0,0 +1,83 @@
+import itertools
+import json
+import urllib.request
+
+
+class RpcError(Exception):
+    """
+    Error object returned by the node for a JSON-RPC request.
+    """
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f'{message} ({code})')
+        self.code = code
+        self.message = message
+
+
+class JsonRpcTransport:
+    """
+    Minimal ICON JSON-RPC v3 client over HTTP, e.g.
+    JsonRpcTransport('http://127.0.0.1:9000/api/v3').
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self._url = url
+        self._timeout = timeout
+        self._ids = itertools.count(1)
+
+    def request(self, method: str, params: dict = None):
+        return _result(self._post(self._payload(method, params)))
+
+    def batch(self, requests: list) -> list:
+        # One HTTP round trip for [(method, params), ...], results in request order
+        if not requests:
+            return []
+        payloads = [self._payload(method, params) for method, params in requests]
+        responses = {response['id']: response for response in self._post(payloads)}
+        return [_result(responses[payload['id']]) for payload in payloads]
+
+    def call(self, score: str, method: str, params: dict = None):
+        return self.request('icx_call', call_params(score, method, params))
+
+    def _payload(self, method: str, params: dict) -> dict:
+        payload = {'jsonrpc': '2.0', 'id': next(self._ids), 'method': method}
+        if params is not None:
+            payload['params'] = params
+        return payload
+
+    def _post(self, payload):
+        request = urllib.request.Request(self._url, data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self._timeout) as response:
+            return json.loads(response.read())
+
+
+def call_params(score: str, method: str, params: dict = None) -> dict:
+    # icx_call params of the request iconsdk's CallBuilder builds, params already encoded
+    data = {'method': method}
+    if params:
+        data['params'] = params
+    return {'to': score, 'dataType': 'call', 'data': data}
+
+
+def encode_param(value) -> str:
+    # Encodes a call parameter the way iconsdk does: ints and bools as hex, addresses as strings
+    if isinstance(value, bool):
+        return hex(int(value))
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, bytes):
+        return '0x' + value.hex()
+    return str(value)
+
+
+def to_int(value) -> int:
+    if isinstance(value, int):
+        return value
+    return int(value, 16) if value.lower().lstrip('-').startswith('0x') else int(value)
+
+
+def _result(response: dict):
+    if 'error' in response:
+        raise RpcError(response['error'].get('code'), response['error'].get('message'))
+    return response['result']
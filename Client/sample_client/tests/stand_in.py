@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInNode:
+    """
+    Local JSON-RPC endpoint answering icx_call from a dict of results and
+    serving blocks of transaction results, for client tests.
+
+    results maps (score, method, params as sorted tuple) to the call result.
+    add_block() appends a block whose transactions carry the given results.
+    latency delays every HTTP response, the next fail_requests HTTP requests
+    are answered with 503 and batch requests are rejected unless batch is set.
+    """
+
+    def __init__(self, latency: float = 0.0, batch: bool = True):
+        self.results = {}
+        self.blocks = [[]]
+        self.requests = []
+        self.latency = latency
+        self.batch = batch
+        self.fail_requests = 0
+        self.http_requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}/api/v3'
+
+    def start(self) -> 'StandInNode':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def set_result(self, score: str, method: str, result, **params) -> None:
+        with self._lock:
+            self.results[(score, method, tuple(sorted(params.items())))] = result
+
+    def add_block(self, *tx_results) -> int:
+        with self._lock:
+            height = len(self.blocks)
+            self.blocks.append([dict(result, txHash=f'0x{height:032x}{index:032x}', blockHeight=hex(height))
+                                for index, result in enumerate(tx_results)])
+            return height
+
+    def calls(self, method: str = None) -> list:
+        # icx_call requests received so far, as (method, params)
+        with self._lock:
+            data = [params['data'] for name, params in self.requests if name == 'icx_call']
+        return [(item['method'], item.get('params', {})) for item in data if method in (None, item['method'])]
+
+    def _answer(self, request: dict) -> dict:
+        method, params = request['method'], request.get('params', {})
+        with self._lock:
+            self.requests.append((method, params))
+            try:
+                result = self._dispatch(method, params)
+            except KeyError as e:
+                return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32602, 'message': f'Not found: {e}'}}
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+    def _dispatch(self, method: str, params: dict):
+        if method == 'icx_call':
+            data = params['data']
+            return self.results[(params['to'], data['method'], tuple(sorted(data.get('params', {}).items())))]
+        if method == 'icx_getLastBlock':
+            return {'height': len(self.blocks) - 1}
+        if method == 'icx_getBlockByHeight':
+            height = int(params['height'], 16)
+            return {'height': height,
+                    'confirmed_transaction_list': [{'txHash': tx['txHash']} for tx in self.blocks[height]]}
+        if method == 'icx_getTransactionResult':
+            height = int(params['txHash'][2:34], 16)
+            return next(tx for tx in self.blocks[height] if tx['txHash'] == params['txHash'])
+        raise KeyError(method)
+
+    def _handler(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keeps connections open, as a node behind a load balancer does
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with node._lock:
+                    node.http_requests += 1
+                    node._in_flight += 1
+                    node.max_in_flight = max(node.max_in_flight, node._in_flight)
+                    failing = node.fail_requests > 0
+                    node.fail_requests -= failing
+                if node.latency:
+                    time.sleep(node.latency)
+                with node._lock:
+                    node._in_flight -= 1
+                status = 200
+                if failing:
+                    status, response = 503, {'jsonrpc': '2.0', 'id': None,
+                                             'error': {'code': -32000, 'message': 'Service unavailable'}}
+                elif isinstance(request, list) and not node.batch:
+                    response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600, 'message': 'Invalid request'}}
+                elif isinstance(request, list):
+                    response = [node._answer(item) for item in request]
+                else:
+                    response = node._answer(request)
+                body = json.dumps(response).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import time
+import unittest
+
+from ..rpc import JsonRpcTransport
+from .stand_in import StandInNode
+
+try:
+    import aiohttp
+    from ..aio import AsyncJsonRpcTransport, AsyncReader
+except ImportError:
+    aiohttp = None
+
+IRC16_SCORE = 'cx' + '16' * 20
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+@unittest.skipUnless(os.environ.get('BENCH_CLIENT') == '1', 'set BENCH_CLIENT=1 to run the client benchmark')
+class TestBenchAsyncReader(unittest.TestCase):
+    """
+    Times a balanceOfByPartition sweep over BENCH_CLIENT_HOLDERS holders
+    against a stand-in node answering each HTTP request after
+    BENCH_CLIENT_LATENCY seconds: sequential synchronous calls, then
+    concurrent single calls, then concurrent batches.
+    """
+
+    def setUp(self):
+        self.holders = [f'hx{index:040x}' for index in range(int(os.environ.get('BENCH_CLIENT_HOLDERS', 10_000)))]
+        self.node = StandInNode(latency=float(os.environ.get('BENCH_CLIENT_LATENCY', 0.002))).start()
+        self.addCleanup(self.node.stop)
+        for index, holder in enumerate(self.holders):
+            self.node.set_result(IRC16_SCORE, 'balanceOfByPartition', hex(index), _partition='default', _owner=holder)
+
+    def test_balance_sweep(self):
+        expected = {holder: index for index, holder in enumerate(self.holders)}
+        timings = {}
+
+        transport = JsonRpcTransport(self.node.url)
+        start = time.perf_counter()
+        for holder in self.holders:
+            transport.call(IRC16_SCORE, 'balanceOfByPartition', {'_partition': 'default', '_owner': holder})
+        timings['sequential'] = time.perf_counter() - start
+
+        concurrency = int(os.environ.get('BENCH_CLIENT_CONCURRENCY', 16))
+        for label, batch_size in (('concurrent', 1), ('batched', 100)):
+            start = time.perf_counter()
+            self.assertEqual(expected, asyncio.run(self._sweep(concurrency, batch_size)))
+            timings[label] = time.perf_counter() - start
+
+        for label, elapsed in timings.items():
+            print(f'{label:>10}: {len(self.holders)} balances in {elapsed:.2f}s '
+                  f'({len(self.holders) / elapsed:.0f} calls/s)')
+        self.assertLess(timings['concurrent'], timings['sequential'])
+        self.assertLess(timings['batched'], timings['concurrent'])
+
+    async def _sweep(self, concurrency: int, batch_size: int) -> dict:
+        async with AsyncJsonRpcTransport(self.node.url, max_concurrency=concurrency, batch_size=batch_size) as transport:
+            return await AsyncReader(transport, IRC16_SCORE).balances_of_by_partition('default', self.holders)
@@ -0,0 +1,76 @@
+import unittest
+
+from ..rpc import RpcError
+from .stand_in import StandInNode
+
+try:
+    import aiohttp
+    from ..aio import AsyncJsonRpcTransport, AsyncReader
+except ImportError:
+    aiohttp = None
+
+IRC16_SCORE = 'cx' + '16' * 20
+HOLDERS = [f'hx{index:040x}' for index in range(250)]
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncReader(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.node = StandInNode().start()
+        self.addCleanup(self.node.stop)
+        for index, holder in enumerate(HOLDERS):
+            self.node.set_result(IRC16_SCORE, 'balanceOfByPartition', hex(index), _partition='default', _owner=holder)
+
+    def _transport(self, **kwargs) -> 'AsyncJsonRpcTransport':
+        kwargs.setdefault('backoff', 0.001)
+        return AsyncJsonRpcTransport(self.node.url, **kwargs)
+
+    async def test_batched_sweep(self):
+        async with self._transport(batch_size=100) as transport:
+            balances = await AsyncReader(transport, IRC16_SCORE).balances_of_by_partition('default', HOLDERS)
+        self.assertEqual({holder: index for index, holder in enumerate(HOLDERS)}, balances)
+        self.assertEqual(3, self.node.http_requests)
+
+    async def test_fallback_without_batch_support(self):
+        self.node.batch = False
+        async with self._transport(batch_size=100, max_concurrency=1) as transport:
+            reader = AsyncReader(transport, IRC16_SCORE)
+            balances = await reader.balances_of_by_partition('default', HOLDERS[:10])
+            self.assertFalse(transport.batch_supported)
+            await reader.balances_of_by_partition('default', HOLDERS[:10])
+        self.assertEqual(list(range(10)), list(balances.values()))
+        # One rejected batch, then single requests only
+        self.assertEqual(1 + 20, self.node.http_requests)
+
+    async def test_concurrency_limit(self):
+        self.node.latency = 0.02
+        async with self._transport(batch_size=1, max_concurrency=4) as transport:
+            await AsyncReader(transport, IRC16_SCORE).balances_of_by_partition('default', HOLDERS[:20])
+        self.assertEqual(20, self.node.http_requests)
+        self.assertLessEqual(self.node.max_in_flight, 4)
+        self.assertGreater(self.node.max_in_flight, 1)
+
+    async def test_retry_with_backoff(self):
+        self.node.fail_requests = 2
+        async with self._transport(retries=2) as transport:
+            self.assertEqual('0x7', await AsyncReader(transport, IRC16_SCORE).call(
+                'balanceOfByPartition', {'_partition': 'default', '_owner': HOLDERS[7]}))
+        self.assertEqual(3, self.node.http_requests)
+
+        self.node.fail_requests = 2
+        async with self._transport(retries=1) as transport:
+            with self.assertRaises(aiohttp.ClientResponseError) as e:
+                await transport.request('icx_getLastBlock')
+        self.assertEqual(503, e.exception.status)
+
+    async def test_errors_in_place(self):
+        calls = [('balanceOfByPartition', {'_partition': 'default', '_owner': HOLDERS[1]}),
+                 ('balanceOfByPartition', {'_partition': 'locked', '_owner': HOLDERS[1]})]
+        async with self._transport() as transport:
+            reader = AsyncReader(transport, IRC16_SCORE)
+            results = await reader.call_many(calls, return_exceptions=True)
+            with self.assertRaises(RpcError):
+                await reader.call_many(calls)
+        self.assertEqual('0x1', results[0])
+        self.assertIsInstance(results[1], RpcError)
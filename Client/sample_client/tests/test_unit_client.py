@@ -0,0 +1,168 @@
+import unittest
+
+from ..cache import CallCache, make_key
+from ..client import (
+    CachingReader, IRC3, IRC16,
+    TRANSFER, APPROVAL, MINT_RANGE, TRANSFER_BY_PARTITION, ISSUE_BY_PARTITION
+)
+from ..rpc import JsonRpcTransport, RpcError
+from .stand_in import StandInNode
+
+IRC3_SCORE = 'cx' + '3' * 40
+IRC16_SCORE = 'cx' + '16' * 20
+ZERO = 'hx' + '0' * 40
+ALICE = 'hx' + 'a' * 40
+BOB = 'hx' + 'b' * 40
+
+
+def tx(*logs, status: str = '0x1') -> dict:
+    return {'status': status, 'eventLogs': list(logs)}
+
+
+def log(score: str, signature: str, indexed: list, data: list = None) -> dict:
+    return {'scoreAddress': score, 'indexed': [signature] + indexed, 'data': data or []}
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCallCache(unittest.TestCase):
+
+    def test_lru_and_ttl(self):
+        clock = FakeClock()
+        cache = CallCache(maxsize=2, ttl=10, clock=clock)
+        cache.put(('a', ()), 1)
+        cache.put(('b', ()), 2)
+        self.assertEqual(1, cache.get(('a', ())))
+        cache.put(('c', ()), 3)
+        # b was the least recently used
+        self.assertIsNone(cache.get(('b', ())))
+        self.assertEqual(1, cache.get(('a', ())))
+
+        cache.put(('name', ()), 'SampleIrc3', permanent=True)
+        clock.now = 11
+        self.assertIsNone(cache.get(('a', ())))
+        self.assertEqual('SampleIrc3', cache.get(('name', ())))
+        cache.clear()
+        self.assertEqual('SampleIrc3', cache.get(('name', ())))
+
+    def test_stale_put_is_dropped(self):
+        cache = CallCache()
+        generation = cache.generation
+        cache.invalidate(('a', ()))
+        self.assertFalse(cache.put(('a', ()), 1, generation=generation))
+        self.assertIsNone(cache.get(('a', ())))
+
+
+class TestCachingReader(unittest.TestCase):
+
+    def setUp(self):
+        self.node = StandInNode().start()
+        self.addCleanup(self.node.stop)
+        self.transport = JsonRpcTransport(self.node.url)
+
+    def test_permanent_values(self):
+        self.node.set_result(IRC16_SCORE, 'name', 'IconHouseToken')
+        self.node.set_result(IRC16_SCORE, 'decimals', '0x12')
+        clock = FakeClock()
+        reader = CachingReader(self.transport, IRC16_SCORE, IRC16, ttl=1, clock=clock)
+        for _ in range(3):
+            self.assertEqual('IconHouseToken', reader.name())
+            self.assertEqual(18, reader.decimals())
+            clock.now += 10
+        self.assertEqual(2, len(self.node.calls()))
+
+    def test_transfer_invalidation(self):
+        self.node.set_result(IRC3_SCORE, 'ownerOf', ALICE, _tokenId='0x1')
+        self.node.set_result(IRC3_SCORE, 'ownerOf', ALICE, _tokenId='0x2')
+        self.node.set_result(IRC3_SCORE, 'balanceOf', '0x2', _owner=ALICE)
+        self.node.set_result(IRC3_SCORE, 'balanceOf', '0x0', _owner=BOB)
+        reader = CachingReader(self.transport, IRC3_SCORE, IRC3)
+        self.assertEqual(0, reader.sync())
+
+        for _ in range(2):
+            self.assertEqual(ALICE, reader.owner_of(1))
+            self.assertEqual(ALICE, reader.owner_of(2))
+            self.assertEqual(2, reader.balance_of(ALICE))
+            self.assertEqual(0, reader.balance_of(BOB))
+        self.assertEqual(4, len(self.node.calls()))
+
+        # Token 1 moves to Bob, a failed transaction and other SCOREs are ignored
+        self.node.set_result(IRC3_SCORE, 'ownerOf', BOB, _tokenId='0x1')
+        self.node.set_result(IRC3_SCORE, 'balanceOf', '0x1', _owner=ALICE)
+        self.node.set_result(IRC3_SCORE, 'balanceOf', '0x1', _owner=BOB)
+        self.node.add_block(tx(log(IRC3_SCORE, TRANSFER, [ALICE, BOB, '0x1'])),
+                            tx(log(IRC3_SCORE, TRANSFER, [ALICE, BOB, '0x2']), status='0x0'))
+        self.node.add_block(tx(log(IRC16_SCORE, TRANSFER, [ALICE, BOB, '0x2'])))
+        self.assertEqual(2, reader.sync())
+        self.assertEqual(2, reader.height)
+
+        self.assertEqual(BOB, reader.owner_of(1))
+        self.assertEqual(ALICE, reader.owner_of(2))
+        self.assertEqual(1, reader.balance_of(ALICE))
+        self.assertEqual(1, reader.balance_of(BOB))
+        self.assertEqual([{'_tokenId': '0x1'}], [params for _, params in self.node.calls('ownerOf')[2:]])
+        self.assertEqual(4, len(self.node.calls('balanceOf')))
+
+    def test_approval_and_mint_range(self):
+        reader = CachingReader(self.transport, IRC3_SCORE, IRC3)
+        for token_id in (1, 10, 12, 13):
+            self.node.set_result(IRC3_SCORE, 'ownerOf', ZERO, _tokenId=hex(token_id))
+            self.node.set_result(IRC3_SCORE, 'getApproved', ZERO, _tokenId=hex(token_id))
+            reader.owner_of(token_id)
+            reader.call('getApproved', {'_tokenId': token_id})
+
+        reader.apply_transaction_result(tx(log(IRC3_SCORE, MINT_RANGE, [BOB], ['0xa', '0x3']),
+                                           log(IRC3_SCORE, APPROVAL, [ALICE, BOB, '0x1'])))
+        cache = reader.cache
+        self.assertIsNone(cache.get(make_key('ownerOf', {'_tokenId': '0xa'})))
+        self.assertIsNone(cache.get(make_key('ownerOf', {'_tokenId': '0xc'})))
+        self.assertEqual(ZERO, cache.get(make_key('ownerOf', {'_tokenId': '0xd'})))
+        self.assertEqual(ZERO, cache.get(make_key('ownerOf', {'_tokenId': '0x1'})))
+        self.assertIsNone(cache.get(make_key('getApproved', {'_tokenId': '0x1'})))
+        self.assertEqual(ZERO, cache.get(make_key('getApproved', {'_tokenId': '0xa'})))
+
+    def test_partition_invalidation(self):
+        self.node.set_result(IRC16_SCORE, 'balanceOfByPartition', '0x64', _partition='default', _owner=ALICE)
+        self.node.set_result(IRC16_SCORE, 'balanceOfByPartition', '0x32', _partition='reserved', _owner=ALICE)
+        self.node.set_result(IRC16_SCORE, 'totalSupplyByPartition', '0x64', _partition='default')
+        self.node.set_result(IRC16_SCORE, 'totalSupplyByPartition', '0x32', _partition='reserved')
+        reader = CachingReader(self.transport, IRC16_SCORE, IRC16)
+        reader.sync()
+
+        def read():
+            return (reader.balance_of_by_partition('default', ALICE), reader.balance_of_by_partition('reserved', ALICE),
+                    reader.call('totalSupplyByPartition', {'_partition': 'default'}),
+                    reader.call('totalSupplyByPartition', {'_partition': 'reserved'}))
+        read()
+
+        self.node.set_result(IRC16_SCORE, 'balanceOfByPartition', '0x5a', _partition='default', _owner=ALICE)
+        self.node.set_result(IRC16_SCORE, 'balanceOfByPartition', '0x3c', _partition='reserved', _owner=ALICE)
+        self.node.set_result(IRC16_SCORE, 'totalSupplyByPartition', '0x3c', _partition='reserved')
+        self.node.add_block(tx(log(IRC16_SCORE, TRANSFER_BY_PARTITION, ['default', ALICE], [ALICE, BOB, '0xa', '0x']),
+                               log(IRC16_SCORE, ISSUE_BY_PARTITION, ['reserved', ALICE, '0xa'], ['0x'])))
+        reader.sync()
+
+        self.assertEqual((90, 60, '0x64', '0x3c'), read())
+        self.assertEqual(4, len(self.node.calls('balanceOfByPartition')))
+        self.assertEqual(3, len(self.node.calls('totalSupplyByPartition')))
+
+    def test_uncached_methods_and_errors(self):
+        reader = CachingReader(self.transport, IRC16_SCORE, IRC16)
+        self.node.set_result(IRC16_SCORE, 'holderCount', '0x2')
+        reader.call('holderCount')
+        reader.call('holderCount')
+        self.assertEqual(2, len(self.node.calls('holderCount')))
+
+        with self.assertRaises(RpcError):
+            reader.balance_of(ALICE)
+        self.assertEqual(0, len(reader.cache))
+
+        with self.assertRaises(ValueError):
+            CachingReader(self.transport, IRC16_SCORE, 'irc2')
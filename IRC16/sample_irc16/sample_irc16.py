@@ -1,4 +1,7 @@
 from iconservice import *
+from .instrumentation import create_storage_cache
+from .migration import MigrationQueue
+from .storage_cache import CachedDictDB, CachedVarDB, cached_call
 
 TAG = 'SampleIRC16'
 
@@ -135,6 +138,13 @@ class TokenStandard(ABC):
         pass
 
 
+class TokenInterface(InterfaceScore):
+    # IRC2 token paid out as dividend
+    @interface
+    def transfer(self, _to: Address, _value: int, _data: bytes = None):
+        pass
+
+
 class SampleIRC16(IconScoreBase, TokenStandard):
     # Token
     _NAME = 'name'
@@ -144,17 +154,61 @@ class SampleIRC16(IconScoreBase, TokenStandard):
     _ISSUED_SUPPLY = 'issued_supply' # Issued count
     _BALANCES = 'balances'
     _PARTITIONS = 'partitions'
+    _PARTITION_SUPPLY = 'partition_supply' # Issued count per partition
+    _OWNER_PARTITIONS = 'owner_partitions' # Prefix of the per-owner partition lists
+    _OWNER_PARTITION_INDEX = 'owner_partition_index' # 1-based position in the owner's partition list
+    _HOLDERS = 'holders' # Addresses holding any partition
+    _HOLDER_INDEX = 'holder_index' # 1-based position in the holder list
+    _PARTITION_HOLDERS = 'partition_holders' # Prefix of the per-partition holder lists
+    _PARTITION_HOLDER_INDEX = 'partition_holder_index' # 1-based position in the partition's holder list
+    # Checkpoints
+    _BALANCE_CHECKPOINTS = 'balance_checkpoints' # Prefix of the per-(owner, partition) checkpoint lists
+    _SUPPLY_CHECKPOINTS = 'supply_checkpoints' # Issued supply checkpoints
+    # Dividends
+    _DIVIDEND_TOKENS = 'dividend_tokens' # Prefix of the per-partition lists of deposited assets
+    _DIVIDEND_INDEX = 'dividend_index' # Accumulated dividend per token of a partition, scaled
+    _DIVIDEND_SETTLED_INDEX = 'dividend_settled_index' # Index at the holder's last settlement
+    _DIVIDEND_CREDIT = 'dividend_credit' # Settled and unclaimed dividends of a holder
+    _ACCEPTED_DIVIDEND_TOKENS = 'accepted_dividend_tokens' # IRC2 contracts accepted by tokenFallback
     # Operators
     _APPROVALS = 'approvals'
     _PARTITION_APPROVALS = 'partition_approvals'
+    _OPERATOR_GRANTS = 'operator_grants' # Packed [all partitions, [partitions]] grant of an operator
     # Documents
-    _DOCUMENT = 'document'
+    _DOCUMENT = 'document' # Legacy layout, uri and hash stored separately
+    _DOCUMENT_RECORD = 'document_record' # Packed uri and hash of a document
+    _DOCUMENT_NAMES = 'document_names'
+    _DOCUMENT_INDEX = 'document_index' # 1-based position in the document name list
+    # Event payload
+    _EVENT_DATA_MODE = 'event_data_mode' # How _data is carried by the transfer, issue and redeem events
+    # Migration
+    _MIGRATE_LEGACY_HOLDINGS = 'legacyHoldings' # Registers the holdings that predate the registries
+    _LEGACY_HOLDINGS = 'legacy_holdings' # Queued "owner|partition" holdings to migrate
+    _LEGACY_HOLDINGS_COMPLETE = 'legacy_holdings_complete' # Whether the whole listing was queued
+    _MIGRATED_HOLDINGS = 'migrated_holdings' # Holdings already migrated, queued twice or not
     # Controller (force transfer)
     # _CONTROLLABLE = 'controllable'
     # _CONTROLLERS = 'controllers'
 
     _ZERO_ADDRESS = Address.from_prefix_and_int(AddressPrefix.EOA, 0)
 
+    _MAX_PAGE_SIZE = 100 # Upper bound of entries returned by one paginated query
+    _MAX_BATCH_SIZE = 500 # Upper bound of entries handled by one batch call
+    # Steps consumed per entry by each batch method, on top of the transaction's
+    # default step cost, measured by the Benchmark batchStepCost check and
+    # rounded up to cover full batches. Used by clients to size their batches.
+    # Entries crediting a new holder cost the most, the values assume them.
+    _BATCH_STEP_COST = {
+        'transferByPartitionBatch': 35_000,
+        'issueByPartitionBatch': 30_500,
+    }
+    _DIVIDEND_MAGNITUDE = 2 ** 128 # Scale of the dividend index, keeps rounding loss negligible
+    _MAX_DIVIDEND_TOKENS = 4 # Upper bound of assets deposited per partition, bounds the settlement cost
+    _MAX_GRANT_PARTITIONS = 32 # Upper bound of partitions in a packed operator grant, further ones are only kept as legacy entries
+    _EVENT_DATA_FULL = 0 # Events carry _data as given
+    _EVENT_DATA_HASH = 1 # Events carry the SHA3-256 of _data, verifiable off-chain against the full payload
+    _EVENT_DATA_OMIT = 2 # Events carry empty bytes
+
     # ======================================================================
     # Event Logs
     # ======================================================================
@@ -190,27 +244,81 @@ class SampleIRC16(IconScoreBase, TokenStandard):
     def SetDocument(self, _name: str, _uri: str, _document_hash: str):
         pass
 
+    @eventlog(indexed=3)
+    def RemoveDocument(self, _name: str, _uri: str, _document_hash: str):
+        pass
+
+    @eventlog(indexed=2)
+    def DividendDeposited(self, _partition: str, _token: Address, _amount: int):
+        pass
+
+    @eventlog(indexed=3)
+    def DividendClaimed(self, _partition: str, _token: Address, _owner: Address, _amount: int):
+        pass
+
+    @eventlog(indexed=1)
+    def DividendTokenSet(self, _token: Address, _accepted: bool):
+        pass
+
+    @eventlog
+    def EventDataModeSet(self, _mode: int):
+        pass
+
+    @eventlog(indexed=1)
+    def MigrationProgress(self, _name: str, _items: int, _completed: bool):
+        pass
+
     # ======================================================================
     # SCORE install
     # ======================================================================
     def __init__(self, db: IconScoreDatabase) -> None:
         super().__init__(db)
+        self._cache = create_storage_cache()
+        self._db = db
         # Token
-        self._name = VarDB(self._NAME, db, value_type=str)
-        self._symbol = VarDB(self._SYMBOL, db, value_type=str)
-        self._decimals = VarDB(self._DECIMALS, db, value_type=int)
-        self._total_supply = VarDB(self._TOTAL_SUPPLY, db, value_type=int)
-        self._issued_supply = VarDB(self._ISSUED_SUPPLY, db, value_type=int)
-        self._balances = DictDB(self._BALANCES, db, value_type=int)
-        self._partitions = DictDB(self._PARTITIONS, db, value_type=int, depth=2)
+        self._name = CachedVarDB(self._NAME, db, value_type=str, cache=self._cache)
+        self._symbol = CachedVarDB(self._SYMBOL, db, value_type=str, cache=self._cache)
+        self._decimals = CachedVarDB(self._DECIMALS, db, value_type=int, cache=self._cache)
+        self._total_supply = CachedVarDB(self._TOTAL_SUPPLY, db, value_type=int, cache=self._cache)
+        self._issued_supply = CachedVarDB(self._ISSUED_SUPPLY, db, value_type=int, cache=self._cache)
+        self._balances = CachedDictDB(self._BALANCES, db, value_type=int, cache=self._cache)
+        self._partitions = CachedDictDB(self._PARTITIONS, db, value_type=int, depth=2, cache=self._cache)
+        self._partition_supply = CachedDictDB(self._PARTITION_SUPPLY, db, value_type=int, cache=self._cache)
+        self._owner_partition_index = CachedDictDB(self._OWNER_PARTITION_INDEX, db, value_type=int, depth=2, cache=self._cache)
+        self._holders = self._cache.track(ArrayDB(self._HOLDERS, db, value_type=Address), self._HOLDERS)
+        self._holder_index = CachedDictDB(self._HOLDER_INDEX, db, value_type=int, cache=self._cache)
+        self._partition_holder_index = CachedDictDB(self._PARTITION_HOLDER_INDEX, db, value_type=int, depth=2, cache=self._cache)
+        # Checkpoints
+        self._supply_checkpoints = self._cache.track(ArrayDB(self._SUPPLY_CHECKPOINTS, db, value_type=bytes), self._SUPPLY_CHECKPOINTS)
+        # Dividends
+        self._dividend_index = CachedDictDB(self._DIVIDEND_INDEX, db, value_type=int, depth=2, cache=self._cache)
+        self._dividend_settled_index = CachedDictDB(self._DIVIDEND_SETTLED_INDEX, db, value_type=int, depth=3, cache=self._cache)
+        self._dividend_credit = CachedDictDB(self._DIVIDEND_CREDIT, db, value_type=int, depth=3, cache=self._cache)
+        self._accepted_dividend_tokens = CachedDictDB(self._ACCEPTED_DIVIDEND_TOKENS, db, value_type=bool, cache=self._cache)
         # Operators
-        self._approvals = DictDB(self._APPROVALS, db, value_type=bool, depth=2)
-        self._partition_approvals = DictDB(self._PARTITION_APPROVALS, db, value_type=bool, depth=3)
+        self._approvals = CachedDictDB(self._APPROVALS, db, value_type=bool, depth=2, cache=self._cache)
+        self._partition_approvals = CachedDictDB(self._PARTITION_APPROVALS, db, value_type=bool, depth=3, cache=self._cache)
+        self._operator_grants = CachedDictDB(self._OPERATOR_GRANTS, db, value_type=str, depth=2, cache=self._cache)
         # Document
-        self._document = DictDB(self._DOCUMENT, db, value_type=str, depth=2)
+        self._document = CachedDictDB(self._DOCUMENT, db, value_type=str, depth=2, cache=self._cache)
+        self._document_record = CachedDictDB(self._DOCUMENT_RECORD, db, value_type=str, cache=self._cache)
+        self._document_names = self._cache.track(ArrayDB(self._DOCUMENT_NAMES, db, value_type=str), self._DOCUMENT_NAMES)
+        self._document_index = CachedDictDB(self._DOCUMENT_INDEX, db, value_type=int, cache=self._cache)
+        # Event payload
+        self._event_data_mode = CachedVarDB(self._EVENT_DATA_MODE, db, value_type=int, cache=self._cache)
+        # Migration
+        self._migration = MigrationQueue(db, self._cache)
+        self._legacy_holdings = self._cache.track(ArrayDB(self._LEGACY_HOLDINGS, db, value_type=str), self._LEGACY_HOLDINGS)
+        self._legacy_holdings_complete = CachedVarDB(self._LEGACY_HOLDINGS_COMPLETE, db, value_type=bool, cache=self._cache)
+        self._migrated_holdings = CachedDictDB(self._MIGRATED_HOLDINGS, db, value_type=bool, depth=2, cache=self._cache)
         # Controller (force transfer)
         # self._controllable = VarDB(self._CONTROLLABLE, db, value_type=bool)
         # self._controllers = DictDB(self._CONTROLLERS, db, value_type=bool)
+        self._cache.track_events(self, ('TransferByPartition', 'IssueByPartition', 'RedeemByPartition',
+                                        'AuthorizeOperator', 'RevokeOperator', 'AuthorizeOperatorForPartition',
+                                        'RevokeOperatorForPartition', 'SetDocument', 'RemoveDocument',
+                                        'DividendDeposited', 'DividendClaimed', 'DividendTokenSet', 'EventDataModeSet',
+                                        'MigrationProgress'))
 
     def on_install(self,
                    name: str,
@@ -218,7 +326,12 @@ class SampleIRC16(IconScoreBase, TokenStandard):
                    decimals: int,
                    total_supply: int,
                    # controllable: bool,
+                   event_data_mode: int = 0,
                    ) -> None:
+        """
+        event_data_mode selects the payload of the transfer, issue and redeem
+        events: 0 emits _data as given, 1 its SHA3-256 hash and 2 nothing.
+        """
         super().on_install()
 
         total_supply = total_supply * 10 ** decimals 
@@ -229,30 +342,50 @@ class SampleIRC16(IconScoreBase, TokenStandard):
         self._issued_supply.set(0)
         self._decimals.set(decimals)
         # self._controllable.set(controllable)
-
-    def on_update(self) -> None:
+        self._ensure_event_data_mode(event_data_mode)
+        self._event_data_mode.set(event_data_mode)
+
+    def on_update(self, _legacyHoldings: bool = False) -> None:
+        """
+        Pass _legacyHoldings when updating a deployment whose balances predate
+        the owner partition lists, holder lists and partition supply. Those
+        balances can't be enumerated on chain: the owner queues the holdings
+        with queueLegacyHoldings, e.g. from an event indexer, and registers
+        them with runMigration. Until then the queries built on the registries
+        (partitionsOf, holdersOfPartition, holderCount, totalSupplyByPartition,
+        balanceOfByPartitionAt, ...) revert with "Migration in progress"
+        instead of missing the unregistered balances, and dividend deposits are
+        refused.
+        """
         super().on_update()
+        if _legacyHoldings:
+            self._migration.schedule(self._MIGRATE_LEGACY_HOLDINGS)
 
     # ======================================================================
     # IRC 2
     # ======================================================================
     @external(readonly=True)
+    @cached_call
     def name(self) -> str:
         return self._name.get()
 
     @external(readonly=True)
+    @cached_call
     def symbol(self) -> str:
         return self._symbol.get()
 
     @external(readonly=True)
+    @cached_call
     def decimals(self) -> int:
         return self._decimals.get()
 
     @external(readonly=True)
+    @cached_call
     def totalSupply(self) -> int:
         return self._total_supply.get()
 
     @external(readonly=True)
+    @cached_call
     def balanceOf(self, _owner: Address) -> int:
         return self._balances[_owner]
 
@@ -260,57 +393,206 @@ class SampleIRC16(IconScoreBase, TokenStandard):
     # Token Information
     # ======================================================================
     @external(readonly=True)
+    @cached_call
     def balanceOfByPartition(self, _partition: str, _owner: Address) -> int:
         return self._partitions[_owner][_partition]
 
     @external(readonly=True)
+    @cached_call
+    def balancesOf(self, _owners: List[Address]) -> list:
+        # Balance of each owner in order, as {'value': balance} or {'error': reason}
+        return self._aggregate(_owners, self.balanceOf)
+
+    @external(readonly=True)
+    @cached_call
+    def balancesOfByPartition(self, _owner: Address, _partitions: List[str]) -> list:
+        # Balance of _owner in each partition in order, as {'value': balance} or {'error': reason}
+        return self._aggregate(_partitions, lambda partition: self.balanceOfByPartition(partition, _owner))
+
+    @external(readonly=True)
+    @cached_call
     def partitionsOf(self, _owner: Address) -> dict:
-        return self._partitions[_owner]
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        balances = self._partitions[_owner]
+        return {partition: balances[partition] for partition in self._owner_partitions(_owner)}
+
+    @external(readonly=True)
+    @cached_call
+    def partitionsOfOwner(self, _owner: Address, _offset: int = 0, _limit: int = 100) -> dict:
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        partitions = self._owner_partitions(_owner)
+        balances = self._partitions[_owner]
+        return {partitions[i]: balances[partitions[i]] for i in self._page(len(partitions), _offset, _limit)}
+
+    @external(readonly=True)
+    @cached_call
+    def totalSupplyByPartition(self, _partition: str) -> int:
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        return self._partition_supply[_partition]
+
+    @external(readonly=True)
+    @cached_call
+    def partitionCount(self, _owner: Address) -> int:
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        return len(self._owner_partitions(_owner))
+
+    @external(readonly=True)
+    @cached_call
+    def holdersOfPartition(self, _partition: str, _offset: int = 0, _limit: int = 100) -> list:
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        holders = self._partition_holders(_partition)
+        return [holders[i] for i in self._page(len(holders), _offset, _limit)]
+
+    @external(readonly=True)
+    @cached_call
+    def holders(self, _offset: int = 0, _limit: int = 100) -> list:
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        return [self._holders[i] for i in self._page(len(self._holders), _offset, _limit)]
+
+    @external(readonly=True)
+    @cached_call
+    def holderCount(self, _partition: str = None) -> int:
+        # Number of holders of _partition, or of any partition when omitted
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        if _partition is None:
+            return len(self._holders)
+        return len(self._partition_holders(_partition))
+
+    @external(readonly=True)
+    @cached_call
+    def balanceOfByPartitionAt(self, _partition: str, _owner: Address, _block: int) -> int:
+        # Balance of _owner in _partition at the end of block _block
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        return self._value_at(self._balance_checkpoints(_owner, _partition), _block)
+
+    @external(readonly=True)
+    @cached_call
+    def issuedSupplyAt(self, _block: int) -> int:
+        # Issued supply at the end of block _block
+        return self._value_at(self._supply_checkpoints, _block)
+
+    def _aggregate(self, _items: list, _read) -> list:
+        # Reads every item, a failing read is reported in place instead of reverting the call
+        if len(_items) > self._MAX_BATCH_SIZE:
+            revert(f"Batch too large, max {self._MAX_BATCH_SIZE} entries")
+        results = []
+        for item in _items:
+            try:
+                results.append({'value': _read(item)})
+            except IconScoreException as e:
+                results.append({'error': e.message})
+        return results
+
+    def _page(self, _size: int, _offset: int, _limit: int) -> range:
+        if _offset < 0 or _limit < 0:
+            revert("Invalid pagination")
+        return range(_offset, min(_size, _offset + min(_limit, self._MAX_PAGE_SIZE)))
 
     # ======================================================================
     # Document Management
     # ======================================================================
     @external(readonly=True)
+    @cached_call
     def getDocument(self, _name: str) -> dict:
+        uri, document_hash = self._load_document(_name)
         return {
             'name': _name,
-            'uri': self._document[_name]['uri'],
-            'document_hash': self._document[_name]['document_hash']
+            'uri': uri,
+            'document_hash': document_hash
         }
 
+    @external(readonly=True)
+    @cached_call
+    def getAllDocuments(self, _offset: int = 0, _limit: int = 100) -> list:
+        return [self.getDocument(self._document_names[i]) for i in self._page(len(self._document_names), _offset, _limit)]
+
     @external
+    @cached_call
     def setDocument(self, _name: str, _uri: str, _document_hash: str) -> None:
         if self.msg.sender != self.owner:
             revert("Only owner of the contract can set documents")
 
-        self._document[_name]['uri'] = _uri
-        self._document[_name]['document_hash'] = _document_hash
+        self._document_record[_name] = json_dumps([_uri, _document_hash])
+        self._index_add(self._document_names, self._document_index, _name)
         self.SetDocument(_name, _uri, _document_hash)
 
+    @external
+    @cached_call
+    def removeDocument(self, _name: str) -> None:
+        if self.msg.sender != self.owner:
+            revert("Only owner of the contract can remove documents")
+        uri, document_hash = self._load_document(_name)
+        if not uri and not document_hash:
+            revert("Document not found")
+
+        del self._document_record[_name]
+        del self._document[_name]['uri']
+        del self._document[_name]['document_hash']
+        self._index_remove(self._document_names, self._document_index, _name)
+        self.RemoveDocument(_name, uri, document_hash)
+
+    def _load_document(self, _name: str) -> tuple:
+        # Returns (uri, document_hash), documents set before the packed layout keep their two entries
+        record = self._document_record[_name]
+        if record:
+            uri, document_hash = json_loads(record)
+            return uri, document_hash
+        return self._document[_name]['uri'], self._document[_name]['document_hash']
+
     # ======================================================================
     # Partition Token Transfer
     # ======================================================================
     @external
+    @cached_call
     def transferByPartition(self, _partition: str, _to: Address, _amount: int, _data: bytes = None) -> None:
         self._transferByPartition(_partition, self.msg.sender, self.msg.sender, _to, _amount, _data)
 
     @external
+    @cached_call
     def operatorTransferByPartition(self, _partition: str, _from: Address, _to: Address, _amount: int, _data: bytes = None) -> None:
-        if self.isOperator(self.msg.sender, _from) or self.isOperatorForPartition(_partition, self.msg.sender, _from):
+        if self._is_operator_for(_partition, self.msg.sender, _from):
             self._transferByPartition(_partition, self.msg.sender, _from, _to, _amount, _data)
         else:
             revert("Not authorized to transfer partition")
 
     def _transferByPartition(self, _partition: str, _operator: Address, _from: Address, _to: Address, _amount: int, _data: bytes) -> None:
+        if _amount <= 0:
+            revert("Invalid amount")
         if self._partitions[_from][_partition] < _amount:
             revert("Insufficient balance")
 
-        self._partitions[_from][_partition] -= _amount
-        self._balances[_from] -= _amount
-        self._partitions[_to][_partition] = self._partitions[_to][_partition] + _amount
-        self._balances[_to] = self._balances[_to] + _amount
-        data = b'Transfer by partition' if _data is None else _data
-        self.TransferByPartition(_partition, _operator, _from, _to, _amount, _data)
+        self._debit(_from, _partition, _amount)
+        self._credit(_to, _partition, _amount)
+        data = self._event_data(b'Transfer by partition' if _data is None else _data)
+        self.TransferByPartition(_partition, _operator, _from, _to, _amount, data)
+
+    @external
+    @cached_call
+    def transferByPartitionBatch(self, _partition: str, _recipients: List[Address], _amounts: List[int], _data: bytes = None) -> None:
+        # Debits the sender once for the batch total, either every recipient is credited or the call throws
+        if len(_recipients) != len(_amounts):
+            revert("_recipients and _amounts differ in length")
+        self._ensure_batch_size(len(_recipients))
+        total = 0
+        for amount in _amounts:
+            if amount <= 0:
+                revert("Invalid amount")
+            total += amount
+        sender = self.msg.sender
+        if self._partitions[sender][_partition] < total:
+            revert("Insufficient balance")
+
+        self._debit(sender, _partition, total)
+        data = self._event_data(b'Transfer by partition' if _data is None else _data)
+        for to, amount in zip(_recipients, _amounts):
+            self._credit(to, _partition, amount)
+            self.TransferByPartition(_partition, sender, sender, to, amount, data)
+
+    def _ensure_batch_size(self, _size: int) -> None:
+        if _size == 0:
+            revert("Empty batch")
+        if _size > self._MAX_BATCH_SIZE:
+            revert(f"Batch too large, max {self._MAX_BATCH_SIZE} entries")
 
     # ======================================================================
     # Controller Operation (force transfer)
@@ -332,30 +614,93 @@ class SampleIRC16(IconScoreBase, TokenStandard):
     # ======================================================================
     # Operator Management
     # ======================================================================
+    @external
+    @cached_call
     def authorizeOperator(self, _operator: Address) -> None:
         self._approvals[self.msg.sender][_operator] = True
+        _, partitions = self._load_grant(self.msg.sender, _operator)
+        self._store_grant(self.msg.sender, _operator, True, partitions)
         self.AuthorizeOperator(_operator, self.msg.sender)
 
+    @external
+    @cached_call
     def revokeOperator(self, _operator: Address) -> None:
         self._approvals[self.msg.sender][_operator] = False
+        _, partitions = self._load_grant(self.msg.sender, _operator)
+        self._store_grant(self.msg.sender, _operator, False, partitions)
         self.RevokeOperator(_operator, self.msg.sender)
 
+    @external
+    @cached_call
     def authorizeOperatorForPartition(self, _partition: str, _operator: Address) -> None:
-        self._partition_approvals[self.msg.sender][_partition][_operator] = True
-        self.AuthorizeOperatorForPartition(_partition, _operator, self.msg.sender)
+        self._set_partition_operator([_partition], _operator, True)
 
+    @external
+    @cached_call
     def revokeOperatorForPartition(self, _partition: str, _operator: Address) -> None:
-        self._partition_approvals[self.msg.sender][_partition][_operator] = False
-        self.RevokeOperatorForPartition(_partition, _operator, self.msg.sender)
+        self._set_partition_operator([_partition], _operator, False)
+
+    @external
+    @cached_call
+    def authorizeOperatorForPartitions(self, _partitions: List[str], _operator: Address) -> None:
+        self._ensure_batch_size(len(_partitions))
+        self._set_partition_operator(_partitions, _operator, True)
+
+    @external
+    @cached_call
+    def revokeOperatorForPartitions(self, _partitions: List[str], _operator: Address) -> None:
+        self._ensure_batch_size(len(_partitions))
+        self._set_partition_operator(_partitions, _operator, False)
+
+    def _set_partition_operator(self, _partitions: list, _operator: Address, _approved: bool) -> None:
+        # Legacy entries and the packed grant are written together, the grant once per call.
+        # A full grant leaves further partitions to the legacy entries, read by _is_operator_for
+        owner = self.msg.sender
+        all_partitions, partitions = self._load_grant(owner, _operator)
+        for partition in _partitions:
+            self._partition_approvals[owner][partition][_operator] = _approved
+            if _approved:
+                if partition not in partitions and len(partitions) < self._MAX_GRANT_PARTITIONS:
+                    partitions.append(partition)
+                self.AuthorizeOperatorForPartition(owner, partition, _operator)
+            else:
+                if partition in partitions:
+                    partitions.remove(partition)
+                self.RevokeOperatorForPartition(owner, partition, _operator)
+        self._store_grant(owner, _operator, all_partitions, partitions)
+
+    def _is_operator_for(self, _partition: str, _operator: Address, _owner: Address) -> bool:
+        # A single read for grants made since the packed layout, the legacy entries are
+        # only read when the packed grant does not cover _partition
+        all_partitions, partitions = self._load_grant(_owner, _operator)
+        if all_partitions or _partition in partitions:
+            return True
+        return self._approvals[_owner][_operator] or self._partition_approvals[_owner][_partition][_operator]
+
+    def _load_grant(self, _owner: Address, _operator: Address) -> tuple:
+        # Returns (all partitions, list of partitions) granted to _operator by _owner
+        grant = self._operator_grants[_owner][_operator]
+        if not grant:
+            return False, []
+        all_partitions, partitions = json_loads(grant)
+        return all_partitions, partitions
+
+    def _store_grant(self, _owner: Address, _operator: Address, _all_partitions: bool, _partitions: list) -> None:
+        if _all_partitions or _partitions:
+            self._operator_grants[_owner][_operator] = json_dumps([_all_partitions, _partitions])
+        else:
+            del self._operator_grants[_owner][_operator]
 
     # ======================================================================
     # Operator Information
     # ======================================================================
     @external(readonly=True)
+    @cached_call
     def isOperator(self, _operator: Address, _owner: Address) -> bool:
         return self._approvals[_owner][_operator]
 
     @external(readonly=True)
+    @cached_call
     def isOperatorForPartition(self, _partition: str, _operator: Address, _owner: Address) -> bool:
         return self._partition_approvals[_owner][_partition][_operator]
 
@@ -363,6 +708,7 @@ class SampleIRC16(IconScoreBase, TokenStandard):
     # Token Issuance
     # ======================================================================
     @external
+    @cached_call
     def issueByPartition(self, _partition: str, _to: Address, _amount: int, _data: bytes) -> None:
         if self.msg.sender != self.owner:
             revert('Only owner of the contract can issue new tokens')
@@ -375,22 +721,49 @@ class SampleIRC16(IconScoreBase, TokenStandard):
 
     def _issueByPartition(self, _partition: str, _to: Address, _amount: int, _data: bytes) -> None:
         #self._total_supply.set(self._total_supply.get() + _amount)
-        self._issued_supply.set(self._issued_supply.get() + _amount)
-        self._balances[_to] = self._balances[_to] + _amount
-        self._partitions[_to][_partition] = self._partitions[_to][_partition] + _amount
-        data = b'Issue by partition' if _data is None else _data
+        self._set_issued_supply(self._issued_supply.get() + _amount)
+        self._partition_supply[_partition] = self._partition_supply[_partition] + _amount
+        self._credit(_to, _partition, _amount)
+        data = self._event_data(b'Issue by partition' if _data is None else _data)
         self.IssueByPartition(_partition, _to, _amount, data)
 
+    @external
+    @cached_call
+    def issueByPartitionBatch(self, _partitions: List[str], _holders: List[Address], _amounts: List[int], _data: bytes = None) -> None:
+        # Checks the cap once against the batch total and updates the issued supply once
+        if self.msg.sender != self.owner:
+            revert('Only owner of the contract can issue new tokens')
+        if not len(_partitions) == len(_holders) == len(_amounts):
+            revert("_partitions, _holders and _amounts differ in length")
+        self._ensure_batch_size(len(_amounts))
+        total = 0
+        for amount in _amounts:
+            if amount <= 0:
+                revert('Invalid amount')
+            total += amount
+        issued = self._issued_supply.get()
+        if issued + total > self._total_supply.get():
+            revert('Cap reached, available tokens: ' + str(self._total_supply.get()-issued))
+
+        self._set_issued_supply(issued + total)
+        data = self._event_data(b'Issue by partition' if _data is None else _data)
+        for partition, holder, amount in zip(_partitions, _holders, _amounts):
+            self._partition_supply[partition] = self._partition_supply[partition] + amount
+            self._credit(holder, partition, amount)
+            self.IssueByPartition(partition, holder, amount, data)
+
     # ======================================================================
     # Token Redemption
     # ======================================================================
     @external
+    @cached_call
     def redeemByPartition(self, _partition: str, _amount: int, _data: bytes) -> None:
         self._redeemByPartition(_partition, self.msg.sender, self.msg.sender, _amount, _data)
 
     @external
+    @cached_call
     def operatorRedeemByPartition(self, _partition: str, _owner: Address, _amount: int, _data: bytes) -> None:
-        if self.isOperator(self.msg.sender, _owner) or self.isOperatorForPartition(_partition, self.msg.sender, _owner):
+        if self._is_operator_for(_partition, self.msg.sender, _owner):
             self._redeemByPartition(_partition, _owner, self.msg.sender, _amount, _data)
         else:
             revert("No operator privilege")
@@ -400,30 +773,392 @@ class SampleIRC16(IconScoreBase, TokenStandard):
             revert("Invalid amount")
 
         #self._total_supply.set(self._total_supply.get() - _amount)
-        self._issued_supply.set(self._issued_supply.get() - _amount)
-        self._partitions[_owner][_partition] -= _amount
-        self._balances[_owner] -= _amount
-        data = b'Redeem by partition' if _data is None else _data
+        self._set_issued_supply(self._issued_supply.get() - _amount)
+        self._partition_supply[_partition] = self._partition_supply[_partition] - _amount
+        self._debit(_owner, _partition, _amount)
+        data = self._event_data(b'Redeem by partition' if _data is None else _data)
         self.RedeemByPartition(_partition, _operator, _owner, _amount, data)
 
     # ======================================================================
     # Transfer Validity
     # ======================================================================
     @external(readonly=True)
+    @cached_call
     def canTransferByPartition(self, _partition: str, _from: Address, _to: Address, _amount: int, _data: bytes = None) -> str:
-        if not self._partitions[_from][_partition]:
+        return self._transfer_status(self._partitions[_from][_partition], _to, _amount)
+
+    @external(readonly=True)
+    @cached_call
+    def canTransferByPartitionBatch(self, _partitions: List[str], _froms: List[Address], _tos: List[Address], _amounts: List[int]) -> list:
+        # Status of each transfer once the successful ones before it are applied
+        if not len(_partitions) == len(_froms) == len(_tos) == len(_amounts):
+            revert("_partitions, _froms, _tos and _amounts differ in length")
+        self._ensure_batch_size(len(_amounts))
+        balances = {}
+        statuses = []
+        for partition, sender, to, amount in zip(_partitions, _froms, _tos, _amounts):
+            source = (sender, partition)
+            if source not in balances:
+                balances[source] = self._partitions[sender][partition]
+            status = self._transfer_status(balances[source], to, amount)
+            if status == "0x51 Transfer Successful":
+                target = (to, partition)
+                if target not in balances:
+                    balances[target] = self._partitions[to][partition]
+                balances[source] -= amount
+                balances[target] += amount
+            statuses.append(status)
+        return statuses
+
+    def _transfer_status(self, _balance: int, _to: Address, _amount: int) -> str:
+        # Only a successful status lets the batch check apply the amount to its scratch balances
+        if _amount is None or _amount <= 0:
+            return("0x50 Invalid Amount")
+        elif not _balance:
             return("0x50 Invalid Partition")
-        elif self._partitions[_from][_partition] < _amount:
+        elif _balance < _amount:
             return("0x52 Insufficient Balance")
         elif _to == self._ZERO_ADDRESS:
             return("0x57 Invalid Receiver")
 
         return("0x51 Transfer Successful")
 
+    # ======================================================================
+    # Event Payload
+    # ======================================================================
+    @external(readonly=True)
+    @cached_call
+    def eventDataMode(self) -> int:
+        return self._event_data_mode.get()
+
+    @external
+    @cached_call
+    def setEventDataMode(self, _mode: int) -> None:
+        if self.msg.sender != self.owner:
+            revert('Only owner of the contract can set the event data mode')
+        self._ensure_event_data_mode(_mode)
+        self._event_data_mode.set(_mode)
+        self.EventDataModeSet(_mode)
+
+    def _ensure_event_data_mode(self, _mode: int) -> None:
+        if _mode not in (self._EVENT_DATA_FULL, self._EVENT_DATA_HASH, self._EVENT_DATA_OMIT):
+            revert("Invalid event data mode")
+
+    def _event_data(self, _data: bytes) -> bytes:
+        mode = self._event_data_mode.get()
+        if mode == self._EVENT_DATA_HASH:
+            return sha3_256(_data)
+        if mode == self._EVENT_DATA_OMIT:
+            return b''
+        return _data
+
+    # ======================================================================
+    # Balance Bookkeeping
+    # ======================================================================
+    def _credit(self, _owner: Address, _partition: str, _amount: int) -> None:
+        # Owners and partitions join the registries when the balance turns positive, callers ensure _amount > 0
+        previous = self._partitions[_owner][_partition]
+        self._settle_dividends(_owner, _partition, previous)
+        self._partitions[_owner][_partition] = previous + _amount
+        self._balances[_owner] = self._balances[_owner] + _amount
+        self._checkpoint(self._balance_checkpoints(_owner, _partition), previous, previous + _amount)
+        if previous == 0:
+            self._index_add(self._owner_partitions(_owner), self._owner_partition_index[_owner], _partition)
+            self._index_add(self._partition_holders(_partition), self._partition_holder_index[_partition], _owner)
+            self._index_add(self._holders, self._holder_index, _owner)
+
+    def _debit(self, _owner: Address, _partition: str, _amount: int) -> None:
+        # Owners and partitions leave the registries once their balance reaches zero
+        previous = self._partitions[_owner][_partition]
+        self._settle_dividends(_owner, _partition, previous)
+        balance = previous - _amount
+        total = self._balances[_owner] - _amount
+        self._partitions[_owner][_partition] = balance
+        self._balances[_owner] = total
+        self._checkpoint(self._balance_checkpoints(_owner, _partition), previous, balance)
+        if balance == 0:
+            self._index_remove(self._owner_partitions(_owner), self._owner_partition_index[_owner], _partition)
+            self._index_remove(self._partition_holders(_partition), self._partition_holder_index[_partition], _owner)
+        if total == 0:
+            self._index_remove(self._holders, self._holder_index, _owner)
+
+    def _owner_partitions(self, _owner: Address) -> ArrayDB:
+        return self._cache.track(ArrayDB(f'{self._OWNER_PARTITIONS}|{_owner}', self._db, value_type=str), self._OWNER_PARTITIONS)
+
+    def _partition_holders(self, _partition: str) -> ArrayDB:
+        return self._cache.track(ArrayDB(f'{self._PARTITION_HOLDERS}|{_partition}', self._db, value_type=Address), self._PARTITION_HOLDERS)
+
+    def _set_issued_supply(self, _value: int) -> None:
+        self._checkpoint(self._supply_checkpoints, self._issued_supply.get(), _value)
+        self._issued_supply.set(_value)
+
+    def _index_add(self, _items: ArrayDB, _positions: CachedDictDB, _item) -> None:
+        # Append an item to an enumeration list unless listed, and record its 1-based position
+        if _positions[_item] == 0:
+            _items.put(_item)
+            _positions[_item] = len(_items)
+
+    def _index_remove(self, _items: ArrayDB, _positions: CachedDictDB, _item) -> None:
+        # Swap-and-pop removal, keeps the enumeration list dense in O(1)
+        position = _positions[_item]
+        if position == 0:
+            # Item was added before its list was tracked
+            return
+        last = _items.pop()
+        if last != _item:
+            _items[position - 1] = last
+            _positions[last] = position
+        del _positions[_item]
+
+    # ======================================================================
+    # Checkpoints
+    # ======================================================================
+    def _balance_checkpoints(self, _owner: Address, _partition: str) -> ArrayDB:
+        return self._cache.track(ArrayDB(f'{self._BALANCE_CHECKPOINTS}|{_owner}|{_partition}', self._db, value_type=bytes), self._BALANCE_CHECKPOINTS)
+
+    def _checkpoint(self, _checkpoints: ArrayDB, _previous: int, _value: int) -> None:
+        # One checkpoint per block, later changes within the same block overwrite it
+        if _value == _previous:
+            return
+        height = self.block_height
+        size = len(_checkpoints)
+        if size == 0:
+            if _previous != 0:
+                # Value predates the checkpoints, record it as the opening one
+                _checkpoints.put(self._pack_checkpoint(0, _previous))
+        elif self._unpack_checkpoint(_checkpoints[size - 1])[0] == height:
+            _checkpoints[size - 1] = self._pack_checkpoint(height, _value)
+            return
+        _checkpoints.put(self._pack_checkpoint(height, _value))
+
+    def _value_at(self, _checkpoints: ArrayDB, _block: int) -> int:
+        # Binary search for the last checkpoint at or before _block
+        if _block < 0 or _block > self.block_height:
+            revert("Invalid _block")
+        low, high = 0, len(_checkpoints)
+        while low < high:
+            middle = (low + high) // 2
+            if self._unpack_checkpoint(_checkpoints[middle])[0] <= _block:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return 0
+        return self._unpack_checkpoint(_checkpoints[low - 1])[1]
+
+    def _pack_checkpoint(self, _block: int, _value: int) -> bytes:
+        # 8 bytes of block height followed by the value
+        return _block.to_bytes(8, 'big') + _value.to_bytes((_value.bit_length() + 7) // 8, 'big')
+
+    def _unpack_checkpoint(self, _packed: bytes) -> tuple:
+        return int.from_bytes(_packed[:8], 'big'), int.from_bytes(_packed[8:], 'big')
+
+    # ======================================================================
+    # Dividends
+    # ======================================================================
+    @external
+    @payable
+    @cached_call
+    def depositDividend(self, _partition: str) -> None:
+        # Shares the sent ICX among the current holders of _partition
+        if self.msg.sender != self.owner:
+            revert('Only owner of the contract can deposit dividends')
+        self._deposit_dividend(_partition, self._ZERO_ADDRESS, self.msg.value)
+
+    @external
+    @cached_call
+    def tokenFallback(self, _from: Address, _value: int, _data: bytes) -> None:
+        # Shares the received IRC2 tokens among the holders of the partition named in _data
+        if not self.msg.sender.is_contract or not self._accepted_dividend_tokens[self.msg.sender]:
+            revert('Unregistered dividend token')
+        if _from != self.owner:
+            revert('Only owner of the contract can deposit dividends')
+        if not _data:
+            revert('Missing dividend partition in _data')
+        try:
+            partition = _data.decode('utf-8')
+        except UnicodeDecodeError:
+            revert('Invalid dividend partition in _data')
+        self._deposit_dividend(partition, self.msg.sender, _value)
+
+    @external
+    @cached_call
+    def claimDividend(self, _partition: str, _token: Address = None) -> None:
+        # Pays out the dividends of _partition in _token, ICX when omitted
+        token = self._ZERO_ADDRESS if _token is None else _token
+        owner = self.msg.sender
+        self._settle_dividend(owner, _partition, token, self._partitions[owner][_partition])
+        amount = self._dividend_credit[owner][_partition][token]
+        if amount == 0:
+            revert('No dividend to claim')
+        del self._dividend_credit[owner][_partition][token]
+        self.DividendClaimed(_partition, token, owner, amount)
+        self._transfer_dividend(owner, token, amount)
+
+    @external(readonly=True)
+    @cached_call
+    def dividendOf(self, _owner: Address, _partition: str, _token: Address = None) -> int:
+        # Claimable dividends of _owner in _partition, in _token or ICX when omitted
+        token = self._ZERO_ADDRESS if _token is None else _token
+        return self._dividend_credit[_owner][_partition][token] + \
+            self._accrued_dividend(_owner, _partition, token, self._partitions[_owner][_partition])
+
+    @external
+    @cached_call
+    def addDividendToken(self, _token: Address) -> None:
+        # Lets the IRC2 contract _token deposit dividends through tokenFallback
+        self._set_dividend_token(_token, True)
+
+    @external
+    @cached_call
+    def removeDividendToken(self, _token: Address) -> None:
+        # Refuses further deposits of _token, dividends already deposited stay claimable
+        self._set_dividend_token(_token, False)
+
+    @external(readonly=True)
+    @cached_call
+    def isDividendToken(self, _token: Address) -> bool:
+        return self._accepted_dividend_tokens[_token]
+
+    @external(readonly=True)
+    @cached_call
+    def dividendTokens(self, _partition: str) -> list:
+        # Assets deposited as dividends of _partition, the zero address stands for ICX
+        return list(self._dividend_tokens(_partition))
+
+    def _set_dividend_token(self, _token: Address, _accepted: bool) -> None:
+        if self.msg.sender != self.owner:
+            revert('Only owner of the contract can set dividend tokens')
+        if not _token.is_contract:
+            revert('Dividend token must be a contract')
+        if _accepted:
+            self._accepted_dividend_tokens[_token] = True
+        else:
+            del self._accepted_dividend_tokens[_token]
+        self.DividendTokenSet(_token, _accepted)
+
+    def _deposit_dividend(self, _partition: str, _token: Address, _amount: int) -> None:
+        if _amount <= 0:
+            revert('Invalid amount')
+        # Holders not migrated yet would get no share
+        self._migration.ensure_done(self._MIGRATE_LEGACY_HOLDINGS)
+        supply = self._partition_supply[_partition]
+        if supply == 0:
+            revert('No holders in partition')
+        tokens = self._dividend_tokens(_partition)
+        if _token not in tokens:
+            if len(tokens) >= self._MAX_DIVIDEND_TOKENS:
+                revert(f'Too many dividend tokens, max {self._MAX_DIVIDEND_TOKENS}')
+            tokens.put(_token)
+        index = self._dividend_index[_partition]
+        index[_token] = index[_token] + _amount * self._DIVIDEND_MAGNITUDE // supply
+        self.DividendDeposited(_partition, _token, _amount)
+
+    def _settle_dividends(self, _owner: Address, _partition: str, _balance: int) -> None:
+        # Credits what _balance earned since the last settlement, called before the balance changes
+        for token in self._dividend_tokens(_partition):
+            self._settle_dividend(_owner, _partition, token, _balance)
+
+    def _settle_dividend(self, _owner: Address, _partition: str, _token: Address, _balance: int) -> None:
+        index = self._dividend_index[_partition][_token]
+        settled = self._dividend_settled_index[_owner][_partition]
+        if settled[_token] == index:
+            return
+        accrued = self._accrued_dividend(_owner, _partition, _token, _balance)
+        if accrued:
+            credit = self._dividend_credit[_owner][_partition]
+            credit[_token] = credit[_token] + accrued
+        settled[_token] = index
+
+    def _accrued_dividend(self, _owner: Address, _partition: str, _token: Address, _balance: int) -> int:
+        accrued = self._dividend_index[_partition][_token] - self._dividend_settled_index[_owner][_partition][_token]
+        return _balance * accrued // self._DIVIDEND_MAGNITUDE
+
+    def _dividend_tokens(self, _partition: str) -> ArrayDB:
+        return self._cache.track(ArrayDB(f'{self._DIVIDEND_TOKENS}|{_partition}', self._db, value_type=Address), self._DIVIDEND_TOKENS)
+
+    def _transfer_dividend(self, _to: Address, _token: Address, _amount: int) -> None:
+        # Pending writes reach the state before control leaves the SCORE
+        self._cache.flush()
+        if _token == self._ZERO_ADDRESS:
+            self.icx.transfer(_to, _amount)
+        else:
+            self.create_interface_score(_token, TokenInterface).transfer(_to, _amount, b'dividend')
+
+    # ======================================================================
+    # Migration
+    # ======================================================================
+    @external
+    @cached_call
+    def runMigration(self, _maxItems: int) -> None:
+        # Runs the pending migrations on at most _maxItems items, call again until none is pending
+        if self.msg.sender != self.owner:
+            revert('Only owner of the contract can run migrations')
+        for name, items, completed in self._migration.run(self, _maxItems):
+            self.MigrationProgress(name, items, completed)
+
+    @external(readonly=True)
+    @cached_call
+    def migrationStatus(self) -> dict:
+        return self._migration.status()
+
+    @external
+    @cached_call
+    def queueLegacyHoldings(self, _owners: List[Address], _partitions: List[str], _complete: bool = False) -> None:
+        # Queues (owner, partition) holdings for the legacyHoldings migration, _complete marks the last chunk
+        if self.msg.sender != self.owner:
+            revert('Only owner of the contract can run migrations')
+        if not self._migration.is_pending(self._MIGRATE_LEGACY_HOLDINGS) or self._legacy_holdings_complete.get():
+            revert("No legacy holdings expected")
+        if len(_owners) != len(_partitions):
+            revert("_owners and _partitions differ in length")
+        if len(_owners) > self._MAX_BATCH_SIZE:
+            revert(f"Batch too large, max {self._MAX_BATCH_SIZE} entries")
+        for owner, partition in zip(_owners, _partitions):
+            self._legacy_holdings.put(f'{owner}|{partition}')
+        if _complete:
+            self._legacy_holdings_complete.set(True)
+
+    def _migrate_legacyHoldings(self, _cursor: int, _maxItems: int) -> tuple:
+        # _cursor is the position of the next queued holding, the migration ends with the complete queue
+        position = _cursor or 0
+        end = min(len(self._legacy_holdings), position + _maxItems)
+        for index in range(position, end):
+            owner, partition = self._legacy_holdings[index].split('|', 1)
+            self._migrate_holding(Address.from_string(owner), partition)
+        if end == len(self._legacy_holdings) and self._legacy_holdings_complete.get():
+            return None, end - position
+        return end, end - position
+
+    def _migrate_holding(self, _owner: Address, _partition: str) -> None:
+        # Registers the holding like a credit would, and adds its pre-update balance to the partition
+        # supply. A holding written since the update has an opening checkpoint at block 0 holding it,
+        # an untouched one gets that checkpoint here so balanceOfByPartitionAt sees the balance.
+        if self._migrated_holdings[_owner][_partition]:
+            return
+        self._migrated_holdings[_owner][_partition] = True
+        balance = self._partitions[_owner][_partition]
+        checkpoints = self._balance_checkpoints(_owner, _partition)
+        if len(checkpoints) == 0:
+            legacy = balance
+            if balance > 0:
+                checkpoints.put(self._pack_checkpoint(0, balance))
+        else:
+            block, value = self._unpack_checkpoint(checkpoints[0])
+            legacy = value if block == 0 else 0
+        self._partition_supply[_partition] = self._partition_supply[_partition] + legacy
+
+        if balance > 0:
+            self._index_add(self._owner_partitions(_owner), self._owner_partition_index[_owner], _partition)
+            self._index_add(self._partition_holders(_partition), self._partition_holder_index[_partition], _owner)
+        if self._balances[_owner] > 0:
+            self._index_add(self._holders, self._holder_index, _owner)
+
     # ======================================================================
     # Misc API
     # ======================================================================
     @external(readonly=True)
+    @cached_call
     def tokenInfo(self) -> dict:
         return {
             'name': self._name.get(),
@@ -433,5 +1168,12 @@ class SampleIRC16(IconScoreBase, TokenStandard):
         }
 
     @external(readonly=True)
+    @cached_call
     def issuedSupply(self) -> int:
-        return self._issued_supply.get()
\ No newline at end of file
+        return self._issued_supply.get()
+
+    @external(readonly=True)
+    @cached_call
+    def batchStepCost(self) -> dict:
+        # Estimated step cost per entry of each batch method and the maximum batch size
+        return dict(self._BATCH_STEP_COST, maxBatchSize=self._MAX_BATCH_SIZE)
\ No newline at end of file
@@ -0,0 +1,188 @@
+from iconservice import *
+
+# Marks a key deleted within the current call scope
+_DELETED = object()
+
+# Value returned by VarDB / DictDB for a missing key, per value type
+_DEFAULTS = {int: 0, str: "", bool: False}
+
+
+class StorageCache:
+    """
+    Call-scoped read-through cache shared by the CachedVarDB and CachedDictDB
+    containers of a SCORE.
+
+    While a call scope is open (see cached_call), reads are memoized and writes
+    are kept in memory, then flushed to the underlying containers once when the
+    outermost scope returns. A scope that raises discards its pending writes.
+    Outside of a scope the containers read and write straight through.
+    """
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._values = {}
+        self._exists = {}
+        self._dirty = {}
+
+    @property
+    def active(self) -> bool:
+        return self._depth > 0
+
+    def begin(self, method: str = None) -> None:
+        # method names the external call opening the scope, used by instrumentation
+        self._depth += 1
+
+    def end(self, commit: bool) -> None:
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        if commit:
+            self.flush()
+        self._values.clear()
+        self._exists.clear()
+        self._dirty.clear()
+
+    def flush(self) -> None:
+        # Every dirty key is written exactly once, in first-write order.
+        # Memoized reads may predate those writes and are dropped with them.
+        for container, item, value in self._dirty.values():
+            if item is None:
+                if value is _DELETED:
+                    container.remove()
+                else:
+                    container.set(value)
+            elif value is _DELETED:
+                del container[item]
+            else:
+                container[item] = value
+        self._values.clear()
+        self._exists.clear()
+        self._dirty.clear()
+
+    def read(self, key: tuple, loader, default):
+        if not self.active:
+            return loader()
+        if key in self._dirty:
+            value = self._dirty[key][2]
+            return default if value is _DELETED else value
+        if key not in self._values:
+            self._values[key] = loader()
+        return self._values[key]
+
+    def contains(self, key: tuple, loader) -> bool:
+        if not self.active:
+            return loader()
+        if key in self._dirty:
+            return self._dirty[key][2] is not _DELETED
+        if key not in self._exists:
+            self._exists[key] = loader()
+        return self._exists[key]
+
+    def track(self, container, name: str):
+        # Hook for instrumentation, containers are used as is by default
+        return container
+
+    def track_events(self, score, names: tuple) -> None:
+        # Hook for instrumentation, event logs are left untouched by default
+        pass
+
+    def write(self, key: tuple, container, item, value) -> None:
+        # item is None for VarDB containers
+        if self.active:
+            self._dirty[key] = (container, item, value)
+        elif item is None:
+            if value is _DELETED:
+                container.remove()
+            else:
+                container.set(value)
+        elif value is _DELETED:
+            del container[item]
+        else:
+            container[item] = value
+
+
+class CachedVarDB:
+    """
+    VarDB whose reads and writes go through a StorageCache.
+    """
+
+    def __init__(self, var_key: str, db: IconScoreDatabase, value_type: type, cache: StorageCache) -> None:
+        self._db = cache.track(VarDB(var_key, db, value_type=value_type), var_key)
+        self._key = (var_key,)
+        self._default = _DEFAULTS.get(value_type)
+        self._cache = cache
+
+    def get(self):
+        return self._cache.read(self._key, self._db.get, self._default)
+
+    def set(self, value) -> None:
+        self._cache.write(self._key, self._db, None, value)
+
+    def remove(self) -> None:
+        self._cache.write(self._key, self._db, None, _DELETED)
+
+
+class CachedDictDB:
+    """
+    DictDB whose reads and writes go through a StorageCache.
+    Nested DictDBs (depth > 1) return cached sub-dictionaries on item access.
+    """
+
+    def __init__(self, key: str, db: IconScoreDatabase, value_type: type, depth: int = 1,
+                 cache: StorageCache = None) -> None:
+        self._db = cache.track(DictDB(key, db, value_type=value_type, depth=depth), key)
+        self._path = (key,)
+        self._default = _DEFAULTS.get(value_type)
+        self._depth = depth
+        self._cache = cache
+
+    def _child(self, item) -> 'CachedDictDB':
+        child = CachedDictDB.__new__(CachedDictDB)
+        child._db = self._db[item]
+        child._path = self._path + (item,)
+        child._default = self._default
+        child._depth = self._depth - 1
+        child._cache = self._cache
+        return child
+
+    def __getitem__(self, item):
+        if self._depth > 1:
+            return self._child(item)
+        return self._cache.read(self._path + (item,), lambda: self._db[item], self._default)
+
+    def __setitem__(self, item, value) -> None:
+        self._cache.write(self._path + (item,), self._db, item, value)
+
+    def __delitem__(self, item) -> None:
+        self._cache.write(self._path + (item,), self._db, item, _DELETED)
+
+    def __contains__(self, item) -> bool:
+        return self._cache.contains(self._path + (item,), lambda: item in self._db)
+
+    def remove(self, item) -> None:
+        del self[item]
+
+
+def cached_call(func):
+    """
+    Opens a StorageCache scope on self._cache for the duration of an external
+    method. Place it below @external. Nested calls share the outermost scope.
+    """
+
+    def wrapper(self, *args, **kwargs):
+        self._cache.begin(func.__name__)
+        try:
+            result = func(self, *args, **kwargs)
+        except BaseException:
+            self._cache.end(commit=False)
+            raise
+        self._cache.end(commit=True)
+        return result
+
+    # Keep the external signature visible to the SCORE API generator
+    wrapper.__name__ = func.__name__
+    wrapper.__qualname__ = func.__qualname__
+    wrapper.__doc__ = func.__doc__
+    wrapper.__annotations__ = func.__annotations__
+    wrapper.__wrapped__ = func
+    return wrapper
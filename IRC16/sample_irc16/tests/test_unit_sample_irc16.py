@@ -1,6 +1,10 @@
+from ..instrumentation import InMemoryCollector, InstrumentedStorageCache, install_collector, remove_collector
 from ..sample_irc16 import SampleIRC16
+from ..storage_cache import StorageCache
+from tbears.libs.scoretest.patch.context import Context
 from tbears.libs.scoretest.score_test_case import ScoreTestCase
 from iconservice import Address, AddressPrefix, IconScoreException
+from unittest.mock import patch
 
 import hashlib
 
@@ -31,6 +35,13 @@ class TestSampleIRC16(ScoreTestCase):
         self.test_account4 = Address.from_string(f"hx{'1234'*10}")
         self.test_account5 = Address.from_string(f"hx{'4321'*10}")        
 
+    def restore_invoke_context(self):
+        # tbears keeps the query context of the last readonly call, and the call trace of a
+        # readonly call that reverted, so writes made after them would fail as readonly
+        context = Context.get_context()
+        context.method_flag_trace.clear()
+        Context._set_invoke_context(context)
+
     def test_issue_and_redeem(self):
         self.score.issueByPartition("default", self.test_account3, 1000 * 10 ** self.decimals, b'minting 1000 tokens to test_account3 in default partition')
         self.score.issueByPartition("reserved", self.test_account3, 500 * 10 ** self.decimals, b'minting 500 tokens to test_account3 in reserved partition')
@@ -142,5 +153,544 @@ class TestSampleIRC16(ScoreTestCase):
         self.assertEqual(reason, "0x52 Insufficient Balance")
         reason = self.score.canTransferByPartition("default", self.test_account2, Address.from_prefix_and_int(AddressPrefix.EOA, 0), 1000 * 10 ** self.decimals, None)
         self.assertEqual(reason, "0x57 Invalid Receiver")
+        for amount in (0, -1):
+            reason = self.score.canTransferByPartition("default", self.test_account2, self.test_account3, amount, None)
+            self.assertEqual(reason, "0x50 Invalid Amount")
         reason = self.score.canTransferByPartition("default", self.test_account2, self.test_account3, 1000 * 10 ** self.decimals, None)
         self.assertEqual(reason, "0x51 Transfer Successful")
+
+    def test_storage_cache_scope(self):
+        # Writes stay pending until the outermost scope ends
+        cache = self.score._cache
+        cache.begin()
+        self.score._issued_supply.set(5)
+        self.score._partitions[self.test_account2]["default"] = 7
+        self.assertEqual(5, self.score.issuedSupply())
+        self.assertEqual(7, self.score.balanceOfByPartition("default", self.test_account2))
+        cache.end(commit=False)
+        self.assertEqual(0, self.score.issuedSupply())
+        self.assertEqual(0, self.score.balanceOfByPartition("default", self.test_account2))
+
+        self.restore_invoke_context()
+        cache.begin()
+        self.score._partitions[self.test_account2]["default"] = 7
+        cache.end(commit=True)
+        self.assertEqual(7, self.score.balanceOfByPartition("default", self.test_account2))
+
+        # A flush within a scope drops memoized reads along with the written keys
+        self.restore_invoke_context()
+        cache.begin()
+        self.assertEqual(7, self.score._partitions[self.test_account2]["default"])
+        del self.score._partitions[self.test_account2]["default"]
+        cache.flush()
+        self.assertEqual(0, self.score._partitions[self.test_account2]["default"])
+        cache.end(commit=True)
+
+    def test_partitionsOf(self):
+        self.set_msg(self.test_account1)
+        self.score.issueByPartition("default", self.test_account2, 100, None)
+        self.score.issueByPartition("locked", self.test_account2, 200, None)
+        self.score.issueByPartition("reserved", self.test_account2, 300, None)
+        self.score.issueByPartition("default", self.test_account2, 50, None)
+        self.assertEqual({"default": 150, "locked": 200, "reserved": 300}, self.score.partitionsOf(self.test_account2))
+        self.assertEqual(3, self.score.partitionCount(self.test_account2))
+
+        # Pagination
+        self.assertEqual({"default": 150, "locked": 200}, self.score.partitionsOfOwner(self.test_account2, 0, 2))
+        self.assertEqual({"reserved": 300}, self.score.partitionsOfOwner(self.test_account2, 2, 2))
+        self.assertEqual({}, self.score.partitionsOfOwner(self.test_account2, 5, 2))
+        with self.assertRaises(IconScoreException) as e:
+            self.score.partitionsOfOwner(self.test_account2, -1, 2)
+        self.assertEqual(e.exception.message, "Invalid pagination")
+        self.restore_invoke_context()
+
+        # A partition emptied by transfer or redemption leaves the list, the receiver gains it
+        self.set_msg(self.test_account2)
+        self.score.transferByPartition("default", self.test_account3, 150, None)
+        self.assertEqual({"reserved": 300, "locked": 200}, self.score.partitionsOf(self.test_account2))
+        self.assertEqual({"default": 150}, self.score.partitionsOf(self.test_account3))
+        self.score.redeemByPartition("reserved", 300, None)
+        self.assertEqual({"locked": 200}, self.score.partitionsOf(self.test_account2))
+
+        # Partial transfers keep the partition listed
+        self.score.transferByPartition("locked", self.test_account3, 50, None)
+        self.assertEqual({"locked": 150}, self.score.partitionsOf(self.test_account2))
+        self.assertEqual({"default": 150, "locked": 50}, self.score.partitionsOf(self.test_account3))
+        self.assertEqual(0, self.score.partitionCount(self.test_account4))
+
+        # Empty or negative transfers can't list a made-up partition
+        for amount in (0, -10):
+            with self.assertRaises(IconScoreException) as e:
+                self.score.transferByPartition("made-up", self.test_account4, amount, None)
+            self.assertEqual(e.exception.message, "Invalid amount")
+        self.assertEqual(0, self.score.partitionCount(self.test_account4))
+        self.assertEqual({"locked": 150}, self.score.partitionsOf(self.test_account2))
+
+    def test_transferByPartitionBatch(self):
+        self.set_msg(self.test_account1)
+        self.score.issueByPartition("default", self.test_account2, 1000, None)
+
+        self.set_msg(self.test_account2)
+        self.score.transferByPartitionBatch("default", [self.test_account3, self.test_account4, self.test_account3],
+                                            [100, 200, 50], b'payroll')
+        self.assertEqual(650, self.score.balanceOfByPartition("default", self.test_account2))
+        self.assertEqual(650, self.score.balanceOf(self.test_account2))
+        self.assertEqual(150, self.score.balanceOfByPartition("default", self.test_account3))
+        self.assertEqual(200, self.score.balanceOf(self.test_account4))
+        self.assertEqual({"default": 150}, self.score.partitionsOf(self.test_account3))
+
+        # The batch total is checked before any recipient is credited
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferByPartitionBatch("default", [self.test_account3, self.test_account5], [600, 100], None)
+        self.assertEqual(e.exception.message, "Insufficient balance")
+        self.assertEqual(0, self.score.balanceOf(self.test_account5))
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferByPartitionBatch("default", [self.test_account3, self.test_account5], [-100, 100], None)
+        self.assertEqual(e.exception.message, "Invalid amount")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferByPartitionBatch("default", [self.test_account3], [1, 2], None)
+        self.assertEqual(e.exception.message, "_recipients and _amounts differ in length")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferByPartitionBatch("default", [], [], None)
+        self.assertEqual(e.exception.message, "Empty batch")
+
+        # Sending the whole balance drops the partition from the sender
+        self.score.transferByPartitionBatch("default", [self.test_account5], [650], None)
+        self.assertEqual({}, self.score.partitionsOf(self.test_account2))
+
+        costs = self.score.batchStepCost()
+        self.assertEqual(500, costs['maxBatchSize'])
+        self.assertIn('transferByPartitionBatch', costs)
+
+    def test_issueByPartitionBatch(self):
+        self.set_msg(self.test_account1)
+        self.score.issueByPartitionBatch(["default", "reserved", "default"],
+                                         [self.test_account2, self.test_account2, self.test_account3],
+                                         [100, 200, 300], b'cap table')
+        self.assertEqual(600, self.score.issuedSupply())
+        self.assertEqual({"default": 100, "reserved": 200}, self.score.partitionsOf(self.test_account2))
+        self.assertEqual(300, self.score.balanceOf(self.test_account2))
+        self.assertEqual(300, self.score.balanceOfByPartition("default", self.test_account3))
+
+        # The cap is checked against the batch total
+        available = 10000 * 10 ** self.decimals - 600
+        with self.assertRaises(IconScoreException) as e:
+            self.score.issueByPartitionBatch(["default", "default"], [self.test_account4, self.test_account5],
+                                             [available, 1], None)
+        self.assertEqual(e.exception.message, f"Cap reached, available tokens: {available}")
+        self.assertEqual(0, self.score.balanceOf(self.test_account4))
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.issueByPartitionBatch(["default"], [self.test_account4, self.test_account5], [1, 1], None)
+        self.assertEqual(e.exception.message, "_partitions, _holders and _amounts differ in length")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.issueByPartitionBatch(["default"], [self.test_account4], [0], None)
+        self.assertEqual(e.exception.message, "Invalid amount")
+
+        self.set_msg(self.test_account2)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.issueByPartitionBatch(["default"], [self.test_account4], [1], None)
+        self.assertEqual(e.exception.message, "Only owner of the contract can issue new tokens")
+        self.assertEqual(600, self.score.issuedSupply())
+
+    def test_holder_registry(self):
+        self.set_msg(self.test_account1)
+        self.score.issueByPartitionBatch(["default", "default", "reserved", "default"],
+                                         [self.test_account2, self.test_account3, self.test_account3, self.test_account4],
+                                         [100, 100, 100, 100], None)
+        self.assertEqual([self.test_account2, self.test_account3, self.test_account4],
+                         self.score.holdersOfPartition("default"))
+        self.assertEqual([self.test_account3], self.score.holdersOfPartition("reserved"))
+        self.assertEqual(3, self.score.holderCount("default"))
+        self.assertEqual(3, self.score.holderCount())
+        self.assertEqual([self.test_account3], self.score.holdersOfPartition("default", 1, 1))
+        self.assertEqual([], self.score.holdersOfPartition("locked"))
+
+        # An empty transfer neither registers the receiver nor writes a checkpoint
+        self.set_msg(self.test_account2)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferByPartition("default", self.test_account5, 0, None)
+        self.assertEqual(e.exception.message, "Invalid amount")
+        self.assertEqual(3, self.score.holderCount("default"))
+        self.assertEqual(3, self.score.holderCount())
+        self.assertEqual(0, len(self.score._balance_checkpoints(self.test_account5, "default")))
+        self.score._checkpoint(self.score._balance_checkpoints(self.test_account2, "default"), 100, 100)
+        self.assertEqual(1, len(self.score._balance_checkpoints(self.test_account2, "default")))
+
+        # An emptied holder is replaced by the last one, the receiver is appended
+        self.set_msg(self.test_account2)
+        self.score.transferByPartition("default", self.test_account5, 100, None)
+        self.assertEqual([self.test_account4, self.test_account3, self.test_account5],
+                         self.score.holdersOfPartition("default"))
+        self.assertEqual([self.test_account4, self.test_account3, self.test_account5], self.score.holders())
+
+        # A holder stays in the global registry while holding another partition
+        self.set_msg(self.test_account3)
+        self.score.redeemByPartition("default", 100, None)
+        self.assertEqual([self.test_account4, self.test_account5], self.score.holdersOfPartition("default"))
+        self.assertEqual(3, self.score.holderCount())
+        self.score.redeemByPartition("reserved", 100, None)
+        self.assertEqual(0, self.score.holderCount("reserved"))
+        self.assertEqual([self.test_account4, self.test_account5], self.score.holders(0, 10))
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.holders(0, -1)
+        self.assertEqual(e.exception.message, "Invalid pagination")
+
+    def test_checkpoints(self):
+        self.set_msg(self.test_account1)
+        self.set_block(10)
+        self.score.issueByPartition("default", self.test_account2, 100, None)
+        self.score.issueByPartition("default", self.test_account2, 50, None)
+        self.set_block(20)
+        self.set_msg(self.test_account2)
+        self.score.transferByPartition("default", self.test_account3, 30, None)
+        self.set_block(35)
+        self.score.redeemByPartition("default", 20, None)
+        self.set_block(40)
+
+        # Changes within one block share a single checkpoint
+        self.assertEqual(1, len(self.score._balance_checkpoints(self.test_account3, "default")))
+        self.assertEqual(3, len(self.score._balance_checkpoints(self.test_account2, "default")))
+
+        expected = {0: 0, 9: 0, 10: 150, 19: 150, 20: 120, 34: 120, 35: 100, 40: 100}
+        for block, balance in expected.items():
+            self.assertEqual(balance, self.score.balanceOfByPartitionAt("default", self.test_account2, block))
+        self.assertEqual(0, self.score.balanceOfByPartitionAt("default", self.test_account3, 19))
+        self.assertEqual(30, self.score.balanceOfByPartitionAt("default", self.test_account3, 20))
+        self.assertEqual(0, self.score.balanceOfByPartitionAt("reserved", self.test_account2, 40))
+
+        self.assertEqual(0, self.score.issuedSupplyAt(9))
+        self.assertEqual(150, self.score.issuedSupplyAt(34))
+        self.assertEqual(130, self.score.issuedSupplyAt(35))
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.issuedSupplyAt(41)
+        self.assertEqual(e.exception.message, "Invalid _block")
+
+    def test_dividends(self):
+        zero = Address.from_prefix_and_int(AddressPrefix.EOA, 0)
+        self.set_msg(self.test_account1)
+        self.score.issueByPartitionBatch(["default", "default"], [self.test_account2, self.test_account3], [100, 300], None)
+
+        # ICX deposit shared pro rata
+        self.set_msg(self.test_account1, 400)
+        self.score.depositDividend("default")
+        self.assertEqual(100, self.score.dividendOf(self.test_account2, "default"))
+        self.assertEqual(300, self.score.dividendOf(self.test_account3, "default"))
+
+        # A transfer settles the sender, the receiver only earns later deposits
+        self.set_msg(self.test_account2)
+        self.score.transferByPartition("default", self.test_account4, 50, None)
+        self.assertEqual(0, self.score.dividendOf(self.test_account4, "default"))
+        self.set_msg(self.test_account1, 400)
+        self.score.depositDividend("default")
+        self.assertEqual(150, self.score.dividendOf(self.test_account2, "default"))
+        self.assertEqual(600, self.score.dividendOf(self.test_account3, "default"))
+        self.assertEqual(50, self.score.dividendOf(self.test_account4, "default"))
+
+        # IRC2 deposit through tokenFallback, the partition is named in _data
+        token = Address.from_string(f"cx{'1' * 40}")
+        self.set_msg(token)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.tokenFallback(self.test_account1, 800, b'default')
+        self.assertEqual(e.exception.message, "Unregistered dividend token")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.addDividendToken(token)
+        self.assertEqual(e.exception.message, "Only owner of the contract can set dividend tokens")
+        self.set_msg(self.test_account1)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.addDividendToken(self.test_account2)
+        self.assertEqual(e.exception.message, "Dividend token must be a contract")
+        self.score.addDividendToken(token)
+        self.assertTrue(self.score.isDividendToken(token))
+        self.set_msg(token)
+        self.score.tokenFallback(self.test_account1, 800, b'default')
+        self.assertEqual([zero, token], self.score.dividendTokens("default"))
+        self.assertEqual(600, self.score.dividendOf(self.test_account3, "default", token))
+        with self.assertRaises(IconScoreException) as e:
+            self.score.tokenFallback(self.test_account2, 800, b'default')
+        self.assertEqual(e.exception.message, "Only owner of the contract can deposit dividends")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.tokenFallback(self.test_account1, 800, b'\xff\xfe')
+        self.assertEqual(e.exception.message, "Invalid dividend partition in _data")
+
+        # A caller can't pose as a token by naming the owner as _from
+        for sender in (self.test_account1, self.test_account2, Address.from_string(f"cx{'2' * 40}")):
+            self.set_msg(sender)
+            with self.assertRaises(IconScoreException) as e:
+                self.score.tokenFallback(self.test_account1, 800, b'default')
+            self.assertEqual(e.exception.message, "Unregistered dividend token")
+        self.set_msg(self.test_account1)
+        self.score.removeDividendToken(token)
+        self.set_msg(token)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.tokenFallback(self.test_account1, 800, b'default')
+        self.assertEqual(e.exception.message, "Unregistered dividend token")
+        self.assertEqual([zero, token], self.score.dividendTokens("default"))
+
+        # Redemption settles before burning
+        self.set_msg(self.test_account3)
+        self.score.redeemByPartition("default", 300, None)
+        self.assertEqual(600, self.score.dividendOf(self.test_account3, "default", token))
+        self.assertEqual(100, self.score.totalSupplyByPartition("default"))
+
+        with patch.object(self.score, '_transfer_dividend') as transfer:
+            self.score.claimDividend("default")
+            transfer.assert_called_once_with(self.test_account3, zero, 600)
+            self.score.claimDividend("default", token)
+            transfer.assert_called_with(self.test_account3, token, 600)
+        self.assertEqual(0, self.score.dividendOf(self.test_account3, "default"))
+        with self.assertRaises(IconScoreException) as e:
+            self.score.claimDividend("default")
+        self.assertEqual(e.exception.message, "No dividend to claim")
+
+        self.set_msg(self.test_account1, 100)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.depositDividend("reserved")
+        self.assertEqual(e.exception.message, "No holders in partition")
+
+    def test_canTransferByPartitionBatch(self):
+        self.set_msg(self.test_account1)
+        self.score.issueByPartition("default", self.test_account2, 100, None)
+        zero = Address.from_prefix_and_int(AddressPrefix.EOA, 0)
+
+        # Later instructions see the balances left by earlier successful ones
+        statuses = self.score.canTransferByPartitionBatch(
+            ["default", "default", "default", "default", "reserved", "default"],
+            [self.test_account2, self.test_account3, self.test_account2, self.test_account2, self.test_account2, self.test_account3],
+            [self.test_account3, self.test_account4, self.test_account4, zero, self.test_account4, self.test_account4],
+            [60, 30, 50, 10, 1, 40])
+        self.assertEqual(["0x51 Transfer Successful", "0x51 Transfer Successful", "0x52 Insufficient Balance",
+                          "0x57 Invalid Receiver", "0x50 Invalid Partition", "0x52 Insufficient Balance"], statuses)
+
+        # A negative amount can't raise the sender's balance for the instructions after it
+        statuses = self.score.canTransferByPartitionBatch(
+            ["default", "default", "default"], [self.test_account2] * 3, [self.test_account3, self.test_account4, self.test_account4],
+            [-100, 150, 0])
+        self.assertEqual(["0x50 Invalid Amount", "0x52 Insufficient Balance", "0x50 Invalid Amount"], statuses)
+
+        # Nothing is written
+        self.assertEqual(100, self.score.balanceOfByPartition("default", self.test_account2))
+        self.assertEqual(0, self.score.balanceOfByPartition("default", self.test_account3))
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.canTransferByPartitionBatch(["default"], [self.test_account2], [], [1])
+        self.assertEqual(e.exception.message, "_partitions, _froms, _tos and _amounts differ in length")
+
+    def test_document_registry(self):
+        self.set_msg(self.test_account1)
+        self.score.setDocument("prospectus", "https://example.com/p.pdf", "01")
+        self.score.setDocument("kyc", "https://example.com/kyc.pdf", "02")
+        self.score.setDocument("prospectus", "https://example.com/p2.pdf", "03")
+        self.assertEqual({'name': "prospectus", 'uri': "https://example.com/p2.pdf", 'document_hash': "03"},
+                         self.score.getDocument("prospectus"))
+        self.assertEqual(["prospectus", "kyc"], [doc['name'] for doc in self.score.getAllDocuments()])
+        self.assertEqual(["kyc"], [doc['name'] for doc in self.score.getAllDocuments(1, 5)])
+
+        # Documents stored in the legacy layout stay readable and removable
+        self.restore_invoke_context()
+        self.score._document["legacy"]['uri'] = "https://example.com/old.pdf"
+        self.score._document["legacy"]['document_hash'] = "04"
+        self.assertEqual("https://example.com/old.pdf", self.score.getDocument("legacy")['uri'])
+        self.score.removeDocument("legacy")
+        self.assertEqual("", self.score.getDocument("legacy")['uri'])
+
+        self.score.removeDocument("prospectus")
+        self.assertEqual([{'name': "kyc", 'uri': "https://example.com/kyc.pdf", 'document_hash': "02"}],
+                         self.score.getAllDocuments())
+        with self.assertRaises(IconScoreException) as e:
+            self.score.removeDocument("prospectus")
+        self.assertEqual(e.exception.message, "Document not found")
+
+        self.set_msg(self.test_account2)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.removeDocument("kyc")
+        self.assertEqual(e.exception.message, "Only owner of the contract can remove documents")
+
+    def test_operatorForPartitions(self):
+        self.set_msg(self.test_account1)
+        self.score.issueByPartitionBatch(["default", "reserved", "locked"],
+                                         [self.test_account2, self.test_account2, self.test_account2], [100, 100, 100], None)
+
+        self.set_msg(self.test_account2)
+        self.score.authorizeOperatorForPartitions(["default", "reserved"], self.test_account3)
+        self.assertTrue(self.score.isOperatorForPartition("default", self.test_account3, self.test_account2))
+        self.assertTrue(self.score.isOperatorForPartition("reserved", self.test_account3, self.test_account2))
+        self.assertFalse(self.score.isOperatorForPartition("locked", self.test_account3, self.test_account2))
+
+        # The combined check is answered from the packed grant alone
+        self.restore_invoke_context()
+        del self.score._partition_approvals[self.test_account2]["default"][self.test_account3]
+        self.set_msg(self.test_account3)
+        self.score.operatorTransferByPartition("default", self.test_account2, self.test_account4, 10, None)
+        self.score.operatorRedeemByPartition("reserved", self.test_account2, 10, None)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.operatorTransferByPartition("locked", self.test_account2, self.test_account4, 10, None)
+        self.assertEqual(e.exception.message, "Not authorized to transfer partition")
+
+        self.set_msg(self.test_account2)
+        self.score.revokeOperatorForPartitions(["default", "reserved"], self.test_account3)
+        self.assertFalse(self.score.isOperatorForPartition("reserved", self.test_account3, self.test_account2))
+        self.assertEqual("", self.score._operator_grants[self.test_account2][self.test_account3])
+        self.set_msg(self.test_account3)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.operatorRedeemByPartition("reserved", self.test_account2, 10, None)
+        self.assertEqual(e.exception.message, "No operator privilege")
+
+        # A packed grant covers a bounded number of partitions, further ones are kept as legacy entries
+        self.set_msg(self.test_account2)
+        self.score.authorizeOperatorForPartitions([f"p{index}" for index in range(34)], self.test_account3)
+        self.score.authorizeOperatorForPartition("p34", self.test_account3)
+        self.assertEqual((False, [f"p{index}" for index in range(32)]),
+                         self.score._load_grant(self.test_account2, self.test_account3))
+        for partition in ("p0", "p32", "p34"):
+            self.assertTrue(self.score.isOperatorForPartition(partition, self.test_account3, self.test_account2))
+        self.score.revokeOperatorForPartitions(["p0", "p34"], self.test_account3)
+        self.assertFalse(self.score.isOperatorForPartition("p0", self.test_account3, self.test_account2))
+        self.assertFalse(self.score.isOperatorForPartition("p34", self.test_account3, self.test_account2))
+        self.assertTrue(self.score.isOperatorForPartition("p33", self.test_account3, self.test_account2))
+
+        # Operators for all partitions, and grants made before the packed layout
+        self.set_msg(self.test_account2)
+        self.score.authorizeOperator(self.test_account4)
+        self.score._approvals[self.test_account2][self.test_account5] = True
+        self.set_msg(self.test_account4)
+        self.score.operatorTransferByPartition("locked", self.test_account2, self.test_account4, 10, None)
+        self.set_msg(self.test_account5)
+        self.score.operatorTransferByPartition("locked", self.test_account2, self.test_account5, 10, None)
+        self.assertEqual(80, self.score.balanceOfByPartition("locked", self.test_account2))
+
+    def test_aggregate_reads(self):
+        self.set_msg(self.test_account1)
+        self.score.issueByPartitionBatch(["default", "reserved"], [self.test_account2, self.test_account2], [100, 50], None)
+        self.assertEqual([{'value': 150}, {'value': 0}], self.score.balancesOf([self.test_account2, self.test_account3]))
+        self.assertEqual([{'value': 50}, {'value': 0}, {'value': 100}],
+                         self.score.balancesOfByPartition(self.test_account2, ["reserved", "locked", "default"]))
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.balancesOf([self.test_account2] * 501)
+        self.assertEqual(e.exception.message, "Batch too large, max 500 entries")
+
+    def test_storage_instrumentation(self):
+        self.assertIs(StorageCache, type(self.score._cache))
+
+        collector = InMemoryCollector()
+        install_collector(collector)
+        self.addCleanup(remove_collector)
+        score = self.get_score_instance(SampleIRC16, self.test_account1, {
+            'name': self.name, 'symbol': self.symbol, 'decimals': self.decimals, 'total_supply': self.total_supply})
+        self.assertIsInstance(score._cache, InstrumentedStorageCache)
+        # tbears swaps the event logs for mocks once the SCORE is built, track the mock instead
+        score._cache.track_events(score, ('TransferByPartition',))
+
+        self.set_msg(self.test_account1)
+        score.issueByPartition("default", self.test_account2, 100, None)
+        collector.clear()
+        self.set_msg(self.test_account2)
+        score.transferByPartition("default", self.test_account3, 10, None)
+
+        # The recipient joins the owner partition list and both holder registries
+        self.assertEqual(['transferByPartition'], [method for method, _ in collector.calls])
+        storage = collector.storage()
+        self.assertEqual({'reads': 2, 'writes': 2, 'deletes': 0, 'bytes_written': 2}, storage['balances'])
+        for registry in ('owner_partitions', 'partition_holders', 'holders'):
+            self.assertEqual(1, storage[registry]['writes'])
+        self.assertEqual(21, storage['holders']['bytes_written'])
+        self.assertEqual(2, storage['balance_checkpoints']['writes'])
+        self.assertEqual({'TransferByPartition': {'count': 1, 'bytes': 111}}, collector.events())
+
+    def test_event_data_mode(self):
+        self.assertEqual(0, self.score.eventDataMode())
+        self.set_msg(self.test_account1)
+        self.score.issueByPartition("default", self.test_account2, 100, None)
+        self.set_msg(self.test_account2)
+        with patch.object(self.score, 'TransferByPartition') as event:
+            self.score.transferByPartition("default", self.test_account3, 10, None)
+            event.assert_called_once_with("default", self.test_account2, self.test_account2, self.test_account3, 10,
+                                          b'Transfer by partition')
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.setEventDataMode(1)
+        self.assertEqual(e.exception.message, "Only owner of the contract can set the event data mode")
+        self.set_msg(self.test_account1)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.setEventDataMode(3)
+        self.assertEqual(e.exception.message, "Invalid event data mode")
+
+        self.score.setEventDataMode(1)
+        payload = b'settlement batch 42'
+        # tbears' sha3_256 hook passes a length to the fixed-size digest, use the real hash
+        with patch(f'{SampleIRC16.__module__}.sha3_256', lambda data: hashlib.sha3_256(data).digest()), \
+                patch.object(self.score, 'IssueByPartition') as event:
+            self.score.issueByPartitionBatch(["default", "reserved"], [self.test_account2, self.test_account3], [5, 6], payload)
+            event.assert_called_with("reserved", self.test_account3, 6, hashlib.sha3_256(payload).digest())
+        self.score.setEventDataMode(2)
+        self.set_msg(self.test_account2)
+        with patch.object(self.score, 'RedeemByPartition') as event:
+            self.score.redeemByPartition("default", 5, payload)
+            event.assert_called_once_with("default", self.test_account2, self.test_account2, 5, b'')
+
+        # The mode can also be chosen at deploy time
+        score = self.get_score_instance(SampleIRC16, self.test_account1, {
+            'name': self.name, 'symbol': self.symbol, 'decimals': self.decimals, 'total_supply': self.total_supply,
+            'event_data_mode': 2})
+        self.assertEqual(2, score.eventDataMode())
+
+    def test_legacy_holdings_migration(self):
+        # Balances written before the registries existed
+        self.set_block(5)
+        for owner, partition, amount in ((self.test_account2, "default", 100), (self.test_account2, "reserved", 50),
+                                         (self.test_account3, "default", 30)):
+            self.score._partitions[owner][partition] = amount
+            self.score._balances[owner] += amount
+        self.score = self.update_score(self.score.address, SampleIRC16, on_update_params={'_legacyHoldings': True})
+        self.assertEqual(['legacyHoldings'], self.score.migrationStatus()['pending'])
+        for query in (self.score.holderCount, lambda: self.score.holdersOfPartition("default"),
+                      lambda: self.score.partitionsOf(self.test_account2),
+                      lambda: self.score.totalSupplyByPartition("default")):
+            with self.assertRaises(IconScoreException) as e:
+                query()
+            self.assertEqual(e.exception.message, "Migration in progress")
+        self.restore_invoke_context()
+
+        self.set_msg(self.test_account1, 10)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.depositDividend("default")
+        self.assertEqual(e.exception.message, "Migration in progress")
+
+        # A holding touched mid-migration is counted once, from its opening checkpoint
+        self.set_msg(self.test_account2)
+        self.score.transferByPartition("default", self.test_account4, 20, None)
+        self.set_msg(self.test_account1)
+        owners = [self.test_account2, self.test_account2, self.test_account3, self.test_account2]
+        self.score.queueLegacyHoldings(owners, ["default", "reserved", "default", "default"])
+        self.score.runMigration(2)
+        self.assertEqual(2, self.score.migrationStatus()['cursor'])
+        self.score.runMigration(10)
+        self.assertEqual(['legacyHoldings'], self.score.migrationStatus()['pending'])
+        self.score.queueLegacyHoldings([], [], True)
+        self.score.runMigration(1)
+        self.assertEqual([], self.score.migrationStatus()['pending'])
+
+        self.assertEqual(130, self.score.totalSupplyByPartition("default"))
+        self.assertEqual(50, self.score.totalSupplyByPartition("reserved"))
+        self.assertEqual(3, self.score.holderCount())
+        self.assertEqual({"default": 80, "reserved": 50}, self.score.partitionsOf(self.test_account2))
+        self.assertEqual({self.test_account2, self.test_account3, self.test_account4},
+                         set(self.score.holdersOfPartition("default")))
+
+        # A legacy holding never transferred keeps its balance in the checkpoint history
+        self.set_block(8)
+        self.assertEqual(30, self.score.balanceOfByPartitionAt("default", self.test_account3, 3))
+        self.assertEqual(50, self.score.balanceOfByPartitionAt("reserved", self.test_account2, 7))
+        self.assertEqual(100, self.score.balanceOfByPartitionAt("default", self.test_account2, 4))
+        self.assertEqual(80, self.score.balanceOfByPartitionAt("default", self.test_account2, 5))
+        with self.assertRaises(IconScoreException) as e:
+            self.score.queueLegacyHoldings([self.test_account3], ["default"])
+        self.assertEqual(e.exception.message, "No legacy holdings expected")
+
+        self.set_msg(self.test_account1, 130)
+        self.score.depositDividend("default")
+        self.assertEqual(30, self.score.dividendOf(self.test_account3, "default"))
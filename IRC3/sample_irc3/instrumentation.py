@@ -0,0 +1,212 @@
+from iconservice import *
+from .storage_cache import StorageCache
+
+# Collector receiving the storage statistics of every external call, None when disabled
+_collector = None
+
+
+def install_collector(collector) -> None:
+    """
+    Enables storage instrumentation for the SCOREs created afterwards.
+    collector.collect(method, stats) is called once per external call.
+    """
+    global _collector
+    _collector = collector
+
+
+def remove_collector() -> None:
+    global _collector
+    _collector = None
+
+
+def create_storage_cache() -> StorageCache:
+    # Without a collector the SCORE gets the plain cache and untouched containers
+    if _collector is None:
+        return StorageCache()
+    return InstrumentedStorageCache(_collector)
+
+
+class InMemoryCollector:
+    """
+    Keeps the statistics of every external call in memory, for tests.
+
+    Each entry of calls is (method, stats) where stats is
+    {'storage': {container: {'reads', 'writes', 'deletes', 'bytes_written'}},
+     'events': {event: {'count', 'bytes'}}}.
+    Accesses made outside of an external call are attributed to None.
+    """
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def collect(self, method: str, stats: dict) -> None:
+        self.calls.append((method, stats))
+
+    def storage(self, method: str = None) -> dict:
+        # Storage counters summed by container over the calls of method, all calls when omitted
+        totals = {}
+        for name, stats in self.calls:
+            if method is not None and name != method:
+                continue
+            for container, counters in stats['storage'].items():
+                total = totals.setdefault(container, dict.fromkeys(counters, 0))
+                for counter, value in counters.items():
+                    total[counter] += value
+        return totals
+
+    def events(self, method: str = None) -> dict:
+        totals = {}
+        for name, stats in self.calls:
+            if method is not None and name != method:
+                continue
+            for event, counters in stats['events'].items():
+                total = totals.setdefault(event, {'count': 0, 'bytes': 0})
+                total['count'] += counters['count']
+                total['bytes'] += counters['bytes']
+        return totals
+
+    def clear(self) -> None:
+        self.calls.clear()
+
+
+class InstrumentedStorageCache(StorageCache):
+    """
+    StorageCache that wraps the containers and event logs of its SCORE in
+    counters and reports them to a collector when the outermost call scope ends.
+    Only accesses reaching the underlying containers are counted, reads
+    served by the cache are not.
+    """
+
+    def __init__(self, collector) -> None:
+        super().__init__()
+        self._collector = collector
+        self._method = None
+        self._stats = None
+
+    def begin(self, method: str = None) -> None:
+        if self._depth == 0:
+            self._report()
+            self._method = method
+        super().begin(method)
+
+    def end(self, commit: bool) -> None:
+        # Pending writes are flushed, and counted, before the call is reported
+        super().end(commit)
+        if self._depth == 0:
+            self._report()
+
+    def track(self, container, name: str):
+        return _TrackedContainer(container, name, self)
+
+    def track_events(self, score, names: tuple) -> None:
+        for name in names:
+            setattr(score, name, self._tracked_event(name, getattr(score, name)))
+
+    def count(self, container: str, counter: str, amount: int = 1) -> None:
+        counters = self._current()['storage'].setdefault(
+            container, {'reads': 0, 'writes': 0, 'deletes': 0, 'bytes_written': 0})
+        counters[counter] += amount
+
+    def _tracked_event(self, name: str, event):
+        def wrapper(*args, **kwargs):
+            counters = self._current()['events'].setdefault(name, {'count': 0, 'bytes': 0})
+            counters['count'] += 1
+            counters['bytes'] += len(name) + sum(_value_size(value) for value in args + tuple(kwargs.values()))
+            return event(*args, **kwargs)
+        return wrapper
+
+    def _current(self) -> dict:
+        if self._stats is None:
+            self._stats = {'storage': {}, 'events': {}}
+        return self._stats
+
+    def _report(self) -> None:
+        if self._stats is not None:
+            self._collector.collect(self._method, self._stats)
+        self._method = None
+        self._stats = None
+
+
+class _TrackedContainer:
+    """
+    Counting proxy of a VarDB, DictDB or ArrayDB. Sub-dictionaries of nested
+    DictDBs are counted under the name of their root container.
+    """
+
+    def __init__(self, container, name: str, cache: InstrumentedStorageCache) -> None:
+        self._container = container
+        self._name = name
+        self._cache = cache
+
+    # VarDB
+    def get(self, *args):
+        self._cache.count(self._name, 'reads')
+        return self._container.get(*args)
+
+    def set(self, value) -> None:
+        self._written(value)
+        self._container.set(value)
+
+    def remove(self, *args) -> None:
+        self._cache.count(self._name, 'deletes')
+        self._container.remove(*args)
+
+    # DictDB and ArrayDB
+    def __getitem__(self, item):
+        value = self._container[item]
+        if isinstance(value, DictDB):
+            return _TrackedContainer(value, self._name, self._cache)
+        self._cache.count(self._name, 'reads')
+        return value
+
+    def __setitem__(self, item, value) -> None:
+        self._written(value)
+        self._container[item] = value
+
+    def __delitem__(self, item) -> None:
+        self._cache.count(self._name, 'deletes')
+        del self._container[item]
+
+    def __contains__(self, item) -> bool:
+        if isinstance(self._container, ArrayDB):
+            return any(value == item for value in self)
+        self._cache.count(self._name, 'reads')
+        return item in self._container
+
+    # ArrayDB
+    def __len__(self) -> int:
+        self._cache.count(self._name, 'reads')
+        return len(self._container)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def put(self, value) -> None:
+        self._written(value)
+        self._container.put(value)
+
+    def pop(self):
+        self._cache.count(self._name, 'deletes')
+        return self._container.pop()
+
+    def _written(self, value) -> None:
+        self._cache.count(self._name, 'writes')
+        self._cache.count(self._name, 'bytes_written', _value_size(value))
+
+
+def _value_size(value) -> int:
+    # Approximate serialized size, as stored by the containers
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, int):
+        return value.bit_length() // 8 + 1
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, Address):
+        return 21
+    return len(str(value))
@@ -0,0 +1,77 @@
+from iconservice import *
+from .storage_cache import CachedVarDB, StorageCache
+
+
+class MigrationQueue:
+    """
+    Resumable state migrations of a SCORE, run in chunks by its owner.
+
+    Migrations are scheduled by name, typically from on_update, and run in
+    scheduling order. A run calls score._migrate_<name>(cursor, max_items),
+    which processes at most max_items items from cursor (None at the start)
+    and returns (cursor, processed), cursor being None once the migration is
+    done. The cursor is an int stored between runs, a stored 0 is passed as
+    None, so a migration must resume from a 0 cursor as from the start.
+    """
+    _NAMES = 'migration_names'  # Scheduled migrations, in running order
+    _DONE = 'migration_done'  # Number of completed migrations
+    _CURSOR = 'migration_cursor'  # Cursor of the running migration
+    _PROCESSED = 'migration_processed'  # Items processed so far by the running migration
+
+    MAX_ITEMS = 1000  # Upper bound of items processed by one run
+
+    def __init__(self, db: IconScoreDatabase, cache: StorageCache) -> None:
+        self._names = cache.track(ArrayDB(self._NAMES, db, value_type=str), self._NAMES)
+        self._done = CachedVarDB(self._DONE, db, value_type=int, cache=cache)
+        self._cursor = CachedVarDB(self._CURSOR, db, value_type=int, cache=cache)
+        self._processed = CachedVarDB(self._PROCESSED, db, value_type=int, cache=cache)
+
+    def schedule(self, name: str) -> None:
+        if not self.is_pending(name):
+            self._names.put(name)
+
+    def pending(self) -> list:
+        return [self._names[i] for i in range(self._done.get(), len(self._names))]
+
+    def is_pending(self, name: str) -> bool:
+        return name in self.pending()
+
+    def ensure_done(self, name: str) -> None:
+        # Guard of the operations that can't run on half-migrated state
+        if self.is_pending(name):
+            revert("Migration in progress")
+
+    def run(self, score, max_items: int) -> list:
+        # Returns (name, processed, completed) of each migration that ran
+        if max_items is None or not 0 < max_items <= self.MAX_ITEMS:
+            revert(f"Invalid _maxItems, max {self.MAX_ITEMS}")
+        done = self._done.get()
+        if done == len(self._names):
+            revert("No migration pending")
+
+        steps = []
+        while max_items > 0 and done < len(self._names):
+            name = self._names[done]
+            cursor, processed = getattr(score, f'_migrate_{name}')(self._cursor.get() or None, max_items)
+            max_items -= processed
+            if cursor is not None:
+                self._cursor.set(cursor)
+                self._processed.set(self._processed.get() + processed)
+                steps.append((name, processed, False))
+                break
+            done += 1
+            self._done.set(done)
+            self._cursor.remove()
+            self._processed.remove()
+            steps.append((name, processed, True))
+        return steps
+
+    def status(self) -> dict:
+        pending = self.pending()
+        return {
+            'completed': self._done.get(),
+            'pending': pending,
+            'current': pending[0] if pending else None,
+            'cursor': self._cursor.get() or None,
+            'processed': self._processed.get(),
+        }
@@ -1,4 +1,7 @@
 from iconservice import *
+from .instrumentation import create_storage_cache
+from .migration import MigrationQueue
+from .storage_cache import CachedDictDB, CachedVarDB, cached_call
 
 TAG = 'SampleIrc3'
 
@@ -41,22 +44,107 @@ class SampleIrc3(IconScoreBase, TokenStandard):
     _OWNED_TOKEN_COUNT = 'owned_token_count'  # Track token count against token owners
     _TOKEN_OWNER = 'token_owner'  # Track token owner against token ID
     _TOKEN_APPROVALS = 'token_approvals'  # Track token approved owner against token ID
+    _TOKEN_RECORD = 'token_record'  # Track packed owner and approved address against token ID
+    _PACKED_LAYOUT = 'packed_layout'  # Whether tokens are stored as packed records
+    _RUN_ANCHOR = 'run_anchor'  # Track packed owner and run end against anchor IDs of lazily minted runs
+    _LAZY_RUNS = 'lazy_runs'  # Prefix of the per-owner lists of run start IDs
+    _LAZY_RUN_SIZE = 'lazy_run_size'  # Track token count of a run against its start ID
+    _LAZY_SUPPLY = 'lazy_supply'  # Number of tokens still implicitly owned through a run
+    _NEXT_RANGE_ID = 'next_range_id'  # Lowest token ID a new run may start from
+    _RANGE_FLOOR_SET = 'range_floor_set'  # Whether _NEXT_RANGE_ID is known to be above every minted token
+    _OPERATOR_APPROVALS = 'operator_approvals'  # Track operators approved for all tokens of an owner
+    _ALL_TOKENS = 'all_tokens'  # List of all live token IDs
+    _ALL_TOKENS_INDEX = 'all_tokens_index'  # Track 1-based position in _ALL_TOKENS against token ID
+    _OWNED_TOKENS = 'owned_tokens'  # Prefix of the per-owner token ID lists
+    _OWNED_TOKENS_INDEX = 'owned_tokens_index'  # Track 1-based position in owner's list against token ID
+    _MIGRATE_RANGE_FLOOR = 'rangeFloor'  # Raises _NEXT_RANGE_ID above the enumerated tokens
+    _MIGRATE_PACKED_LAYOUT = 'packedLayout'  # Converts the enumerated tokens to packed records
+    _MIGRATE_LEGACY_TOKENS = 'legacyTokens'  # Enumerates the tokens minted before the enumeration index
+    _LEGACY_TOKENS = 'legacy_tokens'  # Queued token IDs to enumerate
+    _LEGACY_TOKENS_COMPLETE = 'legacy_tokens_complete'  # Whether the whole listing was queued
 
     _ZERO_ADDRESS = Address.from_prefix_and_int(AddressPrefix.EOA, 0)
 
+    _MAX_BATCH_SIZE = 500  # Upper bound of tokens handled by one batch call
+    _MAX_PAGE_SIZE = 100  # Upper bound of token IDs returned by one paginated query
+    _MAX_RANGE_SIZE = 20_000  # Upper bound of tokens minted by one mintRange call
+    _RUN_ANCHOR_INTERVAL = 32  # Distance between anchors of a run, bounds the owner lookup
+    # Steps consumed per token by each batch method, on top of the transaction's
+    # default step cost, measured by the Benchmark batchStepCost check and
+    # rounded up to cover full batches. Used by clients to size their batches.
+    _BATCH_STEP_COST = {
+        'mintBatch': 14_000,
+        'mintBatchTo': 22_000,
+        'transferBatch': 9_500,
+        'transferFromBatch': 9_500,
+        'mintRange': 150,
+    }
+
     def __init__(self, db: IconScoreDatabase) -> None:
         super().__init__(db)
-        self._ownedTokenCount = DictDB(self._OWNED_TOKEN_COUNT, db, value_type=int)
-        self._tokenOwner = DictDB(self._TOKEN_OWNER, db, value_type=Address)
-        self._tokenApprovals = DictDB(self._TOKEN_APPROVALS, db, value_type=Address)
-
-    def on_install(self) -> None:
+        self._cache = create_storage_cache()
+        self._db = db
+        self._ownedTokenCount = CachedDictDB(self._OWNED_TOKEN_COUNT, db, value_type=int, cache=self._cache)
+        self._tokenOwner = CachedDictDB(self._TOKEN_OWNER, db, value_type=Address, cache=self._cache)
+        self._tokenApprovals = CachedDictDB(self._TOKEN_APPROVALS, db, value_type=Address, cache=self._cache)
+        self._tokenRecord = CachedDictDB(self._TOKEN_RECORD, db, value_type=bytes, cache=self._cache)
+        self._packedLayout = CachedVarDB(self._PACKED_LAYOUT, db, value_type=bool, cache=self._cache)
+        self._runAnchor = CachedDictDB(self._RUN_ANCHOR, db, value_type=bytes, cache=self._cache)
+        self._lazyRunSize = CachedDictDB(self._LAZY_RUN_SIZE, db, value_type=int, cache=self._cache)
+        self._lazySupply = CachedVarDB(self._LAZY_SUPPLY, db, value_type=int, cache=self._cache)
+        self._nextRangeId = CachedVarDB(self._NEXT_RANGE_ID, db, value_type=int, cache=self._cache)
+        self._rangeFloorSet = CachedVarDB(self._RANGE_FLOOR_SET, db, value_type=bool, cache=self._cache)
+        self._operatorApprovals = CachedDictDB(self._OPERATOR_APPROVALS, db, value_type=bool, depth=2, cache=self._cache)
+        self._allTokens = self._cache.track(ArrayDB(self._ALL_TOKENS, db, value_type=int), self._ALL_TOKENS)
+        self._allTokensIndex = CachedDictDB(self._ALL_TOKENS_INDEX, db, value_type=int, cache=self._cache)
+        self._ownedTokensIndex = CachedDictDB(self._OWNED_TOKENS_INDEX, db, value_type=int, cache=self._cache)
+        self._migration = MigrationQueue(db, self._cache)
+        self._legacyTokens = self._cache.track(ArrayDB(self._LEGACY_TOKENS, db, value_type=int), self._LEGACY_TOKENS)
+        self._legacyTokensComplete = CachedVarDB(self._LEGACY_TOKENS_COMPLETE, db, value_type=bool, cache=self._cache)
+        self._cache.track_events(self, ('Approval', 'ApprovalForAll', 'MintRange', 'Transfer', 'MigrationProgress'))
+
+    def on_install(self, _packedLayout: bool = False) -> None:
+        """
+        _packedLayout stores the owner and approved address of each token
+        in one record, so a transfer reads and writes a single storage entry.
+        """
         super().on_install()
+        self._packedLayout.set(_packedLayout)
+        self._rangeFloorSet.set(True)
 
-    def on_update(self) -> None:
+    def on_update(self, _packedLayout: bool = False, _rangeFloor: int = None, _legacyTokens: bool = False) -> None:
+        """
+        Passing _packedLayout switches an existing deployment to the packed
+        layout. Enumerated tokens are converted by runMigration, any other
+        token is still read from the legacy layout until it is next written.
+        The switch can't be undone.
+
+        Tokens minted before the enumeration index can't be found on chain, so
+        a deployment installed without lazy ranges refuses mintRange until the
+        owner passes _rangeFloor, a token ID above every token minted so far.
+        Passing _legacyTokens instead lets the owner list those tokens with
+        queueLegacyTokens, e.g. from an event indexer. runMigration then adds
+        them to the enumeration index and raises the range floor above them.
+        Enumeration queries are refused until that migration completes.
+        """
         super().on_update()
+        if _legacyTokens:
+            self._migration.schedule(self._MIGRATE_LEGACY_TOKENS)
+        if _rangeFloor is not None:
+            self._ensure_positive(_rangeFloor)
+            self._raise_next_range_id(_rangeFloor - 1)
+            self._rangeFloorSet.set(True)
+        if self._nextRangeId.get() == 0 and len(self._allTokens) > 0:
+            # Ranges must start above every enumerated token, mintRange waits for the scan
+            self._migration.schedule(self._MIGRATE_RANGE_FLOOR)
+
+        if not _packedLayout or self._packedLayout.get():
+            return
+        self._packedLayout.set(True)
+        self._migration.schedule(self._MIGRATE_PACKED_LAYOUT)
 
     @external(readonly=True)
+    @cached_call
     def name(self) -> str:
         """
         Returns the name of the token. e.g. CryptoBears.
@@ -64,6 +152,7 @@ class SampleIrc3(IconScoreBase, TokenStandard):
         return "SampleIrc3"
 
     @external(readonly=True)
+    @cached_call
     def symbol(self) -> str:
         """
         Returns the symbol of the token. e.g. CBT.
@@ -71,6 +160,7 @@ class SampleIrc3(IconScoreBase, TokenStandard):
         return "SIT"
 
     @external(readonly=True)
+    @cached_call
     def balanceOf(self, _owner: Address) -> int:
         """
         Returns the number of NFTs owned by _owner.
@@ -82,49 +172,157 @@ class SampleIrc3(IconScoreBase, TokenStandard):
         return self._ownedTokenCount[_owner]
 
     @external(readonly=True)
+    @cached_call
     def ownerOf(self, _tokenId: int) -> Address:
         """
         Returns the owner of an NFT. Throws if _tokenId is not a valid NFT.
         """
-        self._ensure_positive(_tokenId)
-        owner = self._tokenOwner[_tokenId]
-        if owner is None:
-            revert("Invalid _tokenId. NFT is not minted")
-        if self._is_zero_address(owner):
-            revert("Invalid _tokenId. NFT is burned")
-
+        owner, _ = self._load_token(_tokenId, _withApproval=False)
         return owner
 
     @external(readonly=True)
+    @cached_call
     def getApproved(self, _tokenId: int) -> Address:
         """
         Returns the approved address for a single NFT.
         If there is none, returns the zero address.
         Throws if _tokenId is not a valid NFT.
         """
-        self.ownerOf(_tokenId)  # ensure valid token
-        addr = self._tokenApprovals[_tokenId]
+        _, addr = self._load_token(_tokenId)  # ensure valid token
         if addr is None:
             return self._ZERO_ADDRESS
         return addr
 
+    @external(readonly=True)
+    @cached_call
+    def ownersOf(self, _tokenIds: List[int]) -> list:
+        """
+        Returns the owner of each NFT in _tokenIds, in order, as {'value': owner}.
+        An invalid NFT yields {'error': reason} instead of throwing.
+        """
+        return self._aggregate(_tokenIds, lambda tokenId: self._load_token(tokenId, _withApproval=False)[0])
+
+    @external(readonly=True)
+    @cached_call
+    def approvalsOf(self, _tokenIds: List[int]) -> list:
+        """
+        Returns the approved address of each NFT in _tokenIds, in order, as
+        {'value': approved}, the zero address when there is none.
+        An invalid NFT yields {'error': reason} instead of throwing.
+        """
+        return self._aggregate(_tokenIds, self.getApproved)
+
+    @external(readonly=True)
+    @cached_call
+    def balancesOf(self, _owners: List[Address]) -> list:
+        """
+        Returns the number of NFTs owned by each address in _owners, in order,
+        as {'value': balance}. The zero address yields {'error': reason}.
+        """
+        return self._aggregate(_owners, self.balanceOf)
+
+    @external(readonly=True)
+    @cached_call
+    def totalSupply(self) -> int:
+        """
+        Returns the number of valid NFTs tracked by this contract,
+        including the ones still held through a lazily minted run.
+        """
+        self._migration.ensure_done(self._MIGRATE_LEGACY_TOKENS)
+        return len(self._allTokens) + self._lazySupply.get()
+
+    @external(readonly=True)
+    @cached_call
+    def tokenByIndex(self, _index: int) -> int:
+        """
+        Returns the token ID of the _index-th valid NFT.
+        Tokens still held through a lazily minted run are listed by
+        lazyRunsOf() instead, until they are first transferred.
+        Throws if _index is out of range of the listed NFTs.
+        """
+        self._migration.ensure_done(self._MIGRATE_LEGACY_TOKENS)
+        if _index is None or not 0 <= _index < len(self._allTokens):
+            revert("Index out of range")
+        return self._allTokens[_index]
+
+    @external(readonly=True)
+    @cached_call
+    def tokenOfOwnerByIndex(self, _owner: Address, _index: int) -> int:
+        """
+        Returns the token ID of the _index-th NFT owned by _owner.
+        Throws if _index is out of range of the NFTs owned by _owner.
+        """
+        self._migration.ensure_done(self._MIGRATE_LEGACY_TOKENS)
+        owned = self._owned_tokens(_owner)
+        if _index is None or not 0 <= _index < len(owned):
+            revert("Index out of range")
+        return owned[_index]
+
+    @external(readonly=True)
+    @cached_call
+    def tokensOfOwner(self, _owner: Address, _offset: int = 0, _limit: int = 100) -> list:
+        """
+        Returns up to _limit token IDs owned by _owner starting at _offset.
+        _limit is capped to 100 token IDs per call. Tokens still held through
+        a lazily minted run are listed by lazyRunsOf() instead.
+        """
+        if _offset < 0 or _limit < 0:
+            revert("Invalid pagination")
+        self._migration.ensure_done(self._MIGRATE_LEGACY_TOKENS)
+        owned = self._owned_tokens(_owner)
+        end = min(len(owned), _offset + min(_limit, self._MAX_PAGE_SIZE))
+        return [owned[i] for i in range(_offset, end)]
+
+    @external(readonly=True)
+    @cached_call
+    def lazyRunsOf(self, _owner: Address) -> list:
+        """
+        Returns the runs minted to _owner by mintRange as {startId, count}.
+        Tokens of a run may have been transferred since, use ownerOf to check.
+        """
+        return [{'startId': startId, 'count': self._lazyRunSize[startId]}
+                for startId in self._lazy_runs(_owner)]
+
+    @external(readonly=True)
+    @cached_call
+    def isApprovedForAll(self, _owner: Address, _operator: Address) -> bool:
+        """
+        Returns whether _operator is allowed to manage all NFTs of _owner.
+        """
+        return self._operatorApprovals[_owner][_operator]
+
     @external
+    @cached_call
     def approve(self, _to: Address, _tokenId: int):
         """
         Allows _to to change the ownership of _tokenId from your account. 
         The zero address indicates there is no approved address. 
-        Throws unless self.msg.sender is the current NFT owner.
+        Throws unless self.msg.sender is the current NFT owner
+        or an operator approved for all NFTs of the owner.
         """
-        owner = self.ownerOf(_tokenId)
+        owner, approved = self._load_token(_tokenId)
         if _to == owner:
             revert("Can't approve to yourself.")
-        if self.msg.sender != owner:
+        if self.msg.sender != owner and not self._operatorApprovals[owner][self.msg.sender]:
             revert("You do not own this NFT")
 
-        self._tokenApprovals[_tokenId] = _to
+        self._store_token(_tokenId, owner, _to, approved)
         self.Approval(owner, _to, _tokenId)
 
     @external
+    @cached_call
+    def setApprovalForAll(self, _operator: Address, _approved: bool):
+        """
+        Allows or disallows _operator to manage all of your NFTs,
+        including the ones you acquire later, and fires the ApprovalForAll event.
+        """
+        if _operator == self.msg.sender:
+            revert("Can't approve to yourself.")
+        self._operatorApprovals[self.msg.sender][_operator] = _approved
+        self.ApprovalForAll(self.msg.sender, _operator, _approved)
+
+    @external
+    @cached_call
     def transfer(self, _to: Address, _tokenId: int):
         """
         Transfers the ownership of your NFT to another address, 
@@ -132,54 +330,249 @@ class SampleIrc3(IconScoreBase, TokenStandard):
         is the current owner. Throws if _to is the zero address. 
         Throws if _tokenId is not a valid NFT.
         """
-        if self.ownerOf(_tokenId) != self.msg.sender:
+        owner, approved = self._load_token(_tokenId)
+        if owner != self.msg.sender:
             revert("You don't have permission to transfer this NFT")
-        self._transfer(self.msg.sender, _to, _tokenId)
+        self._transfer(self.msg.sender, _to, _tokenId, approved)
 
     @external
+    @cached_call
     def transferFrom(self, _from: Address, _to: Address, _tokenId: int):
         """
         Transfers the ownership of an NFT from one address to another address, 
         and MUST fire the Transfer event. Throws unless self.msg.sender is the 
-        current owner or the approved address for the NFT. Throws if _from is 
-        not the current owner. Throws if _to is the zero address. Throws if 
-        _tokenId is not a valid NFT.
+        current owner, the approved address for the NFT or an operator approved 
+        for all NFTs of the owner. Throws if _from is not the current owner. 
+        Throws if _to is the zero address. Throws if _tokenId is not a valid 
+        NFT.
         """
-        if self.ownerOf(_tokenId) != self.msg.sender and \
-                self._tokenApprovals[_tokenId] != self.msg.sender:
+        owner, approved = self._load_token(_tokenId)
+        if owner != self.msg.sender and \
+                approved != self.msg.sender and \
+                not self._operatorApprovals[owner][self.msg.sender]:
             revert("You don't have permission to transfer this NFT")
-        self._transfer(_from, _to, _tokenId)
+        if owner != _from:
+            revert("_from is not the owner of this NFT")
+        self._transfer(_from, _to, _tokenId, approved)
 
-    def _transfer(self, _from: Address, _to: Address, _tokenId: int):
+    def _transfer(self, _from: Address, _to: Address, _tokenId: int, _approved: Address):
         if _to is None or self._is_zero_address(_to):
             revert("You can't transfer to a zero address")
 
-        self._clear_approval(_tokenId)
+        self._store_token(_tokenId, _to, None, _approved)
         self._remove_tokens_from(_from, _tokenId)
         self._add_tokens_to(_to, _tokenId)
         self.Transfer(_from, _to, _tokenId)
         Logger.debug(f'Transfer({_from}, {_to}, {_tokenId}, TAG)')
 
     @external
+    @cached_call
+    def transferBatch(self, _to: Address, _tokenIds: List[int]):
+        """
+        Transfers the ownership of several of your NFTs to another address
+        in one call and fires a Transfer event for each of them. Either all
+        NFTs are transferred or the call throws. Throws unless self.msg.sender
+        is the current owner of every NFT. Throws if _to is the zero address.
+        """
+        self._transfer_batch(self.msg.sender, _to, _tokenIds)
+
+    @external
+    @cached_call
+    def transferFromBatch(self, _from: Address, _to: Address, _tokenIds: List[int]):
+        """
+        Transfers the ownership of several NFTs from one address to another
+        address in one call and fires a Transfer event for each of them.
+        Either all NFTs are transferred or the call throws. Throws unless
+        self.msg.sender is the current owner, an operator approved for all
+        NFTs of _from, or the approved address of every NFT. Throws if _from
+        is not the current owner of every NFT. Throws if _to is the zero
+        address.
+        """
+        self._transfer_batch(_from, _to, _tokenIds)
+
+    def _transfer_batch(self, _from: Address, _to: Address, _tokenIds: list):
+        if _to is None or self._is_zero_address(_to):
+            revert("You can't transfer to a zero address")
+        self._ensure_batch_size(len(_tokenIds))
+
+        # Validate the whole batch before touching storage so that
+        # either every token moves or none does
+        isOperator = _from != self.msg.sender and self._operatorApprovals[_from][self.msg.sender]
+        approved = []
+        for tokenId in _tokenIds:
+            owner, approvedAddress = self._load_token(tokenId)
+            if owner != self.msg.sender and approvedAddress != self.msg.sender and not isOperator:
+                revert("You don't have permission to transfer this NFT")
+            if owner != _from:
+                revert("_from is not the owner of this NFT")
+            approved.append(approvedAddress)
+        if len(set(_tokenIds)) != len(_tokenIds):
+            revert("Duplicate _tokenId in batch")
+
+        fromTokens = self._owned_tokens(_from)
+        for tokenId, approvedAddress in zip(_tokenIds, approved):
+            self._store_token(tokenId, _to, None, approvedAddress)
+            self._index_remove(fromTokens, self._ownedTokensIndex, tokenId)
+            self.Transfer(_from, _to, tokenId)
+        self._index_add(self._owned_tokens(_to), self._ownedTokensIndex, _tokenIds)
+
+        # Token counts change once per address pair for the whole batch
+        self._ownedTokenCount[_from] -= len(_tokenIds)
+        self._ownedTokenCount[_to] += len(_tokenIds)
+        Logger.debug(f'TransferBatch({_from}, {_to}, {len(_tokenIds)})', TAG)
+
+    @external
+    @cached_call
     def mint(self, _to: Address, _tokenId: int):
         # Mint a new NFT token
         if self.msg.sender != self.owner:
             revert("You don't have permission to mint NFT")
-        if _tokenId in self._tokenOwner:
+        if self._token_exists(_tokenId):
             revert("Token already exists")
+        self._store_token(_tokenId, _to, None)
         self._add_tokens_to(_to, _tokenId)
+        self._raise_next_range_id(_tokenId)
+        self._index_add(self._allTokens, self._allTokensIndex, [_tokenId])
         self.Transfer(self._ZERO_ADDRESS, _to, _tokenId)
 
     @external
+    @cached_call
+    def mintBatch(self, _to: Address, _tokenIds: List[int]):
+        # Mint a list of new NFT tokens to a single owner
+        if self.msg.sender != self.owner:
+            revert("You don't have permission to mint NFT")
+        self._ensure_batch_size(len(_tokenIds))
+        for tokenId in _tokenIds:
+            if self._token_exists(tokenId):
+                revert("Token already exists")
+            self._store_token(tokenId, _to, None)
+            self.Transfer(self._ZERO_ADDRESS, _to, tokenId)
+        self._ownedTokenCount[_to] += len(_tokenIds)
+        self._index_add(self._owned_tokens(_to), self._ownedTokensIndex, _tokenIds)
+        self._index_add(self._allTokens, self._allTokensIndex, _tokenIds)
+        self._raise_next_range_id(max(_tokenIds))
+
+    @external
+    @cached_call
+    def mintBatchTo(self, _recipients: List[Address], _tokenIds: List[int]):
+        # Mint _tokenIds[i] to _recipients[i], updating each recipient's token count once
+        if self.msg.sender != self.owner:
+            revert("You don't have permission to mint NFT")
+        if len(_recipients) != len(_tokenIds):
+            revert("Recipients and token IDs must have the same length")
+        self._ensure_batch_size(len(_tokenIds))
+        minted = {}
+        for to, tokenId in zip(_recipients, _tokenIds):
+            if self._token_exists(tokenId):
+                revert("Token already exists")
+            self._store_token(tokenId, to, None)
+            self.Transfer(self._ZERO_ADDRESS, to, tokenId)
+            minted.setdefault(to, []).append(tokenId)
+        for to, tokenIds in minted.items():
+            self._ownedTokenCount[to] += len(tokenIds)
+            self._index_add(self._owned_tokens(to), self._ownedTokensIndex, tokenIds)
+        self._index_add(self._allTokens, self._allTokensIndex, _tokenIds)
+        self._raise_next_range_id(max(_tokenIds))
+
+    @external
+    @cached_call
+    def mintRange(self, _to: Address, _startId: int, _count: int):
+        """
+        Mints _count sequential NFTs starting at _startId to _to, writing only
+        one anchor every 32 tokens instead of one owner entry per token.
+        The owner of a token in the run is found from the nearest anchor below it,
+        and a token gets its own entry the first time it is transferred.
+        _startId must be above every token minted so far.
+        Fires one MintRange event instead of a Transfer event per token.
+        """
+        if self.msg.sender != self.owner:
+            revert("You don't have permission to mint NFT")
+        if _to is None or self._is_zero_address(_to):
+            revert("You can't mint to a zero address")
+        if _count is None or not 0 < _count <= self._MAX_RANGE_SIZE:
+            revert(f"Invalid _count, must be between 1 and {self._MAX_RANGE_SIZE}")
+        self._ensure_positive(_startId)
+        if not self._rangeFloorSet.get():
+            revert("Range floor unknown, pass _rangeFloor on update")
+        self._migration.ensure_done(self._MIGRATE_RANGE_FLOOR)
+        if _startId < self._nextRangeId.get():
+            revert("Range overlaps minted tokens")
+
+        runEnd = _startId + _count
+        anchor = self._pack_anchor(_to, runEnd)
+        for anchorId in range(_startId, runEnd, self._RUN_ANCHOR_INTERVAL):
+            self._runAnchor[anchorId] = anchor
+
+        self._lazy_runs(_to).put(_startId)
+        self._lazyRunSize[_startId] = _count
+        self._lazySupply.set(self._lazySupply.get() + _count)
+        self._nextRangeId.set(runEnd)
+        self._ownedTokenCount[_to] += _count
+        self.MintRange(_to, _startId, _count)
+
+    @external(readonly=True)
+    @cached_call
+    def batchStepCost(self) -> dict:
+        """
+        Returns the estimated step cost per token of each batch method
+        and the maximum number of tokens accepted by a single batch call.
+        """
+        return dict(self._BATCH_STEP_COST, maxBatchSize=self._MAX_BATCH_SIZE)
+
+    @external
+    @cached_call
+    def runMigration(self, _maxItems: int):
+        """
+        Runs the pending state migrations scheduled by on_update, processing
+        at most _maxItems items so the call fits in the step limit.
+        Call it again until migrationStatus reports nothing pending.
+        """
+        if self.msg.sender != self.owner:
+            revert("You don't have permission to run migrations")
+        for name, items, completed in self._migration.run(self, _maxItems):
+            self.MigrationProgress(name, items, completed)
+
+    @external(readonly=True)
+    @cached_call
+    def migrationStatus(self) -> dict:
+        """
+        Returns the number of completed migrations, the pending ones in running
+        order, and the stored cursor and processed item count of the current one.
+        """
+        return self._migration.status()
+
+    @external
+    @cached_call
+    def queueLegacyTokens(self, _tokenIds: List[int], _complete: bool = False):
+        """
+        Queues token IDs minted before the enumeration index for the
+        legacyTokens migration, at most 500 per call. Pass _complete with
+        the last chunk. Burned or already enumerated tokens are skipped.
+        """
+        if self.msg.sender != self.owner:
+            revert("You don't have permission to run migrations")
+        if not self._migration.is_pending(self._MIGRATE_LEGACY_TOKENS) or self._legacyTokensComplete.get():
+            revert("No legacy tokens expected")
+        if len(_tokenIds) > self._MAX_BATCH_SIZE:
+            revert(f"Batch too large, max {self._MAX_BATCH_SIZE} tokens")
+        for tokenId in _tokenIds:
+            self._legacyTokens.put(tokenId)
+        if _complete:
+            self._legacyTokensComplete.set(True)
+
+    @external
+    @cached_call
     def burn(self, _tokenId: int):
         # Burn NFT token
-        if self.ownerOf(_tokenId) != self.msg.sender:
+        owner, approved = self._load_token(_tokenId)
+        if owner != self.msg.sender:
             revert("You dont have permission to burn this NFT")
-        self._burn(self.msg.sender, _tokenId)
+        self._burn(self.msg.sender, _tokenId, approved)
 
-    def _burn(self, _owner: Address, _tokenId: int):
-        self._clear_approval(_tokenId)
+    def _burn(self, _owner: Address, _tokenId: int, _approved: Address):
+        self._store_token(_tokenId, self._ZERO_ADDRESS, None, _approved)
         self._remove_tokens_from(_owner, _tokenId)
+        self._index_remove(self._allTokens, self._allTokensIndex, _tokenId)
         self.Transfer(_owner, self._ZERO_ADDRESS, _tokenId)
 
     def _is_zero_address(self, _address: Address) -> bool:
@@ -192,26 +585,228 @@ class SampleIrc3(IconScoreBase, TokenStandard):
         if _tokenId is None or _tokenId < 0:
             revert("tokenId should be positive")
 
-    def _clear_approval(self, _tokenId: int):
-        # Delete token's approved operator
-        if _tokenId in self._tokenApprovals:
+    def _aggregate(self, _items: list, _read) -> list:
+        # Reads every item, a failing read is reported in place instead of reverting the call
+        if len(_items) > self._MAX_BATCH_SIZE:
+            revert(f"Batch too large, max {self._MAX_BATCH_SIZE} tokens")
+        results = []
+        for item in _items:
+            try:
+                results.append({'value': _read(item)})
+            except IconScoreException as e:
+                results.append({'error': e.message})
+        return results
+
+    def _ensure_batch_size(self, _size: int):
+        if _size == 0:
+            revert("Empty batch")
+        if _size > self._MAX_BATCH_SIZE:
+            revert(f"Batch too large, max {self._MAX_BATCH_SIZE} tokens")
+
+    def _load_token(self, _tokenId: int, _withApproval: bool = True) -> tuple:
+        # Returns (owner, approved address) of a valid NFT, throws otherwise
+        self._ensure_positive(_tokenId)
+        owner, approved, _ = self._resolve_token(_tokenId, _withApproval)
+        if owner is None:
+            revert("Invalid _tokenId. NFT is not minted")
+        if self._is_zero_address(owner):
+            revert("Invalid _tokenId. NFT is burned")
+        return owner, approved
+
+    def _resolve_token(self, _tokenId: int, _withApproval: bool = True) -> tuple:
+        # Returns (owner, approved address, run end) of a token, owner is None if never minted.
+        # Run end is non-zero while the token is implicitly owned through a lazily minted run.
+        # Tokens not converted to the packed layout yet are read from the legacy one
+        record = self._tokenRecord[_tokenId] if self._packedLayout.get() else None
+        if record is not None:
+            owner, approved = self._unpack_record(record)
+            return owner, approved, 0
+
+        owner = self._tokenOwner[_tokenId]
+        if owner is not None:
+            return owner, self._tokenApprovals[_tokenId] if _withApproval else None, 0
+        if self._lazySupply.get() == 0 or _tokenId >= self._nextRangeId.get():
+            return None, None, 0
+
+        # Look back to the nearest anchor, at most one anchor interval away
+        for anchorId in range(_tokenId, max(_tokenId - self._RUN_ANCHOR_INTERVAL, -1), -1):
+            anchor = self._runAnchor[anchorId]
+            if anchor is not None:
+                anchorOwner, runEnd = self._unpack_anchor(anchor)
+                if _tokenId < runEnd:
+                    return anchorOwner, None, runEnd
+                break
+        return None, None, 0
+
+    def _store_token(self, _tokenId: int, _owner: Address, _approved: Address, _previousApproved: Address = None):
+        # Packed layout writes one record, legacy layout only touches
+        # the approval entry when the approved address changes
+        if self._lazySupply.get() > 0:
+            self._split_run(_tokenId, _owner)
+
+        if self._packedLayout.get():
+            self._tokenRecord[_tokenId] = self._pack_record(_owner, _approved)
+            return
+
+        self._tokenOwner[_tokenId] = _owner
+        if _approved == _previousApproved:
+            return
+        if _approved is None:
             del self._tokenApprovals[_tokenId]
+        else:
+            self._tokenApprovals[_tokenId] = _approved
+
+    def _token_exists(self, _tokenId: int) -> bool:
+        # Minted tokens, including burned ones, can't be minted again
+        return self._resolve_token(_tokenId, _withApproval=False)[0] is not None
+
+    def _split_run(self, _tokenId: int, _newOwner: Address):
+        # Called before a token gets its own entry. If it was implicitly owned
+        # through a run, anchor the next token to keep the rest of the run intact
+        owner, _, runEnd = self._resolve_token(_tokenId, _withApproval=False)
+        if runEnd == 0:
+            return
+
+        nextId = _tokenId + 1
+        if nextId < runEnd and self._runAnchor[nextId] is None and \
+                self._resolve_token(nextId, _withApproval=False)[2] != 0:
+            self._runAnchor[nextId] = self._pack_anchor(owner, runEnd)
+        if self._runAnchor[_tokenId] is not None:
+            del self._runAnchor[_tokenId]
+        self._lazySupply.set(self._lazySupply.get() - 1)
+
+        # The token joins the enumeration index, callers moving it update the owner lists
+        if not self._is_zero_address(_newOwner):
+            self._index_add(self._allTokens, self._allTokensIndex, [_tokenId])
+        if _newOwner == owner:
+            self._index_add(self._owned_tokens(owner), self._ownedTokensIndex, [_tokenId])
+
+    def _raise_next_range_id(self, _tokenId: int):
+        if _tokenId >= self._nextRangeId.get():
+            self._nextRangeId.set(_tokenId + 1)
+
+    def _migrate_rangeFloor(self, _cursor: int, _maxItems: int) -> tuple:
+        # Scans _allTokens from the end, _cursor is the count of unscanned tokens.
+        # Swap-and-pop only moves scanned tokens, and tokens minted meanwhile raise the floor themselves.
+        remaining = len(self._allTokens) if _cursor is None else min(_cursor, len(self._allTokens))
+        processed = min(remaining, _maxItems)
+        for index in range(remaining - 1, remaining - 1 - processed, -1):
+            self._raise_next_range_id(self._allTokens[index])
+        remaining -= processed
+        return (remaining or None), processed
+
+    def _migrate_packedLayout(self, _cursor: int, _maxItems: int) -> tuple:
+        # Same scan as _migrate_rangeFloor. Tokens written since the switch already have a record.
+        remaining = len(self._allTokens) if _cursor is None else min(_cursor, len(self._allTokens))
+        processed = min(remaining, _maxItems)
+        for index in range(remaining - 1, remaining - 1 - processed, -1):
+            tokenId = self._allTokens[index]
+            if self._tokenRecord[tokenId] is None:
+                self._tokenRecord[tokenId] = self._pack_record(self._tokenOwner[tokenId], self._tokenApprovals[tokenId])
+        remaining -= processed
+        return (remaining or None), processed
+
+    def _migrate_legacyTokens(self, _cursor: int, _maxItems: int) -> tuple:
+        # _cursor is the position of the next queued token, the migration ends with the complete queue
+        position = _cursor or 0
+        end = min(len(self._legacyTokens), position + _maxItems)
+        for index in range(position, end):
+            self._enumerate_legacy_token(self._legacyTokens[index])
+        if end == len(self._legacyTokens) and self._legacyTokensComplete.get():
+            # Every token minted before the update has been seen
+            self._rangeFloorSet.set(True)
+            return None, end - position
+        return end, end - position
+
+    def _enumerate_legacy_token(self, _tokenId: int):
+        # Indexes the token like a mint would, unless it was indexed since the update
+        owner, _, runEnd = self._resolve_token(_tokenId, _withApproval=False)
+        if owner is None or runEnd != 0:
+            return
+        self._raise_next_range_id(_tokenId)
+        if self._is_zero_address(owner):
+            return
+        if self._allTokensIndex[_tokenId] == 0:
+            self._index_add(self._allTokens, self._allTokensIndex, [_tokenId])
+        if self._ownedTokensIndex[_tokenId] == 0:
+            self._index_add(self._owned_tokens(owner), self._ownedTokensIndex, [_tokenId])
+
+    def _pack_record(self, _owner: Address, _approved: Address) -> bytes:
+        # Length of owner bytes, owner bytes, approved address bytes (if any)
+        owner = _owner.to_bytes()
+        approved = b'' if _approved is None else _approved.to_bytes()
+        return bytes([len(owner)]) + owner + approved
+
+    def _unpack_record(self, _record: bytes) -> tuple:
+        size = _record[0]
+        owner = Address.from_bytes(_record[1:1 + size])
+        approved = Address.from_bytes(_record[1 + size:]) if len(_record) > 1 + size else None
+        return owner, approved
+
+    def _pack_anchor(self, _owner: Address, _runEnd: int) -> bytes:
+        # Length of owner bytes, owner bytes, exclusive end of the run
+        owner = _owner.to_bytes()
+        return bytes([len(owner)]) + owner + _runEnd.to_bytes((_runEnd.bit_length() + 7) // 8, 'big')
+
+    def _unpack_anchor(self, _anchor: bytes) -> tuple:
+        size = _anchor[0]
+        return Address.from_bytes(_anchor[1:1 + size]), int.from_bytes(_anchor[1 + size:], 'big')
 
     def _remove_tokens_from(self, _from: Address, _tokenId: int):
-        # Remove token ownership and subtract owner's token count by 1
-        # Must ensure owner's permission before calling this function
+        # Subtract owner's token count by 1 and drop the token from owner's list
+        # Must ensure owner's permission and update the token owner before calling this function
         self._ownedTokenCount[_from] -= 1
-        self._tokenOwner[_tokenId] = self._ZERO_ADDRESS
+        self._index_remove(self._owned_tokens(_from), self._ownedTokensIndex, _tokenId)
 
     def _add_tokens_to(self, _to: Address, _tokenId: int):
-        # Add token to new owner and increase token count of owner by 1
-        self._tokenOwner[_tokenId] = _to
+        # Increase token count of new owner by 1 and add the token to owner's list
         self._ownedTokenCount[_to] += 1
+        self._index_add(self._owned_tokens(_to), self._ownedTokensIndex, [_tokenId])
+
+    def _owned_tokens(self, _owner: Address) -> ArrayDB:
+        # List of token IDs owned by _owner
+        return self._cache.track(ArrayDB(f'{self._OWNED_TOKENS}|{_owner}', self._db, value_type=int), self._OWNED_TOKENS)
+
+    def _lazy_runs(self, _owner: Address) -> ArrayDB:
+        # List of start IDs of the runs minted to _owner
+        return self._cache.track(ArrayDB(f'{self._LAZY_RUNS}|{_owner}', self._db, value_type=int), self._LAZY_RUNS)
+
+    def _index_add(self, _tokens: ArrayDB, _positions: DictDB, _tokenIds: list):
+        # Append tokens to an enumeration list and record their 1-based positions
+        size = len(_tokens)
+        for tokenId in _tokenIds:
+            _tokens.put(tokenId)
+            size += 1
+            _positions[tokenId] = size
+
+    def _index_remove(self, _tokens: ArrayDB, _positions: DictDB, _tokenId: int):
+        # Swap-and-pop removal, keeps the enumeration list dense in O(1)
+        position = _positions[_tokenId]
+        if position == 0:
+            # Token was minted before enumeration was tracked
+            return
+        last = _tokens.pop()
+        if last != _tokenId:
+            _tokens[position - 1] = last
+            _positions[last] = position
+        del _positions[_tokenId]
 
     @eventlog(indexed=3)
     def Approval(self, _owner: Address, _approved: Address, _tokenId: int):
         pass
 
+    @eventlog(indexed=2)
+    def ApprovalForAll(self, _owner: Address, _operator: Address, _approved: bool):
+        pass
+
+    @eventlog(indexed=1)
+    def MintRange(self, _to: Address, _startId: int, _count: int):
+        pass
+
     @eventlog(indexed=3)
     def Transfer(self, _from: Address, _to: Address, _tokenId: int):
         pass
+
+    @eventlog(indexed=1)
+    def MigrationProgress(self, _name: str, _items: int, _completed: bool):
+        pass
@@ -1,4 +1,7 @@
+from ..instrumentation import InMemoryCollector, InstrumentedStorageCache, install_collector, remove_collector
 from ..sample_irc3 import SampleIrc3
+from ..storage_cache import StorageCache
+from tbears.libs.scoretest.patch.context import Context
 from tbears.libs.scoretest.score_test_case import ScoreTestCase
 from iconservice import *
 
@@ -11,6 +14,13 @@ class TestSampleIrc3(ScoreTestCase):
         self.mock_score_address = Address.from_string(f"cx{'1234'*10}")
         self.score = self.get_score_instance(SampleIrc3, self.test_account1)
 
+    def restore_invoke_context(self):
+        # tbears keeps the query context of the last readonly call, and the call trace of a
+        # readonly call that reverted, so writes made after them would fail as readonly
+        context = Context.get_context()
+        context.method_flag_trace.clear()
+        Context._set_invoke_context(context)
+
     def test_get_name(self):
         self.assertEqual("SampleIrc3", self.score.name())
 
@@ -79,3 +89,413 @@ class TestSampleIrc3(ScoreTestCase):
             self.score.ownerOf(2)
         self.assertEqual(e.exception.code, 32)
         self.assertEqual(e.exception.message, "Invalid _tokenId. NFT is not minted")
+
+    def test_set_mintBatch(self):
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account2, [1, 2, 3])
+        for tokenId in [1, 2, 3]:
+            self.assertEqual(self.score.ownerOf(tokenId), self.test_account2)
+        self.assertEqual(self.score.balanceOf(self.test_account2), 3)
+
+    def test_set_mintBatchTo(self):
+        self.set_msg(self.test_account1)
+        self.score.mintBatchTo([self.test_account1, self.test_account2, self.test_account1], [1, 2, 3])
+        self.assertEqual(self.score.ownerOf(2), self.test_account2)
+        self.assertEqual(self.score.balanceOf(self.test_account1), 2)
+        self.assertEqual(self.score.balanceOf(self.test_account2), 1)
+
+    def test_error_mintBatch(self):
+        self.set_msg(self.test_account1)
+        self.score.mint(self.test_account1, 2)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintBatch(self.test_account2, [1, 2])
+        self.assertEqual(e.exception.message, "Token already exists")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintBatch(self.test_account2, [3, 3])
+        self.assertEqual(e.exception.message, "Token already exists")
+
+        self.set_msg(self.test_account2)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintBatch(self.test_account2, [4])
+        self.assertEqual(e.exception.message, "You don't have permission to mint NFT")
+
+    def test_get_batchStepCost(self):
+        cost = self.score.batchStepCost()
+        self.assertTrue(cost['mintBatch'] > 0)
+        self.assertEqual(cost['maxBatchSize'], 500)
+
+    def test_set_transferBatch(self):
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [1, 2, 3])
+        self.score.approve(self.test_account2, 2)
+        self.score.transferBatch(self.test_account2, [1, 2])
+        self.assertEqual(self.score.ownerOf(1), self.test_account2)
+        self.assertEqual(self.score.ownerOf(2), self.test_account2)
+        self.assertEqual(self.score.getApproved(2), Address.from_prefix_and_int(AddressPrefix.EOA, 0))
+        self.assertEqual(1, self.score.balanceOf(self.test_account1))
+        self.assertEqual(2, self.score.balanceOf(self.test_account2))
+
+    def test_set_transferFromBatch(self):
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [1, 2])
+        self.score.approve(self.test_account2, 1)
+        self.score.approve(self.test_account2, 2)
+        self.set_msg(self.test_account2)
+        self.score.transferFromBatch(self.test_account1, self.test_account2, [1, 2])
+        self.assertEqual(self.score.ownerOf(1), self.test_account2)
+        self.assertEqual(0, self.score.balanceOf(self.test_account1))
+        self.assertEqual(2, self.score.balanceOf(self.test_account2))
+
+    def test_error_transferBatch(self):
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [1, 2])
+        self.score.mint(self.test_account2, 3)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferBatch(self.test_account2, [1, 3])
+        self.assertEqual(e.exception.message, "You don't have permission to transfer this NFT")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferBatch(self.test_account2, [1, 1])
+        self.assertEqual(e.exception.message, "Duplicate _tokenId in batch")
+        self.assertEqual(2, self.score.balanceOf(self.test_account1))
+
+        self.set_msg(self.test_account2)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferFromBatch(self.test_account1, self.test_account2, [1, 2])
+        self.assertEqual(e.exception.message, "You don't have permission to transfer this NFT")
+
+    def test_get_enumeration(self):
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [1, 2, 3, 4])
+        self.score.mint(self.test_account2, 5)
+        self.assertEqual(5, self.score.totalSupply())
+        self.assertEqual([1, 2, 3, 4], self.score.tokensOfOwner(self.test_account1, 0, 10))
+
+        # Swap-and-pop moves the last token into the freed slot
+        self.score.transfer(self.test_account2, 2)
+        self.assertEqual([1, 4, 3], self.score.tokensOfOwner(self.test_account1, 0, 10))
+        self.assertEqual([5, 2], self.score.tokensOfOwner(self.test_account2, 0, 10))
+        self.assertEqual(4, self.score.tokenOfOwnerByIndex(self.test_account1, 1))
+
+        self.score.burn(1)
+        self.assertEqual(4, self.score.totalSupply())
+        self.assertEqual([5, 2, 3, 4], [self.score.tokenByIndex(i) for i in range(4)])
+        self.assertEqual([3, 4], self.score.tokensOfOwner(self.test_account1, 0, 10))
+        self.assertEqual([4], self.score.tokensOfOwner(self.test_account1, 1, 1))
+
+        self.score.transferBatch(self.test_account2, [3, 4])
+        self.assertEqual([], self.score.tokensOfOwner(self.test_account1, 0, 10))
+        self.assertEqual([5, 2, 3, 4], self.score.tokensOfOwner(self.test_account2, 0, 10))
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.tokenOfOwnerByIndex(self.test_account1, 0)
+        self.assertEqual(e.exception.message, "Index out of range")
+
+    def test_set_approvalForAll(self):
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [1, 2, 3])
+        self.score.setApprovalForAll(self.test_account2, True)
+        self.assertTrue(self.score.isApprovedForAll(self.test_account1, self.test_account2))
+
+        self.set_msg(self.test_account2)
+        self.score.transferFrom(self.test_account1, self.test_account2, 1)
+        self.score.transferFromBatch(self.test_account1, self.test_account2, [2, 3])
+        self.assertEqual(3, self.score.balanceOf(self.test_account2))
+
+        self.set_msg(self.test_account2)
+        self.score.transferBatch(self.test_account1, [1, 2, 3])
+        self.set_msg(self.test_account1)
+        self.score.setApprovalForAll(self.test_account2, False)
+        self.assertFalse(self.score.isApprovedForAll(self.test_account1, self.test_account2))
+        self.set_msg(self.test_account2)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.transferFrom(self.test_account1, self.test_account2, 1)
+        self.assertEqual(e.exception.message, "You don't have permission to transfer this NFT")
+
+    def test_storage_cache_scope(self):
+        # Writes stay pending until the outermost scope ends
+        cache = self.score._cache
+        cache.begin()
+        self.score._ownedTokenCount[self.test_account2] = 5
+        self.assertEqual(5, self.score.balanceOf(self.test_account2))
+        cache.end(commit=False)
+        self.assertEqual(0, self.score.balanceOf(self.test_account2))
+
+        self.restore_invoke_context()
+        cache.begin()
+        self.score._ownedTokenCount[self.test_account2] = 5
+        del self.score._tokenApprovals[1]
+        self.assertFalse(1 in self.score._tokenApprovals)
+        cache.end(commit=True)
+        self.assertEqual(5, self.score.balanceOf(self.test_account2))
+
+    def test_error_discards_pending_writes(self):
+        self.set_msg(self.test_account1)
+        self.score.mint(self.test_account1, 2)
+        with self.assertRaises(IconScoreException):
+            self.score.mintBatch(self.test_account1, [1, 2])
+        with self.assertRaises(IconScoreException) as e:
+            self.score.ownerOf(1)
+        self.assertEqual(e.exception.message, "Invalid _tokenId. NFT is not minted")
+
+    def test_update_to_packed_layout(self):
+        self.score = self.get_score_instance(SampleIrc3, self.test_account1)
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [1, 2])
+        self.score.approve(self.test_account2, 1)
+
+        self.score = self.update_score(self.score.address, SampleIrc3, on_update_params={'_packedLayout': True})
+        self.set_msg(self.test_account1)
+        self.assertTrue(self.score._packedLayout.get())
+        # Unconverted tokens are read from the legacy layout
+        self.assertIsNone(self.score._tokenRecord[1])
+        self.assertEqual(self.score.getApproved(1), self.test_account2)
+        self.score.runMigration(10)
+        self.assertIsNotNone(self.score._tokenRecord[1])
+        self.assertEqual(self.score.ownerOf(2), self.test_account1)
+        self.assertEqual(self.score.getApproved(1), self.test_account2)
+
+        self.set_msg(self.test_account2)
+        self.score.transferFrom(self.test_account1, self.test_account2, 1)
+        self.assertEqual(self.score.ownerOf(1), self.test_account2)
+        self.assertEqual(self.score.getApproved(1), Address.from_prefix_and_int(AddressPrefix.EOA, 0))
+
+    def test_update_packed_layout_again(self):
+        self.score = self.get_score_instance(SampleIrc3, self.test_account1, on_install_params={'_packedLayout': True})
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [1, 2])
+        self.score.approve(self.test_account2, 1)
+
+        # Nothing left to convert
+        self.score = self.update_score(self.score.address, SampleIrc3, on_update_params={'_packedLayout': True})
+        self.assertTrue(self.score._packedLayout.get())
+        self.assertEqual([], self.score.migrationStatus()['pending'])
+        self.assertEqual((self.test_account1, self.test_account2), self.score._unpack_record(self.score._tokenRecord[1]))
+        self.assertEqual(self.score.ownerOf(2), self.test_account1)
+
+    def test_set_mintRange(self):
+        self.set_msg(self.test_account1)
+        self.score.mint(self.test_account1, 1)
+        self.score.mintRange(self.test_account2, 10, 100)
+        self.assertEqual(101, self.score.totalSupply())
+        self.assertEqual(100, self.score.balanceOf(self.test_account2))
+        self.assertEqual([{'startId': 10, 'count': 100}], self.score.lazyRunsOf(self.test_account2))
+        for tokenId in [10, 41, 42, 43, 109]:
+            self.assertEqual(self.score.ownerOf(tokenId), self.test_account2)
+
+        # Ids around the run are not minted
+        for tokenId in [5, 110]:
+            with self.assertRaises(IconScoreException) as e:
+                self.score.ownerOf(tokenId)
+            self.assertEqual(e.exception.message, "Invalid _tokenId. NFT is not minted")
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mint(self.test_account1, 50)
+        self.assertEqual(e.exception.message, "Token already exists")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintRange(self.test_account1, 100, 10)
+        self.assertEqual(e.exception.message, "Range overlaps minted tokens")
+
+    def test_set_transfer_from_range(self):
+        self.set_msg(self.test_account1)
+        self.score.mintRange(self.test_account1, 0, 70)
+
+        # Transferring out of a run splits it, the rest of the run keeps its owner
+        self.score.transfer(self.test_account2, 32)
+        self.score.transferBatch(self.test_account2, [33, 34, 63])
+        self.score.burn(35)
+        self.score.approve(self.test_account2, 36)
+        self.assertEqual(self.score.ownerOf(32), self.test_account2)
+        self.assertEqual(self.score.ownerOf(34), self.test_account2)
+        self.assertEqual(self.score.getApproved(36), self.test_account2)
+        for tokenId in [31, 36, 37, 62, 64, 69]:
+            self.assertEqual(self.score.ownerOf(tokenId), self.test_account1)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.ownerOf(35)
+        self.assertEqual(e.exception.message, "Invalid _tokenId. NFT is burned")
+
+        self.assertEqual(65, self.score.balanceOf(self.test_account1))
+        self.assertEqual(4, self.score.balanceOf(self.test_account2))
+        self.assertEqual(69, self.score.totalSupply())
+        self.assertEqual([36], self.score.tokensOfOwner(self.test_account1, 0, 10))
+        self.assertEqual([32, 33, 34, 63], self.score.tokensOfOwner(self.test_account2, 0, 10))
+
+    def test_aggregate_reads(self):
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [1, 2, 3])
+        self.score.approve(self.test_account2, 2)
+        self.score.burn(3)
+
+        # Results follow the input order, invalid items are reported in place
+        self.assertEqual([{'value': self.test_account1}, {'error': "Invalid _tokenId. NFT is burned"},
+                          {'value': self.test_account1}, {'error': "Invalid _tokenId. NFT is not minted"}],
+                         self.score.ownersOf([1, 3, 2, 9]))
+        self.assertEqual([{'value': self.score._ZERO_ADDRESS}, {'value': self.test_account2}],
+                         self.score.approvalsOf([1, 2]))
+        self.assertEqual([{'value': 0}, {'value': 2}, {'error': "Invalid owner"}],
+                         self.score.balancesOf([self.test_account2, self.test_account1, self.score._ZERO_ADDRESS]))
+        self.assertEqual([], self.score.ownersOf([]))
+
+    def test_storage_instrumentation(self):
+        collector = InMemoryCollector()
+        install_collector(collector)
+        self.addCleanup(remove_collector)
+        score = self.get_score_instance(SampleIrc3, self.test_account1)
+        self.assertIsInstance(score._cache, InstrumentedStorageCache)
+        # tbears swaps the event logs for mocks once the SCORE is built, track the mock instead
+        score._cache.track_events(score, ('Transfer',))
+
+        self.set_msg(self.test_account1)
+        score.mint(self.test_account1, 1)
+        collector.clear()
+        score.transfer(self.test_account2, 1)
+
+        # One report per external call, counting only accesses that reach the database
+        self.assertEqual(['transfer'], [method for method, _ in collector.calls])
+        storage = collector.storage('transfer')
+        self.assertEqual({'reads': 2, 'writes': 2, 'deletes': 0, 'bytes_written': 2}, storage['owned_token_count'])
+        self.assertEqual(21, storage['token_owner']['bytes_written'])
+        self.assertEqual(1, storage['owned_tokens']['deletes'])
+        self.assertEqual(1, collector.events('transfer')['Transfer']['count'])
+        self.assertEqual({}, collector.storage('mint'))
+
+    def test_storage_instrumentation_disabled(self):
+        self.assertIs(StorageCache, type(self.score._cache))
+        self.assertIsInstance(self.score._allTokens, ArrayDB)
+
+    def test_chunked_migration(self):
+        self.score = self.get_score_instance(SampleIrc3, self.test_account1)
+        self.set_msg(self.test_account1)
+        self.score.mintBatch(self.test_account1, [3, 9, 5, 7])
+        self.score.approve(self.test_account2, 9)
+        # Deployment from before lazy ranges, with every token enumerated
+        self.score._nextRangeId.remove()
+        self.score._rangeFloorSet.remove()
+
+        self.score = self.update_score(self.score.address, SampleIrc3,
+                                       on_update_params={'_packedLayout': True, '_rangeFloor': 0})
+        self.set_msg(self.test_account1)
+        self.assertEqual({'completed': 0, 'pending': ['rangeFloor', 'packedLayout'], 'current': 'rangeFloor',
+                          'cursor': None, 'processed': 0}, self.score.migrationStatus())
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintRange(self.test_account1, 100, 10)
+        self.assertEqual(e.exception.message, "Migration in progress")
+
+        # Burning a scanned token moves the last one into its place
+        self.score.runMigration(3)
+        self.assertEqual({'completed': 0, 'pending': ['rangeFloor', 'packedLayout'], 'current': 'rangeFloor',
+                          'cursor': 1, 'processed': 3}, self.score.migrationStatus())
+        self.score.burn(3)
+        self.score.runMigration(2)
+        self.assertEqual(10, self.score._nextRangeId.get())
+        self.assertEqual(['packedLayout'], self.score.migrationStatus()['pending'])
+        self.score.mintRange(self.test_account1, 10, 5)
+
+        # Half converted, tokens are read from either layout and written as records
+        self.score.runMigration(1)
+        self.set_msg(self.test_account2)
+        self.score.transferFrom(self.test_account1, self.test_account2, 9)
+        self.set_msg(self.test_account1)
+        self.score.runMigration(10)
+        self.assertEqual({'completed': 2, 'pending': [], 'current': None, 'cursor': None, 'processed': 0},
+                         self.score.migrationStatus())
+        for tokenId, owner in ((5, self.test_account1), (7, self.test_account1), (9, self.test_account2)):
+            self.assertEqual((owner, None), self.score._unpack_record(self.score._tokenRecord[tokenId]))
+
+        with self.assertRaises(IconScoreException) as e:
+            self.score.runMigration(10)
+        self.assertEqual(e.exception.message, "No migration pending")
+        with self.assertRaises(IconScoreException) as e:
+            self.score.runMigration(1001)
+        self.assertEqual(e.exception.message, "Invalid _maxItems, max 1000")
+        self.set_msg(self.test_account2)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.runMigration(10)
+        self.assertEqual(e.exception.message, "You don't have permission to run migrations")
+
+    def test_update_from_baseline(self):
+        self.score = self.get_score_instance(SampleIrc3, self.test_account1)
+        self.set_msg(self.test_account1)
+        # Deployment from before enumeration, tokens are only known by their owner entry
+        for tokenId in (1, 1000):
+            self.score._tokenOwner[tokenId] = self.test_account2
+        self.score._ownedTokenCount[self.test_account2] = 2
+        self.score._rangeFloorSet.remove()
+
+        self.score = self.update_score(self.score.address, SampleIrc3)
+        self.set_msg(self.test_account1)
+        self.assertEqual([], self.score.migrationStatus()['pending'])
+        self.score.mint(self.test_account1, 5)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintRange(self.test_account1, 10, 10)
+        self.assertEqual(e.exception.message, "Range floor unknown, pass _rangeFloor on update")
+
+        self.score = self.update_score(self.score.address, SampleIrc3, on_update_params={'_rangeFloor': 1001})
+        self.set_msg(self.test_account1)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintRange(self.test_account1, 995, 10)
+        self.assertEqual(e.exception.message, "Range overlaps minted tokens")
+        self.score.mintRange(self.test_account1, 1001, 10)
+        self.assertEqual(self.score.ownerOf(1000), self.test_account2)
+        self.assertEqual(self.score.ownerOf(1001), self.test_account1)
+
+    def test_legacy_tokens_migration(self):
+        self.score = self.get_score_instance(SampleIrc3, self.test_account1)
+        self.set_msg(self.test_account1)
+        # Deployment from before enumeration, token 7 was burned
+        burned = Address.from_prefix_and_int(AddressPrefix.EOA, 0)
+        for tokenId, owner in ((1, self.test_account2), (2, self.test_account2), (7, burned), (1000, self.test_account1)):
+            self.score._tokenOwner[tokenId] = owner
+        self.score._ownedTokenCount[self.test_account1] = 1
+        self.score._ownedTokenCount[self.test_account2] = 2
+        self.score._rangeFloorSet.remove()
+
+        self.score = self.update_score(self.score.address, SampleIrc3, on_update_params={'_legacyTokens': True})
+        self.set_msg(self.test_account1)
+        self.assertEqual(['legacyTokens'], self.score.migrationStatus()['pending'])
+        for query in (self.score.totalSupply, lambda: self.score.tokensOfOwner(self.test_account2)):
+            with self.assertRaises(IconScoreException) as e:
+                query()
+            self.assertEqual(e.exception.message, "Migration in progress")
+        self.restore_invoke_context()
+
+        # A token moved mid-migration joins its new owner's list on its own
+        self.set_msg(self.test_account2)
+        self.score.transfer(self.test_account1, 2)
+        self.set_msg(self.test_account1)
+        self.score.queueLegacyTokens([1, 2, 7, 1000, 1])
+        self.score.runMigration(3)
+        self.assertEqual(['legacyTokens'], self.score.migrationStatus()['pending'])
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintRange(self.test_account1, 2000, 10)
+        self.assertEqual(e.exception.message, "Range floor unknown, pass _rangeFloor on update")
+        self.score.queueLegacyTokens([], True)
+        self.score.runMigration(10)
+        self.assertEqual([], self.score.migrationStatus()['pending'])
+
+        self.assertEqual(3, self.score.totalSupply())
+        self.assertEqual([1], self.score.tokensOfOwner(self.test_account2))
+        self.assertEqual([2, 1000], self.score.tokensOfOwner(self.test_account1))
+        self.assertEqual({1, 2, 1000}, {self.score.tokenByIndex(index) for index in range(3)})
+        with self.assertRaises(IconScoreException) as e:
+            self.score.mintRange(self.test_account1, 900, 10)
+        self.assertEqual(e.exception.message, "Range overlaps minted tokens")
+        self.score.mintRange(self.test_account1, 1001, 10)
+        with self.assertRaises(IconScoreException) as e:
+            self.score.queueLegacyTokens([3])
+        self.assertEqual(e.exception.message, "No legacy tokens expected")
+
+
+class TestSampleIrc3PackedLayout(TestSampleIrc3):
+    # Runs every SampleIrc3 test against the packed token layout
+
+    def setUp(self):
+        super().setUp()
+        self.score = self.get_score_instance(SampleIrc3, self.test_account1, on_install_params={'_packedLayout': True})
+
+    def test_packed_record(self):
+        self.set_msg(self.test_account1)
+        self.score.mint(self.test_account1, 1)
+        self.assertIsNone(self.score._tokenOwner[1])
+        self.score.approve(self.test_account2, 1)
+        self.assertEqual((self.test_account1, self.test_account2),
+                         self.score._unpack_record(self.score._tokenRecord[1]))
@@ -0,0 +1,36 @@
+import argparse
+import sys
+import time
+
+from .indexer import EventIndexer
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog='sample_indexer',
+                                     description='Index SampleIrc3 / SampleIRC16 event logs into SQLite')
+    parser.add_argument('files', nargs='*', help='JSON lines files of transaction results or event logs, '
+                                                 'stdin if omitted')
+    parser.add_argument('--db', required=True, help='SQLite database to create or resume')
+    parser.add_argument('--batch-size', type=int, default=50_000, help='buffered rows per committed transaction')
+    parser.add_argument('--score', action='append', help='only index events of this SCORE address, repeatable')
+    args = parser.parse_args(argv)
+
+    indexer = EventIndexer(args.db, batch_size=args.batch_size, scores=args.score)
+    start = time.perf_counter()
+    count = 0
+    try:
+        if not args.files:
+            count += indexer.index_lines(sys.stdin)
+        for path in args.files:
+            with open(path) as f:
+                count += indexer.index_lines(f)
+    finally:
+        indexer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f'indexed {count} events in {elapsed:.1f}s, last position {indexer.cursor}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import json
+import sqlite3
+
+from .schema import SCHEMA
+
+ZERO_ADDRESS = 'hx' + '0' * 40
+
+# SampleIrc3 events
+TRANSFER = 'Transfer(Address,Address,int)'
+APPROVAL = 'Approval(Address,Address,int)'
+APPROVAL_FOR_ALL = 'ApprovalForAll(Address,Address,bool)'
+MINT_RANGE = 'MintRange(Address,int,int)'
+# SampleIRC16 events
+TRANSFER_BY_PARTITION = 'TransferByPartition(str,Address,Address,Address,int,bytes)'
+ISSUE_BY_PARTITION = 'IssueByPartition(str,Address,int,bytes)'
+REDEEM_BY_PARTITION = 'RedeemByPartition(str,Address,Address,int,bytes)'
+
+
+class EventIndexer:
+    """
+    Streams SampleIrc3 / SampleIRC16 event logs into an SQLite database.
+
+    Input lines are JSON transaction results (with "eventLogs") or single
+    event logs (with "indexed" and "data"), in chain order. Changes are
+    buffered in memory and written with executemany once batch_size rows
+    are buffered, so memory stays bounded however long the history is, a
+    MintRange event counting one row per minted token. The position of
+    the last indexed event is committed with each batch and events at or
+    before it are skipped, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path: str, batch_size: int = 50_000, scores: list = None):
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._batch_size = batch_size
+        self._scores = set(scores) if scores else None
+        self._cursor = self._load_cursor()
+        self._position = self._cursor
+        self._reset_buffers()
+        self._conn.execute('BEGIN')
+
+    @property
+    def cursor(self) -> tuple:
+        # (block height, tx index, log index) of the last committed event
+        return self._cursor
+
+    def index_lines(self, lines) -> int:
+        # Returns the number of indexed events, skipped ones excluded
+        count = 0
+        for line in lines:
+            line = line.strip()
+            if line:
+                count += self.index_record(json.loads(line))
+        return count
+
+    def index_record(self, record: dict) -> int:
+        if 'eventLogs' in record:
+            if 'status' in record and _to_int(record['status']) != 1:
+                return 0
+            block_height = _to_int(record['blockHeight'])
+            tx_index = _to_int(record.get('txIndex', 0))
+            count = 0
+            for log_index, log in enumerate(record['eventLogs']):
+                count += self._index_log(log, block_height, tx_index, log_index, record.get('txHash'))
+            return count
+
+        return self._index_log(record,
+                               _to_int(record['blockHeight']),
+                               _to_int(record.get('txIndex', 0)),
+                               _to_int(record.get('logIndex', 0)),
+                               record.get('txHash'))
+
+    def commit(self) -> None:
+        self._flush()
+        self._conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                               zip(('block_height', 'tx_index', 'log_index'), map(str, self._position)))
+        self._conn.execute('COMMIT')
+        self._cursor = self._position
+        self._reset_buffers()
+        self._conn.execute('BEGIN')
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.execute('COMMIT')
+        self._conn.close()
+
+    def _index_log(self, log: dict, block_height: int, tx_index: int, log_index: int, tx_hash: str) -> int:
+        position = (block_height, tx_index, log_index)
+        if position <= self._cursor:
+            return 0
+        score = log.get('scoreAddress')
+        if self._scores is not None and score not in self._scores:
+            return 0
+
+        handler = self._HANDLERS.get(log['indexed'][0])
+        if handler is None:
+            return 0
+        args = log['indexed'][1:] + log.get('data', [])
+        handler(self, score, args, (block_height, tx_hash, log_index))
+
+        self._position = position
+        if self._buffered_rows() >= self._batch_size:
+            self.commit()
+        return 1
+
+    # ======================================================================
+    # Event handlers
+    # ======================================================================
+    def _on_transfer(self, score: str, args: list, origin: tuple):
+        from_address, to_address, token_id = args[0], args[1], str(_to_int(args[2]))
+        if to_address == ZERO_ADDRESS:
+            self._owners[(score, token_id)] = None
+        else:
+            self._owners[(score, token_id)] = (to_address, None)
+        self._transfers.append((score, token_id, from_address, to_address) + origin)
+
+    def _on_approval(self, score: str, args: list, origin: tuple):
+        owner, approved, token_id = args[0], args[1], str(_to_int(args[2]))
+        self._owners[(score, token_id)] = (owner, None if approved == ZERO_ADDRESS else approved)
+
+    def _on_approval_for_all(self, score: str, args: list, origin: tuple):
+        self._operators[(score, args[0], args[1])] = bool(_to_int(args[2]))
+
+    def _on_mint_range(self, score: str, args: list, origin: tuple):
+        to_address, start_id, count = args[0], _to_int(args[1]), _to_int(args[2])
+        for token_id in range(start_id, start_id + count):
+            self._owners[(score, str(token_id))] = (to_address, None)
+            self._transfers.append((score, str(token_id), ZERO_ADDRESS, to_address) + origin)
+
+    def _on_transfer_by_partition(self, score: str, args: list, origin: tuple):
+        partition, operator, from_address, to_address, amount = args[0], args[1], args[2], args[3], _to_int(args[4])
+        self._add_balance(score, partition, from_address, -amount)
+        self._add_balance(score, partition, to_address, amount)
+        self._partition_events.append((score, partition, 'transfer', operator, from_address, to_address,
+                                       str(amount)) + origin)
+
+    def _on_issue_by_partition(self, score: str, args: list, origin: tuple):
+        partition, to_address, amount = args[0], args[1], _to_int(args[2])
+        self._add_balance(score, partition, to_address, amount)
+        self._partition_events.append((score, partition, 'issue', None, None, to_address, str(amount)) + origin)
+
+    def _on_redeem_by_partition(self, score: str, args: list, origin: tuple):
+        partition, operator, owner, amount = args[0], args[1], args[2], _to_int(args[3])
+        self._add_balance(score, partition, owner, -amount)
+        self._partition_events.append((score, partition, 'redeem', operator, owner, None, str(amount)) + origin)
+
+    _HANDLERS = {
+        TRANSFER: _on_transfer,
+        APPROVAL: _on_approval,
+        APPROVAL_FOR_ALL: _on_approval_for_all,
+        MINT_RANGE: _on_mint_range,
+        TRANSFER_BY_PARTITION: _on_transfer_by_partition,
+        ISSUE_BY_PARTITION: _on_issue_by_partition,
+        REDEEM_BY_PARTITION: _on_redeem_by_partition,
+    }
+
+    # ======================================================================
+    # Buffers
+    # ======================================================================
+    def _reset_buffers(self):
+        self._owners = {}
+        self._operators = {}
+        self._balances = {}
+        self._transfers = []
+        self._partition_events = []
+
+    def _buffered_rows(self) -> int:
+        return (len(self._owners) + len(self._operators) + len(self._balances) + len(self._transfers)
+                + len(self._partition_events))
+
+    def _add_balance(self, score: str, partition: str, holder: str, amount: int):
+        key = (score, partition, holder)
+        if key not in self._balances:
+            row = self._conn.execute('SELECT balance FROM partition_balance WHERE score=? AND partition=? AND holder=?',
+                                     key).fetchone()
+            self._balances[key] = int(row[0]) if row else 0
+        self._balances[key] += amount
+
+    def _flush(self):
+        execute = self._conn.executemany
+        execute('DELETE FROM nft_owner WHERE score=? AND token_id=?',
+                [key for key, value in self._owners.items() if value is None])
+        execute('INSERT OR REPLACE INTO nft_owner (score, token_id, owner, approved) VALUES (?, ?, ?, ?)',
+                [key + value for key, value in self._owners.items() if value is not None])
+        execute('DELETE FROM nft_operator WHERE score=? AND owner=? AND operator=?',
+                [key for key, approved in self._operators.items() if not approved])
+        execute('INSERT OR REPLACE INTO nft_operator (score, owner, operator) VALUES (?, ?, ?)',
+                [key for key, approved in self._operators.items() if approved])
+        execute('DELETE FROM partition_balance WHERE score=? AND partition=? AND holder=?',
+                [key for key, balance in self._balances.items() if balance == 0])
+        execute('INSERT OR REPLACE INTO partition_balance (score, partition, holder, balance) VALUES (?, ?, ?, ?)',
+                [key + (str(balance),) for key, balance in self._balances.items() if balance != 0])
+        execute('INSERT INTO nft_transfer (score, token_id, from_address, to_address, block_height, tx_hash, '
+                'log_index) VALUES (?, ?, ?, ?, ?, ?, ?)', self._transfers)
+        execute('INSERT INTO partition_event (score, partition, kind, operator, from_address, to_address, amount, '
+                'block_height, tx_hash, log_index) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', self._partition_events)
+
+    def _load_cursor(self) -> tuple:
+        meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+        return tuple(int(meta.get(key, -1)) for key in ('block_height', 'tx_index', 'log_index'))
+
+
+class OwnershipStore:
+    """
+    Readonly queries over a database built by EventIndexer.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def last_block(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key='block_height'").fetchone()
+        return int(row[0]) if row else -1
+
+    def owner_of(self, score: str, token_id: int) -> str:
+        row = self._conn.execute('SELECT owner FROM nft_owner WHERE score=? AND token_id=?',
+                                 (score, str(token_id))).fetchone()
+        return row[0] if row else None
+
+    def tokens_of(self, score: str, owner: str) -> list:
+        rows = self._conn.execute('SELECT token_id FROM nft_owner WHERE score=? AND owner=?', (score, owner))
+        return sorted(int(token_id) for token_id, in rows)
+
+    def token_history(self, score: str, token_id: int) -> list:
+        rows = self._conn.execute('SELECT from_address, to_address, block_height, tx_hash FROM nft_transfer '
+                                  'WHERE score=? AND token_id=? ORDER BY block_height, rowid',
+                                  (score, str(token_id)))
+        return [{'from': row[0], 'to': row[1], 'blockHeight': row[2], 'txHash': row[3]} for row in rows]
+
+    def holders_of(self, score: str, partition: str) -> dict:
+        rows = self._conn.execute('SELECT holder, balance FROM partition_balance WHERE score=? AND partition=?',
+                                  (score, partition))
+        return {holder: int(balance) for holder, balance in rows}
+
+    def partitions_of(self, score: str, holder: str) -> dict:
+        rows = self._conn.execute('SELECT partition, balance FROM partition_balance WHERE score=? AND holder=?',
+                                  (score, holder))
+        return {partition: int(balance) for partition, balance in rows}
+
+
+def _to_int(value) -> int:
+    if isinstance(value, int):
+        return value
+    return int(value, 16) if value.lower().lstrip('-').startswith('0x') else int(value)
@@ -0,0 +1,58 @@
+# Token IDs and amounts are stored as decimal TEXT, they don't fit SQLite's 64-bit integers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS nft_owner (
+    score TEXT NOT NULL,
+    token_id TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    approved TEXT,
+    PRIMARY KEY (score, token_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS nft_owner_by_owner ON nft_owner (score, owner);
+
+CREATE TABLE IF NOT EXISTS nft_operator (
+    score TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    operator TEXT NOT NULL,
+    PRIMARY KEY (score, owner, operator)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS nft_transfer (
+    score TEXT NOT NULL,
+    token_id TEXT NOT NULL,
+    from_address TEXT NOT NULL,
+    to_address TEXT NOT NULL,
+    block_height INTEGER NOT NULL,
+    tx_hash TEXT,
+    log_index INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS nft_transfer_by_token ON nft_transfer (score, token_id, block_height);
+
+CREATE TABLE IF NOT EXISTS partition_balance (
+    score TEXT NOT NULL,
+    partition TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    balance TEXT NOT NULL,
+    PRIMARY KEY (score, partition, holder)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS partition_balance_by_holder ON partition_balance (score, holder);
+
+CREATE TABLE IF NOT EXISTS partition_event (
+    score TEXT NOT NULL,
+    partition TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    operator TEXT,
+    from_address TEXT,
+    to_address TEXT,
+    amount TEXT NOT NULL,
+    block_height INTEGER NOT NULL,
+    tx_hash TEXT,
+    log_index INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS partition_event_by_partition ON partition_event (score, partition, block_height);
+"""
@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+
+from ..indexer import (
+    EventIndexer, OwnershipStore, ZERO_ADDRESS,
+    TRANSFER, APPROVAL, MINT_RANGE, TRANSFER_BY_PARTITION, ISSUE_BY_PARTITION, REDEEM_BY_PARTITION
+)
+
+IRC3 = 'cx' + '3' * 40
+IRC16 = 'cx' + '16' * 20
+ALICE = 'hx' + 'a' * 40
+BOB = 'hx' + 'b' * 40
+
+
+def tx_result(block: int, tx_index: int, *logs) -> str:
+    return json.dumps({
+        'blockHeight': hex(block),
+        'txIndex': hex(tx_index),
+        'txHash': f'0x{block:032x}{tx_index:032x}',
+        'status': '0x1',
+        'eventLogs': list(logs),
+    })
+
+
+def log(score: str, signature: str, indexed: list, data: list = None) -> dict:
+    return {'scoreAddress': score, 'indexed': [signature] + indexed, 'data': data or []}
+
+
+class TestEventIndexer(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'ownership.db')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _index(self, lines: list, batch_size: int = 2) -> int:
+        indexer = EventIndexer(self.path, batch_size=batch_size)
+        count = indexer.index_lines(lines)
+        indexer.close()
+        return count
+
+    def test_nft_ownership(self):
+        count = self._index([
+            tx_result(1, 0, log(IRC3, TRANSFER, [ZERO_ADDRESS, ALICE, '0x1']),
+                      log(IRC3, TRANSFER, [ZERO_ADDRESS, ALICE, '0x2'])),
+            tx_result(2, 0, log(IRC3, APPROVAL, [ALICE, BOB, '0x1'])),
+            tx_result(3, 0, log(IRC3, TRANSFER, [ALICE, BOB, '0x1'])),
+            tx_result(4, 0, log(IRC3, TRANSFER, [ALICE, ZERO_ADDRESS, '0x2'])),
+            tx_result(5, 0, log(IRC3, MINT_RANGE, [BOB], ['0xa', '0x3'])),
+        ])
+        self.assertEqual(6, count)
+
+        store = OwnershipStore(self.path)
+        self.assertEqual([1, 10, 11, 12], store.tokens_of(IRC3, BOB))
+        self.assertEqual([], store.tokens_of(IRC3, ALICE))
+        self.assertIsNone(store.owner_of(IRC3, 2))
+        self.assertEqual([ZERO_ADDRESS, ALICE], [t['from'] for t in store.token_history(IRC3, 1)])
+        self.assertEqual(5, store.last_block())
+        store.close()
+
+    def test_batch_counts_buffered_rows(self):
+        # A MintRange event buffers an owner and a transfer row per token, it fills a batch on its own
+        indexer = EventIndexer(self.path, batch_size=10)
+        indexer.index_lines([tx_result(1, 0, log(IRC3, MINT_RANGE, [BOB], ['0x1', hex(5)]))])
+        self.assertEqual((1, 0, 0), indexer.cursor)
+        indexer.index_lines([tx_result(2, 0, log(IRC3, TRANSFER, [BOB, ALICE, '0x1']))])
+        self.assertEqual((1, 0, 0), indexer.cursor)
+        indexer.close()
+        indexer = EventIndexer(self.path)
+        self.assertEqual((2, 0, 0), indexer.cursor)
+        indexer.close()
+
+    def test_partition_balances(self):
+        self._index([
+            tx_result(1, 0, log(IRC16, ISSUE_BY_PARTITION, ['default', ALICE, hex(100)], ['0x'])),
+            tx_result(1, 1, log(IRC16, ISSUE_BY_PARTITION, ['reserved', ALICE, hex(50)], ['0x'])),
+            tx_result(2, 0, log(IRC16, TRANSFER_BY_PARTITION, ['default', ALICE], [ALICE, BOB, hex(30), '0x'])),
+            tx_result(3, 0, log(IRC16, REDEEM_BY_PARTITION, ['reserved', ALICE, ALICE, hex(50)], ['0x'])),
+        ], batch_size=1)
+
+        store = OwnershipStore(self.path)
+        self.assertEqual({ALICE: 70, BOB: 30}, store.holders_of(IRC16, 'default'))
+        self.assertEqual({}, store.holders_of(IRC16, 'reserved'))
+        self.assertEqual({'default': 70}, store.partitions_of(IRC16, ALICE))
+        store.close()
+
+    def test_resume_skips_indexed_events(self):
+        lines = [
+            tx_result(1, 0, log(IRC16, ISSUE_BY_PARTITION, ['default', ALICE, hex(100)], ['0x'])),
+            tx_result(2, 0, log(IRC16, TRANSFER_BY_PARTITION, ['default', ALICE], [ALICE, BOB, hex(30), '0x'])),
+        ]
+        self.assertEqual(1, self._index(lines[:1]))
+        # The second run replays the whole export, only the new event is applied
+        self.assertEqual(1, self._index(lines))
+
+        store = OwnershipStore(self.path)
+        self.assertEqual({ALICE: 70, BOB: 30}, store.holders_of(IRC16, 'default'))
+        store.close()
+
+    def test_skip_failed_and_foreign_events(self):
+        failed = json.loads(tx_result(1, 0, log(IRC3, TRANSFER, [ZERO_ADDRESS, ALICE, '0x1'])))
+        failed['status'] = '0x0'
+        indexer = EventIndexer(self.path, scores=[IRC16])
+        self.assertEqual(0, indexer.index_record(failed))
+        self.assertEqual(0, indexer.index_lines([tx_result(2, 0, log(IRC3, TRANSFER, [ZERO_ADDRESS, ALICE, '0x1']))]))
+        indexer.close()